@@ -16,6 +16,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'django_browser_reload',
     'apps.core.apps.CoreConfig',
     'apps.custom_auth.apps.CustomAuthConfig',
@@ -25,11 +26,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.core.middlewares.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.middlewares.perfilador.PerfiladorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -82,5 +85,87 @@ TIME_ZONE = 'UTC'
 USE_I18N = True
 USE_TZ = True
 
-OPENAI_API_KEY = config("OPENAI_API_KEY")
+OPENAI_API_KEY = config("OPENAI_API_KEY", default="")
 LOGIN_URL = '/custom_auth/login/'
+
+# Búsqueda de productos del chatbot: "memoria" (índice por proceso) o "db"
+CATALOGO_BUSQUEDA = config("CATALOGO_BUSQUEDA", default="memoria")
+# Segundos entre reconstrucciones completas del índice en memoria
+CATALOGO_INDICE_TTL = config("CATALOGO_INDICE_TTL", default=300, cast=int)
+
+# Mensajes por página en el historial del chat (los anteriores se cargan bajo demanda)
+CHAT_MENSAJES_POR_PAGINA = config("CHAT_MENSAJES_POR_PAGINA", default=30, cast=int)
+
+# Filas por página del listado de productos en el chat
+CHAT_LISTADO_POR_PAGINA = config("CHAT_LISTADO_POR_PAGINA", default=25, cast=int)
+
+# Caché de Django (métricas versionadas del dashboard). LocMemCache es por
+# proceso: con varios workers usar una caché compartida (Redis, Memcached, DB)
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': config("CACHE_LOCATION", default="predicta"),
+    }
+}
+# Segundos que se conservan las métricas de una misma versión de datos
+DASHBOARD_CACHE_TTL = config("DASHBOARD_CACHE_TTL", default=300, cast=int)
+# Actualizaciones del dashboard por SSE: cada cuánto se revisa la versión de
+# datos, ventana para agrupar cambios y duración máxima de cada conexión
+DASHBOARD_SSE_INTERVALO = config("DASHBOARD_SSE_INTERVALO", default=1.0, cast=float)
+DASHBOARD_SSE_VENTANA = config("DASHBOARD_SSE_VENTANA", default=2.0, cast=float)
+DASHBOARD_SSE_DURACION = config("DASHBOARD_SSE_DURACION", default=300, cast=int)
+
+# Caché de intenciones del chatbot (mensaje normalizado → intención)
+INTENCIONES_CACHE_TAMANO = config("INTENCIONES_CACHE_TAMANO", default=2048, cast=int)
+INTENCIONES_CACHE_TTL = config("INTENCIONES_CACHE_TTL", default=86400, cast=int)
+INTENCIONES_CACHE_PERSISTENTE = config("INTENCIONES_CACHE_PERSISTENTE", default=False, cast=bool)
+# Confianza mínima del intérprete local para no llamar a OpenAI (1.1 = desactivado)
+INTERPRETE_LOCAL_CONFIANZA = config("INTERPRETE_LOCAL_CONFIANZA", default=0.8, cast=float)
+
+# LLM del chatbot: "openai", "local" (determinista, sin red) o ruta a una clase
+LLM_BACKEND = config("LLM_BACKEND", default="openai")
+LLM_MODELO = config("LLM_MODELO", default="gpt-4o-mini")
+# Variante del prompt de intenciones: "completo" o "compacto"
+LLM_PROMPT = config("LLM_PROMPT", default="completo")
+# API compatible con OpenAI (p. ej. el stub local de pruebas de carga)
+LLM_BASE_URL = config("LLM_BASE_URL", default="")
+# Plazo total por llamada en segundos, incluidos los reintentos
+LLM_TIMEOUT = config("LLM_TIMEOUT", default=15.0, cast=float)
+LLM_TIMEOUT_CONEXION = config("LLM_TIMEOUT_CONEXION", default=3.0, cast=float)
+LLM_REINTENTOS = config("LLM_REINTENTOS", default=2, cast=int)
+LLM_MAX_CONEXIONES = config("LLM_MAX_CONEXIONES", default=20, cast=int)
+# Latencia simulada del backend "local"
+LLM_LOCAL_LATENCIA = config("LLM_LOCAL_LATENCIA", default=0.0, cast=float)
+
+# Reposición (comando calcular_reposicion): probabilidad de no quedarse sin
+# stock durante la entrega, días entre pedidos y días de entrega por defecto
+REPOSICION_NIVEL_SERVICIO = config("REPOSICION_NIVEL_SERVICIO", default=0.95, cast=float)
+REPOSICION_DIAS_REVISION = config("REPOSICION_DIAS_REVISION", default=7, cast=int)
+REPOSICION_DIAS_ENTREGA = config("REPOSICION_DIAS_ENTREGA", default=7, cast=int)
+
+# Instantánea columnar de ventas para análisis (comando exportar_ventas)
+ANALITICA_DIR = config("ANALITICA_DIR", default=str(BASE_DIR / 'analitica'))
+
+# Instrumentación por petición (MetricasMiddleware y /metrics). Todas las
+# peticiones suman su duración; una fracción METRICAS_MUESTREO (0 a 1)
+# además desglosa SQL, LLM y códigos de barras (el desglose envuelve cada
+# consulta SQL: conviene una fracción chica). Server-Timing solo se envía a
+# usuarios staff o con DEBUG
+METRICAS_ACTIVAS = config("METRICAS_ACTIVAS", default=True, cast=bool)
+METRICAS_MUESTREO = config("METRICAS_MUESTREO", default=0.01, cast=float)
+METRICAS_SERVER_TIMING = config("METRICAS_SERVER_TIMING", default=True, cast=bool)
+# Token Bearer para que Prometheus lea /metrics; sin token solo usuarios staff
+METRICAS_TOKEN = config("METRICAS_TOKEN", default="")
+
+# Perfilado por muestreo (PerfiladorMiddleware): los usuarios staff lo piden
+# con la cabecera X-Perfilar o ?perfilar=1; con PERFILADOR_CADA_N > 0 además
+# se perfila una de cada N peticiones. Los perfiles se listan en /perfiles/
+PERFILADOR_ACTIVO = config("PERFILADOR_ACTIVO", default=False, cast=bool)
+PERFILADOR_CADA_N = config("PERFILADOR_CADA_N", default=0, cast=int)
+# Segundos entre muestras de la pila
+PERFILADOR_INTERVALO = config("PERFILADOR_INTERVALO", default=0.005, cast=float)
+# "speedscope" (JSON para speedscope.app) o "colapsado" (flamegraph.pl, inferno)
+PERFILADOR_FORMATO = config("PERFILADOR_FORMATO", default="speedscope")
+PERFILADOR_DIR = config("PERFILADOR_DIR", default=str(BASE_DIR / 'perfiles'))
+# Perfiles que se conservan; los más antiguos se borran
+PERFILADOR_MAXIMO = config("PERFILADOR_MAXIMO", default=200, cast=int)
@@ -1,4 +1,5 @@
 from apps.barcode_engine.services.detector import detect_barcodes
+from apps.core.instrumentacion import medir
 from apps.barcode_engine.storage.firebase_store import save_barcode_record
 import datetime  # Agrega esta importación para el timestamp
 
@@ -10,7 +11,8 @@ def process_frame(image):
     - devuelve los datos detectados
     """
 
-    frame, detections = detect_barcodes(image)  # Desempaqueta la tupla
+    with medir("barcode"):
+        frame, detections = detect_barcodes(image)  # Desempaqueta la tupla
 
     records = []
 
@@ -3,3 +3,6 @@ from django.apps import AppConfig
 
 class ChatbotConfig(AppConfig):
     name = 'apps.chatbot'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,76 @@
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.chatbot.services.interprete_local import interpretar_local
+
+CORPUS_DEFAULT = Path(__file__).resolve().parents[2] / "benchmarks" / "corpus_mensajes.txt"
+
+
+def cargar_corpus(ruta):
+    """Lee líneas 'mensaje | acción esperada' (la acción es opcional)"""
+    corpus = []
+    with open(ruta, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            mensaje, _, esperada = linea.partition("|")
+            corpus.append((mensaje.strip(), esperada.strip() or None))
+    return corpus
+
+
+class Command(BaseCommand):
+    help = 'Mide la tasa de aciertos del intérprete local (sin OpenAI) sobre un corpus de mensajes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=str(CORPUS_DEFAULT),
+                            help='Archivo con un mensaje por línea (formato: mensaje | acción esperada)')
+        parser.add_argument('--repeticiones', type=int, default=200,
+                            help='Repeticiones del corpus para medir la latencia')
+        parser.add_argument('--detalle', action='store_true',
+                            help='Muestra la interpretación de cada mensaje')
+
+    def handle(self, *args, **options):
+        corpus = cargar_corpus(options['corpus'])
+        umbral = getattr(settings, "INTERPRETE_LOCAL_CONFIANZA", 0.8)
+
+        aciertos = 0
+        errores = []
+        por_accion = Counter()
+        for mensaje, esperada in corpus:
+            data, confianza = interpretar_local(mensaje)
+            resuelto = data is not None and confianza >= umbral
+            accion = data["accion"] if resuelto else "llm"
+            if resuelto:
+                aciertos += 1
+                por_accion[accion] += 1
+            if esperada and accion != esperada:
+                errores.append((mensaje, esperada, accion))
+            if options['detalle']:
+                self.stdout.write(f"{confianza:4.2f}  {accion:<24} {mensaje}  →  {data}")
+
+        repeticiones = max(1, options['repeticiones'])
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            for mensaje, _ in corpus:
+                interpretar_local(mensaje)
+        total = time.perf_counter() - inicio
+        por_mensaje_us = total / (repeticiones * len(corpus)) * 1_000_000
+
+        self.stdout.write(f"\nMensajes: {len(corpus)}  (umbral de confianza {umbral})")
+        self.stdout.write(self.style.SUCCESS(
+            f"Resueltos sin LLM: {aciertos}/{len(corpus)} ({aciertos / len(corpus):.1%})"
+        ))
+        for accion, cantidad in por_accion.most_common():
+            self.stdout.write(f"  - {accion}: {cantidad}")
+        self.stdout.write(f"Latencia media del intérprete local: {por_mensaje_us:.1f} µs/mensaje")
+
+        con_esperada = sum(1 for _, esperada in corpus if esperada)
+        if con_esperada:
+            self.stdout.write(f"Coincidencia con la acción esperada: {con_esperada - len(errores)}/{con_esperada}")
+        for mensaje, esperada, obtenida in errores:
+            self.stdout.write(self.style.WARNING(f"  ✗ '{mensaje}': esperado {esperada}, obtenido {obtenida}"))
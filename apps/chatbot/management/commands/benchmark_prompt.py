@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.chatbot.services.llm import ErrorLLM, obtener_backend
+from apps.chatbot.services.metricas_llm import MetricasLLM
+from apps.chatbot.services.openai_service import _parsear_respuesta
+from apps.chatbot.services.prompts import PROMPTS, mensajes_intencion
+
+from .benchmark_interprete import CORPUS_DEFAULT, cargar_corpus
+
+
+class Command(BaseCommand):
+    help = (
+        'Envía el corpus de mensajes al LLM configurado (LLM_BACKEND) con cada '
+        'variante del prompt y compara tokens y latencia por acción'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corpus', default=str(CORPUS_DEFAULT),
+                            help='Archivo con un mensaje por línea (formato: mensaje | acción esperada)')
+        parser.add_argument('--variantes', nargs='+', choices=sorted(PROMPTS),
+                            default=['completo', 'compacto'])
+        parser.add_argument('--limite', type=int, default=0,
+                            help='Usar solo los primeros N mensajes del corpus')
+
+    def handle(self, *args, **options):
+        corpus = cargar_corpus(options['corpus'])
+        if options['limite']:
+            corpus = corpus[:options['limite']]
+        backend = obtener_backend()
+        self.stdout.write(f"Backend: {type(backend).__name__}  modelo: {backend.modelo}  mensajes: {len(corpus)}")
+
+        for variante in options['variantes']:
+            metricas = MetricasLLM()
+            coincidencias = con_esperada = errores = 0
+
+            for mensaje, esperada in corpus:
+                inicio = time.perf_counter()
+                try:
+                    respuesta = backend.completar(mensajes_intencion(mensaje, variante))
+                except ErrorLLM as e:
+                    errores += 1
+                    self.stdout.write(self.style.WARNING(f"  ✗ '{mensaje}': {e}"))
+                    continue
+                data = _parsear_respuesta(respuesta.contenido)
+                accion = data.get("accion") if data else None
+                metricas.registrar(accion, respuesta, time.perf_counter() - inicio)
+
+                # "llm" en el corpus = cualquier acción que no resuelva el intérprete local
+                if esperada and esperada != "llm":
+                    con_esperada += 1
+                    coincidencias += accion == esperada
+
+            self._mostrar(variante, metricas.resumen(), coincidencias, con_esperada, errores)
+
+    def _mostrar(self, variante, resumen, coincidencias, con_esperada, errores):
+        self.stdout.write(self.style.SUCCESS(f"\nPrompt '{variante}'"))
+        self.stdout.write(
+            f"  {'acción':<24}{'llamadas':>9}{'prompt':>9}{'caché':>8}{'resp.':>7}{'media ms':>10}{'p95 ms':>9}"
+        )
+        llamadas = tokens_prompt = tokens_respuesta = 0
+        latencia = 0.0
+        for accion, datos in sorted(resumen.items()):
+            llamadas += datos["llamadas"]
+            tokens_prompt += datos["tokens_prompt"]
+            tokens_respuesta += datos["tokens_respuesta"]
+            latencia += datos["latencia_media"] * datos["llamadas"]
+            self.stdout.write(
+                f"  {accion:<24}{datos['llamadas']:>9}{datos['tokens_prompt_medio']:>9.0f}"
+                f"{datos['tokens_cache'] / datos['llamadas']:>8.0f}{datos['tokens_respuesta_medio']:>7.0f}"
+                f"{datos['latencia_media'] * 1000:>10.1f}{datos['latencia_p95'] * 1000:>9.1f}"
+            )
+        if llamadas:
+            self.stdout.write(
+                f"  Total: {tokens_prompt} tokens de prompt, {tokens_respuesta} de respuesta, "
+                f"latencia media {latencia / llamadas * 1000:.1f} ms"
+            )
+        if con_esperada:
+            self.stdout.write(f"  Coincidencia con la acción esperada: {coincidencias}/{con_esperada}")
+        if errores:
+            self.stdout.write(self.style.WARNING(f"  Llamadas fallidas: {errores}"))
@@ -0,0 +1,199 @@
+import html as html_lib
+import re
+from html.parser import HTMLParser
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.html import strip_tags
+
+from apps.chatbot.models import MensajeChat
+from apps.chatbot.services.respuestas import MEDALLAS, texto_plano
+
+_SCRIPTS = re.compile(r"<(script|style)\b.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+_FIN_DE_LINEA = re.compile(r"<br\s*/?>|</(?:p|div|li|tr|h\d)>", re.IGNORECASE)
+_ESPACIOS = re.compile(r"[^\S\n]+")
+_NUMERO = re.compile(r"-?\d+")
+_BUSQUEDA = re.compile(r"similares a '(.*?)'")
+
+
+class _LectorHTML(HTMLParser):
+    """Extrae filas de tablas, elementos de lista y textos en <strong>"""
+
+    def __init__(self):
+        super().__init__()
+        self.filas = []
+        self.items_lista = []
+        self.fuertes = []
+        self._celda = self._item = self._fuerte = None
+        self._fila = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "tr":
+            self._fila = []
+        elif tag in ("td", "th"):
+            self._celda = []
+        elif tag == "li":
+            self._item = []
+        elif tag == "strong":
+            self._fuerte = []
+
+    def handle_endtag(self, tag):
+        if tag == "tr" and self._fila is not None:
+            self.filas.append(self._fila)
+            self._fila = None
+        elif tag in ("td", "th") and self._celda is not None:
+            if self._fila is not None:
+                self._fila.append(" ".join("".join(self._celda).split()))
+            self._celda = None
+        elif tag == "li" and self._item is not None:
+            self.items_lista.append(" ".join("".join(self._item).split()))
+            self._item = None
+        elif tag == "strong" and self._fuerte is not None:
+            self.fuertes.append(" ".join("".join(self._fuerte).split()))
+            self._fuerte = None
+
+    def handle_data(self, data):
+        for parte in (self._celda, self._item, self._fuerte):
+            if parte is not None:
+                parte.append(data)
+
+
+def _entero(texto):
+    match = _NUMERO.search(texto or "")
+    return int(match.group()) if match else 0
+
+
+def _precio(texto):
+    return (texto or "").replace("$", "").strip()
+
+
+def convertir(html):
+    """
+    Resultado estructurado equivalente a una respuesta HTML antigua de
+    ejecutar_accion, o None si el formato no se reconoce.
+    """
+    lector = _LectorHTML()
+    lector.feed(html)
+    lector.close()
+    filas = [fila for fila in lector.filas if fila and not all(c in ("", "🏆") for c in fila)]
+
+    if "Productos registrados" in html:
+        productos = [[f[0], _entero(f[1]), _precio(f[2])] for f in filas if len(f) == 3 and f[0] != "Producto"]
+        # Todas las filas en una sola página: el paginador consulta el
+        # catálogo actual y mostraría otros productos, stock y precios
+        return {
+            "tipo": "listado_productos",
+            "productos": productos,
+            "pagina": 1,
+            "paginas": 1,
+            "total": len(productos),
+        }
+
+    if "Productos más vendidos" in html:
+        productos = [
+            [f[1], _entero(f[2]), _precio(f[3])]
+            for f in filas if len(f) == 4 and f[0] in MEDALLAS
+        ]
+        return {
+            "tipo": "mas_vendidos",
+            "productos": productos,
+            "total_unidades": sum(vendidos for _, vendidos, _ in productos),
+        }
+
+    if "similares a" in html and lector.items_lista:
+        busqueda = _BUSQUEDA.search(html)
+        return {
+            "tipo": "sugerencias",
+            "objetivo": "consultar",
+            "problemas": [{
+                "busqueda": busqueda.group(1) if busqueda else "",
+                "sugerencias": lector.items_lista,
+            }],
+        }
+
+    ficha = {f[0]: f[1] for f in filas if len(f) == 2}
+    if "📊 Stock actual" in ficha:
+        nombre = next((t[2:].strip() for t in lector.fuertes if t.startswith("📦")), "")
+        return {
+            "tipo": "producto",
+            "nombre": nombre,
+            "precio": _precio(ficha.get("💰 Precio de venta")),
+            "stock": _entero(ficha.get("📊 Stock actual")),
+            "stock_minimo": _entero(ficha.get("⚠️ Stock mínimo")),
+            "total_vendido": _entero(ficha.get("🔥 Total vendido")),
+            "categoria": ficha.get("📁 Categoría", ""),
+            "aproximado": "Encontré:" in html,
+            "reposicion": "necesita reposición" in html,
+        }
+
+    return None
+
+
+def a_texto(html):
+    """
+    Texto visible de una respuesta HTML no reconocida, una línea por
+    párrafo, fila o elemento de lista: se muestra escapado como respuesta
+    de tipo "texto" en lugar de insertar HTML guardado
+    """
+    texto = html_lib.unescape(strip_tags(_FIN_DE_LINEA.sub("\n", _SCRIPTS.sub("", html))))
+    lineas = (_ESPACIOS.sub(" ", linea).strip() for linea in texto.splitlines())
+    return "\n".join(linea for linea in lineas if linea)
+
+
+class Command(BaseCommand):
+    help = (
+        'Convierte las respuestas HTML antiguas del bot en datos estructurados '
+        '(MensajeChat.datos); las que no se reconocen pasan a texto plano'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500,
+                            help='Mensajes procesados por transacción')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo calcula el ahorro, sin guardar cambios')
+
+    def handle(self, *args, **options):
+        lote = max(1, options['lote'])
+        pendientes = (
+            MensajeChat.objects
+            .filter(tipo='bot', datos__isnull=True, mensaje__contains='<')
+            .order_by('pk')
+        )
+
+        convertidos = a_texto_plano = 0
+        bytes_antes = bytes_despues = 0
+        ultimo = 0
+        while True:
+            mensajes = list(pendientes.filter(pk__gt=ultimo).only('pk', 'mensaje')[:lote])
+            if not mensajes:
+                break
+            ultimo = mensajes[-1].pk
+
+            cambiados = []
+            for mensaje in mensajes:
+                original = mensaje.mensaje
+                datos = convertir(original)
+                if datos is not None:
+                    convertidos += 1
+                else:
+                    datos = {"tipo": "texto", "texto": a_texto(original)}
+                    a_texto_plano += 1
+                mensaje.datos = datos
+                mensaje.mensaje = texto_plano(datos)
+                bytes_antes += len(original.encode())
+                bytes_despues += len(mensaje.mensaje.encode()) + len(str(mensaje.datos or "").encode())
+                cambiados.append(mensaje)
+
+            if cambiados and not options['dry_run']:
+                with transaction.atomic():
+                    MensajeChat.objects.bulk_update(cambiados, ['mensaje', 'datos'])
+
+        accion = "Se compactarían" if options['dry_run'] else "Compactados"
+        self.stdout.write(self.style.SUCCESS(
+            f"{accion}: {convertidos} mensajes a datos estructurados, {a_texto_plano} a texto plano"
+        ))
+        if bytes_antes:
+            self.stdout.write(
+                f"Tamaño: {bytes_antes / 1024:.1f} KB → {bytes_despues / 1024:.1f} KB "
+                f"({1 - bytes_despues / bytes_antes:.0%} menos)"
+            )
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-18 16:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Las tablas de chatbot existían antes de esta migración (creadas con
+# syncdb): en esas bases aplicar con "migrate chatbot --fake-initial".
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Conversacion',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('titulo', models.CharField(default='Nueva conversación', max_length=200)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('activa', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Conversaciones',
+                'ordering': ['-fecha_actualizacion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='MensajeChat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('user', 'Usuario'), ('bot', 'Bot')], max_length=10)),
+                ('mensaje', models.TextField()),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('conversacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mensajes', to='chatbot.conversacion')),
+            ],
+            options={
+                'verbose_name_plural': 'Mensajes del Chat',
+                'ordering': ['fecha'],
+            },
+        ),
+    ]
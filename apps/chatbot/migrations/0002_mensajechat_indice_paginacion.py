@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='mensajechat',
+            index=models.Index(fields=['conversacion', 'fecha', 'id'], name='chatbot_mensaje_conv_fecha'),
+        ),
+    ]
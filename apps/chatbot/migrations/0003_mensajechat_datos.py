@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 16:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0002_mensajechat_indice_paginacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mensajechat',
+            name='datos',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
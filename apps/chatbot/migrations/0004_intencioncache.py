@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-18 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chatbot', '0003_mensajechat_datos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IntencionCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('mensaje_normalizado', models.TextField()),
+                ('datos', models.JSONField()),
+                ('aciertos', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Caché de intenciones',
+            },
+        ),
+    ]
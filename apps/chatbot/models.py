@@ -1,4 +1,31 @@
+import base64
+
+from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.html import escape
+
+
+def _codificar_cursor(mensaje):
+    valor = f"{mensaje.fecha.isoformat()}|{mensaje.pk}|{mensaje.conversacion_id}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(cursor):
+    """Retorna (fecha, id, conversacion_id) o lanza ValueError si el cursor no es válido"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        fecha, pk, conversacion_id = base64.urlsafe_b64decode(cursor + relleno).decode().split("|")
+        fecha = parse_datetime(fecha)
+        pk = int(pk)
+        conversacion_id = int(conversacion_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+    if fecha is None:
+        raise ValueError("Cursor inválido")
+    return fecha, pk, conversacion_id
+
 
 class Conversacion(models.Model):
     """Conversaciones separadas del chatbot"""
@@ -24,6 +51,38 @@ class Conversacion(models.Model):
             if len(primer_mensaje.mensaje) > 50:
                 self.titulo += "..."
             self.save()
+    
+    async def agenerar_titulo_automatico(self):
+        """Versión async de generar_titulo_automatico"""
+        primer_mensaje = await self.mensajes.filter(tipo='user').afirst()
+        if primer_mensaje:
+            self.titulo = primer_mensaje.mensaje[:50]
+            if len(primer_mensaje.mensaje) > 50:
+                self.titulo += "..."
+            await self.asave()
+
+    def pagina_mensajes(self, antes=None, limite=None):
+        """
+        Paginación por cursor (keyset) sobre (fecha, id): trae los `limite`
+        mensajes anteriores al cursor usando el índice (conversacion, fecha),
+        sin OFFSET ni COUNT, así el costo no depende del largo de la conversación.
+        Retorna (mensajes en orden cronológico, cursor de los anteriores o None).
+        """
+        limite = limite or getattr(settings, 'CHAT_MENSAJES_POR_PAGINA', 30)
+        mensajes = self.mensajes.order_by('-fecha', '-id')
+        if antes:
+            fecha, pk, conversacion_id = _decodificar_cursor(antes)
+            if conversacion_id != self.pk:
+                raise ValueError("El cursor es de otra conversación")
+            mensajes = mensajes.filter(Q(fecha__lt=fecha) | Q(fecha=fecha, id__lt=pk))
+
+        pagina = list(mensajes[:limite + 1])
+        hay_anteriores = len(pagina) > limite
+        pagina = pagina[:limite]
+        pagina.reverse()
+
+        cursor = _codificar_cursor(pagina[0]) if hay_anteriores else None
+        return pagina, cursor
 
 
 class MensajeChat(models.Model):
@@ -40,11 +99,43 @@ class MensajeChat(models.Model):
     )
     tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
     mensaje = models.TextField()
+    # Respuestas del bot: resultado estructurado de ejecutar_accion; el HTML
+    # se genera al mostrarlo. Las filas antiguas guardan el HTML en `mensaje`
+    datos = models.JSONField(null=True, blank=True)
     fecha = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['fecha']
         verbose_name_plural = "Mensajes del Chat"
+        indexes = [
+            # Historial paginado por (fecha, id) dentro de cada conversación
+            models.Index(fields=['conversacion', 'fecha', 'id'], name='chatbot_mensaje_conv_fecha'),
+        ]
     
     def __str__(self):
-        return f"{self.tipo} - {self.fecha.strftime('%d/%m/%Y %H:%M')}"
\ No newline at end of file
+        return f"{self.tipo} - {self.fecha.strftime('%d/%m/%Y %H:%M')}"
+
+    @property
+    def html(self):
+        """Contenido listo para mostrar en el chat"""
+        if self.datos is not None:
+            from .services.respuestas import renderizar
+            return renderizar(self.datos)
+        # Mensajes del usuario y respuestas antiguas sin compactar: nunca se
+        # insertan como HTML (compactar_mensajes convierte las antiguas)
+        return escape(self.mensaje)
+
+
+class IntencionCache(models.Model):
+    """Intenciones ya interpretadas por el LLM (caché persistente)"""
+    clave = models.CharField(max_length=64, unique=True)  # sha256 del mensaje normalizado
+    mensaje_normalizado = models.TextField()
+    datos = models.JSONField()
+    aciertos = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name_plural = "Caché de intenciones"
+
+    def __str__(self):
+        return f"{self.mensaje_normalizado[:50]} → {self.datos.get('accion')}"
@@ -0,0 +1,145 @@
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from rapidfuzz import fuzz
+
+from apps.companies.busqueda import FTS_TABLA, busqueda_disponible
+from apps.companies.models import Producto, normalizar_texto
+from .indice_productos import indice_productos
+
+# Candidatos que se piden a la base de datos para la capa fuzzy
+LIMITE_CANDIDATOS = 50
+
+
+def _escapar_like(texto):
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _resolver(queryset, similitud_unico, similitud_varios):
+    """
+    Una sola consulta por capa: trae hasta 6 filas ordenadas por nombre.
+    Retorna la tupla de resultado o None si la capa no encontró nada.
+    """
+    filas = list(queryset.order_by('nombre', 'pk').values_list('pk', 'nombre')[:6])
+    if len(filas) == 1:
+        return filas[0][0], False, similitud_unico, []
+    if len(filas) > 1:
+        return None, False, similitud_varios, [nombre for _, nombre in filas[:5]]
+    return None
+
+
+def _con_fragmentos_sqlite(productos, fragmentos):
+    """Filtra por 'contiene' usando el índice FTS5 trigram"""
+    condiciones = " AND ".join(["nombre_normalizado LIKE %s ESCAPE '\\'"] * len(fragmentos))
+    sql = f"SELECT rowid FROM {FTS_TABLA} WHERE {condiciones}"
+    params = [f"%{_escapar_like(f)}%" for f in fragmentos]
+    return productos.filter(pk__in=RawSQL(sql, params))
+
+
+def _con_fragmentos(productos, fragmentos):
+    if connection.vendor == 'sqlite':
+        return _con_fragmentos_sqlite(productos, fragmentos)
+    for fragmento in fragmentos:
+        productos = productos.filter(nombre_normalizado__contains=fragmento)
+    return productos
+
+
+def _con_prefijo(productos, prefijo):
+    if connection.vendor == 'sqlite':
+        # Rango sobre el índice B-tree (LIKE no lo aprovecha en SQLite)
+        return productos.filter(
+            nombre_normalizado__gte=prefijo,
+            nombre_normalizado__lt=prefijo + '\U0010ffff',
+        )
+    return productos.filter(nombre_normalizado__startswith=prefijo)
+
+
+def _candidatos_fuzzy(productos, texto):
+    """Candidatos ordenados por similitud calculada en la base de datos"""
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return list(
+            productos
+            .filter(nombre_normalizado__trigram_similar=texto)
+            .annotate(similitud=TrigramSimilarity('nombre_normalizado', texto))
+            .order_by('-similitud', 'nombre')
+            .values_list('pk', 'nombre', 'nombre_normalizado')[:LIMITE_CANDIDATOS]
+        )
+
+    # SQLite: cualquier trigrama en común, ordenado por bm25
+    trigramas = {texto[i:i + 3] for i in range(len(texto) - 2)}
+    if not trigramas:
+        return []
+    consulta = " OR ".join('"' + t.replace('"', '""') + '"' for t in sorted(trigramas))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLA} WHERE {FTS_TABLA} MATCH %s "
+            f"ORDER BY rank LIMIT %s",
+            [consulta, LIMITE_CANDIDATOS],
+        )
+        pks = [fila[0] for fila in cursor.fetchall()]
+    filas = productos.filter(pk__in=pks).values_list('pk', 'nombre', 'nombre_normalizado')
+    orden = {pk: i for i, pk in enumerate(pks)}
+    return sorted(filas, key=lambda fila: orden[fila[0]])
+
+
+def buscar(nombre_busqueda, umbral=60):
+    """
+    Las mismas cinco capas de IndiceProductos.buscar resueltas con
+    índices de la base de datos (trigram GIN en PostgreSQL, FTS5 en SQLite);
+    sin esos índices usa el índice en memoria.
+    Retorna: (pk, es_exacto, similitud, sugerencias)
+    """
+    if not busqueda_disponible(connection):
+        return indice_productos.buscar(nombre_busqueda, umbral=umbral)
+
+    texto = normalizar_texto(nombre_busqueda)
+    if not texto:
+        return None, False, 0, []
+
+    productos = Producto.objects.filter(activo=True)
+
+    # ✅ CAPA 1: Búsqueda exacta
+    pk = (
+        productos.filter(nombre_normalizado=texto)
+        .order_by('nombre', 'pk')
+        .values_list('pk', flat=True)
+        .first()
+    )
+    if pk:
+        return pk, True, 100, []
+
+    # ✅ CAPA 2: Empieza con...
+    resultado = _resolver(_con_prefijo(productos, texto), 95, 90)
+    if resultado:
+        return resultado
+
+    # ✅ CAPA 3: Contiene todas las palabras clave
+    palabras = texto.split()
+    if len(palabras) >= 2:
+        claves = [p for p in palabras if len(p) > 2]
+        if claves:
+            resultado = _resolver(_con_fragmentos(productos, claves), 85, 80)
+            if resultado:
+                return resultado
+
+    # ✅ CAPA 4: Contiene la frase (parcial)
+    resultado = _resolver(_con_fragmentos(productos, [texto]), 75, 70)
+    if resultado:
+        return resultado
+
+    # ✅ CAPA 5: Fuzzy - la base de datos ordena, RapidFuzz puntúa los
+    # candidatos para conservar la escala de 'umbral'
+    puntuados = sorted(
+        (
+            (fuzz.token_sort_ratio(texto, normalizado), -i, pk, nombre)
+            for i, (pk, nombre, normalizado) in enumerate(_candidatos_fuzzy(productos, texto))
+        ),
+        reverse=True,
+    )
+    if puntuados and puntuados[0][0] >= umbral:
+        similitud, _, pk, _ = puntuados[0]
+        return pk, False, similitud, []
+
+    sugerencias = [nombre for similitud, _, _, nombre in puntuados[:5] if similitud >= 40]
+    return None, False, 0, sugerencias
@@ -0,0 +1,154 @@
+import copy
+import hashlib
+import logging
+import re
+import threading
+from datetime import timedelta
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+from django.utils import timezone
+
+from apps.companies.models import normalizar_texto
+
+logger = logging.getLogger(__name__)
+
+_PUNTUACION_EXTREMOS = re.compile(r"^[\s¿¡?!.,;:]+|[\s¿¡?!.,;:]+$")
+
+
+def normalizar_mensaje(mensaje):
+    """
+    Clave de caché: minúsculas, sin tildes, espacios simples y sin
+    puntuación al inicio/fin ("¿Productos más vendidos?" == "productos mas vendidos")
+    """
+    return _PUNTUACION_EXTREMOS.sub("", normalizar_texto(mensaje))
+
+
+class CacheIntenciones:
+    """
+    Caché mensaje normalizado → intención interpretada.
+
+    Nivel 1: TTLCache en memoria (LRU + expiración).
+    Nivel 2 (opcional): tabla IntencionCache, compartida entre procesos y
+    reinicios. Se activa con INTENCIONES_CACHE_PERSISTENTE.
+    """
+
+    def __init__(self, maxsize=None, ttl=None, persistente=None):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._persistente = persistente
+        self._memoria = None
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.aciertos_db = 0
+        self.fallos = 0
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "INTENCIONES_CACHE_TTL", 86400)
+
+    @property
+    def persistente(self):
+        if self._persistente is not None:
+            return self._persistente
+        return getattr(settings, "INTENCIONES_CACHE_PERSISTENTE", False)
+
+    @property
+    def memoria(self):
+        if self._memoria is None:
+            maxsize = self._maxsize or getattr(settings, "INTENCIONES_CACHE_TAMANO", 2048)
+            self._memoria = TTLCache(maxsize=maxsize, ttl=self.ttl)
+        return self._memoria
+
+    @staticmethod
+    def _clave_db(clave):
+        return hashlib.sha256(clave.encode("utf-8")).hexdigest()
+
+    def obtener(self, mensaje):
+        """Retorna una copia de la intención guardada o None"""
+        clave = normalizar_mensaje(mensaje)
+        if not clave:
+            return None
+
+        with self._lock:
+            datos = self.memoria.get(clave)
+            if datos is not None:
+                self.aciertos += 1
+                return copy.deepcopy(datos)
+
+        datos = self._obtener_db(clave) if self.persistente else None
+
+        with self._lock:
+            if datos is None:
+                self.fallos += 1
+                return None
+            self.aciertos_db += 1
+            self.memoria[clave] = datos
+        return copy.deepcopy(datos)
+
+    def guardar(self, mensaje, datos):
+        clave = normalizar_mensaje(mensaje)
+        if not clave or not datos:
+            return
+        with self._lock:
+            self.memoria[clave] = copy.deepcopy(datos)
+        if self.persistente:
+            self._guardar_db(clave, datos)
+
+    def _obtener_db(self, clave):
+        from apps.chatbot.models import IntencionCache
+
+        limite = timezone.now() - timedelta(seconds=self.ttl)
+        try:
+            filas = IntencionCache.objects.filter(
+                clave=self._clave_db(clave), fecha_creacion__gte=limite
+            )
+            datos = filas.values_list("datos", flat=True).first()
+            if datos is not None:
+                filas.update(aciertos=F("aciertos") + 1)
+            return datos
+        except DatabaseError:
+            logger.exception("No se pudo leer la caché persistente de intenciones")
+            return None
+
+    def _guardar_db(self, clave, datos):
+        from apps.chatbot.models import IntencionCache
+
+        try:
+            IntencionCache.objects.update_or_create(
+                clave=self._clave_db(clave),
+                defaults={
+                    "mensaje_normalizado": clave,
+                    "datos": datos,
+                    "fecha_creacion": timezone.now(),
+                },
+            )
+        except DatabaseError:
+            logger.exception("No se pudo guardar la caché persistente de intenciones")
+
+    def limpiar(self):
+        with self._lock:
+            self.memoria.clear()
+            self.aciertos = self.aciertos_db = self.fallos = 0
+
+    def estadisticas(self):
+        """Contadores de aciertos/fallos para monitoreo"""
+        with self._lock:
+            consultas = self.aciertos + self.aciertos_db + self.fallos
+            return {
+                "aciertos": self.aciertos,
+                "aciertos_db": self.aciertos_db,
+                "fallos": self.fallos,
+                "tasa_aciertos": (
+                    (self.aciertos + self.aciertos_db) / consultas if consultas else 0.0
+                ),
+                "tamano": len(self.memoria),
+                "maximo": self.memoria.maxsize,
+            }
+
+
+cache_intenciones = CacheIntenciones()
@@ -0,0 +1,276 @@
+import bisect
+import heapq
+import threading
+import time
+
+from django.conf import settings
+from rapidfuzz import fuzz, process
+
+from apps.companies.models import Producto, normalizar_texto
+
+
+def ordenar_tokens(texto):
+    """Equivalente al preprocesado interno de fuzz.token_sort_ratio"""
+    return " ".join(sorted(texto.split()))
+
+
+class IndiceProductos:
+    """
+    Índice en memoria del catálogo de productos activos.
+
+    Resuelve las capas de búsqueda de buscar_producto_inteligente sin
+    consultar la base de datos:
+    - nombres normalizados sin tildes (búsqueda exacta)
+    - lista ordenada para búsqueda por prefijo (bisect)
+    - índice invertido de tokens (palabras clave y frase parcial)
+    - opciones ya preprocesadas para RapidFuzz
+
+    Se construye de forma perezosa, se actualiza de forma incremental con
+    las señales de Producto y se reconstruye por completo cada
+    CATALOGO_INDICE_TTL segundos para recoger cambios hechos por otros
+    procesos o por operaciones masivas que no disparan señales.
+    """
+
+    def __init__(self, ttl=None):
+        self._lock = threading.RLock()
+        self._ttl = ttl
+        self._construido_en = None
+        self._limpiar()
+
+    def _limpiar(self):
+        self._entradas = {}      # pk -> (nombre, nombre_normalizado)
+        self._por_nombre = {}    # nombre_normalizado -> set(pk)
+        self._ordenados = []     # [(nombre_normalizado, pk)] ordenada
+        self._tokens = {}        # token -> set(pk)
+        self._fuzzy = None       # (nombres, opciones preprocesadas, pks)
+
+    @property
+    def ttl(self):
+        if self._ttl is not None:
+            return self._ttl
+        return getattr(settings, "CATALOGO_INDICE_TTL", 300)
+
+    # ------------------------------------------------------------------
+    # Construcción y mantenimiento
+    # ------------------------------------------------------------------
+
+    def reconstruir(self):
+        """Carga todos los productos activos en una sola consulta"""
+        filas = list(Producto.objects.filter(activo=True).values_list("pk", "nombre"))
+        with self._lock:
+            self._limpiar()
+            for pk, nombre in filas:
+                self._agregar(pk, nombre)
+            self._ordenados.sort()
+            self._construido_en = time.monotonic()
+
+    def invalidar(self):
+        """Fuerza una reconstrucción completa en la próxima búsqueda"""
+        with self._lock:
+            self._construido_en = None
+
+    def _asegurar_construido(self):
+        with self._lock:
+            vencido = (
+                self._construido_en is None
+                or time.monotonic() - self._construido_en > self.ttl
+            )
+        if vencido:
+            self.reconstruir()
+
+    def _agregar(self, pk, nombre, ordenado=False):
+        norm = normalizar_texto(nombre)
+        self._entradas[pk] = (nombre, norm)
+        self._por_nombre.setdefault(norm, set()).add(pk)
+        if ordenado:
+            bisect.insort(self._ordenados, (norm, pk))
+        else:
+            self._ordenados.append((norm, pk))
+        for token in set(norm.split()):
+            self._tokens.setdefault(token, set()).add(pk)
+        self._fuzzy = None
+
+    def _quitar(self, pk):
+        entrada = self._entradas.pop(pk, None)
+        if entrada is None:
+            return
+        _, norm = entrada
+        pks = self._por_nombre.get(norm)
+        if pks:
+            pks.discard(pk)
+            if not pks:
+                del self._por_nombre[norm]
+        i = bisect.bisect_left(self._ordenados, (norm, pk))
+        if i < len(self._ordenados) and self._ordenados[i] == (norm, pk):
+            del self._ordenados[i]
+        for token in set(norm.split()):
+            pks = self._tokens.get(token)
+            if pks:
+                pks.discard(pk)
+                if not pks:
+                    del self._tokens[token]
+        self._fuzzy = None
+
+    def actualizar_producto(self, producto):
+        """Refleja el alta/modificación de un producto (señal post_save)"""
+        with self._lock:
+            if self._construido_en is None:
+                return
+            self._quitar(producto.pk)
+            if producto.activo:
+                self._agregar(producto.pk, producto.nombre, ordenado=True)
+
+    def eliminar_producto(self, pk):
+        """Refleja la eliminación de un producto (señal post_delete)"""
+        with self._lock:
+            if self._construido_en is None:
+                return
+            self._quitar(pk)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        self._asegurar_construido()
+        return len(self._entradas)
+
+    def _nombre(self, pk):
+        return self._entradas[pk][0]
+
+    def _primeros(self, pks, limite=5):
+        """Primeros nombres según el orden por defecto de Producto"""
+        return [
+            nombre for nombre, _ in heapq.nsmallest(
+                limite, ((self._nombre(pk), pk) for pk in pks)
+            )
+        ]
+
+    def _unico(self, pks):
+        return min(pks, key=lambda pk: (self._nombre(pk), pk))
+
+    def exactos(self, texto):
+        return self._por_nombre.get(normalizar_texto(texto), set())
+
+    def con_prefijo(self, texto):
+        prefijo = normalizar_texto(texto)
+        inicio = bisect.bisect_left(self._ordenados, (prefijo,))
+        pks = []
+        for i in range(inicio, len(self._ordenados)):
+            norm, pk = self._ordenados[i]
+            if not norm.startswith(prefijo):
+                break
+            pks.append(pk)
+        return pks
+
+    def con_fragmento(self, fragmento):
+        """Productos cuyo nombre contiene el fragmento (sin espacios)"""
+        pks = set()
+        for token, ids in self._tokens.items():
+            if fragmento in token:
+                pks |= ids
+        return pks
+
+    def con_palabras(self, palabras):
+        """Productos que contienen TODAS las palabras"""
+        resultado = None
+        for palabra in palabras:
+            pks = self.con_fragmento(palabra)
+            resultado = pks if resultado is None else resultado & pks
+            if not resultado:
+                return set()
+        if resultado is None:
+            return set(self._entradas)
+        return resultado
+
+    def con_frase(self, texto):
+        frase = normalizar_texto(texto)
+        if not frase:
+            return set(self._entradas)
+        candidatos = self.con_palabras(frase.split())
+        return {pk for pk in candidatos if frase in self._entradas[pk][1]}
+
+    def _opciones_fuzzy(self):
+        if self._fuzzy is None:
+            nombres = {}
+            for pk, (nombre, norm) in sorted(
+                self._entradas.items(), key=lambda e: (e[1][0], e[0])
+            ):
+                nombres[nombre] = (pk, norm)
+            self._fuzzy = (
+                list(nombres),
+                [ordenar_tokens(norm) for _, norm in nombres.values()],
+                [pk for pk, _ in nombres.values()],
+            )
+        return self._fuzzy
+
+    def fuzzy(self, texto, limite=1, minimo=0):
+        """
+        Equivalente a process.extract(..., scorer=fuzz.token_sort_ratio)
+        pero con las opciones ya tokenizadas y ordenadas.
+        Retorna [(nombre, similitud, pk)]
+        """
+        nombres, opciones, pks = self._opciones_fuzzy()
+        resultados = process.extract(
+            ordenar_tokens(normalizar_texto(texto)),
+            opciones,
+            scorer=fuzz.ratio,
+            limit=limite,
+            score_cutoff=minimo,
+        )
+        return [(nombres[i], similitud, pks[i]) for _, similitud, i in resultados]
+
+    def buscar(self, nombre_busqueda, umbral=60):
+        """
+        Aplica las cinco capas de búsqueda sobre el índice.
+        Retorna: (pk, es_exacto, similitud, sugerencias)
+        """
+        self._asegurar_construido()
+
+        with self._lock:
+            if not self._entradas:
+                return None, False, 0, []
+
+            nombre_limpio = normalizar_texto(nombre_busqueda)
+
+            # ✅ CAPA 1: Búsqueda exacta
+            pks = self.exactos(nombre_limpio)
+            if pks:
+                return self._unico(pks), True, 100, []
+
+            # ✅ CAPA 2: Empieza con... (mayor prioridad)
+            pks = self.con_prefijo(nombre_limpio)
+            if len(pks) == 1:
+                return pks[0], False, 95, []
+            elif len(pks) > 1:
+                return None, False, 90, self._primeros(pks)
+
+            # ✅ CAPA 3: Contiene todas las palabras clave
+            palabras = nombre_limpio.split()
+            if len(palabras) >= 2:
+                claves = [p for p in palabras if len(p) > 2]
+                pks = self.con_palabras(claves) if claves else set()
+                if len(pks) == 1:
+                    return next(iter(pks)), False, 85, []
+                elif len(pks) > 1:
+                    return None, False, 80, self._primeros(pks)
+
+            # ✅ CAPA 4: Contiene la frase (parcial)
+            pks = self.con_frase(nombre_limpio)
+            if len(pks) == 1:
+                return next(iter(pks)), False, 75, []
+            elif len(pks) > 1:
+                return None, False, 70, self._primeros(pks)
+
+            # ✅ CAPA 5: Fuzzy matching (última opción)
+            mejor = self.fuzzy(nombre_limpio, minimo=umbral)
+            if mejor:
+                _, similitud, pk = mejor[0]
+                return pk, False, similitud, []
+
+            # ❌ No se encontró nada - sugerencias generales
+            sugerencias = [nombre for nombre, _, _ in self.fuzzy(nombre_limpio, limite=5, minimo=40)]
+            return None, False, 0, sugerencias
+
+
+indice_productos = IndiceProductos()
@@ -0,0 +1,223 @@
+"""
+Intérprete local (sin LLM) para los mensajes más frecuentes del chat.
+
+Reconoce las mismas intenciones que el prompt de interpretar_mensaje:
+"vendí 3 cuadernos", "stock de tijeras", "más vendidos", "Registrar venta"...
+con números escritos en español. Cada resultado lleva una confianza; por
+debajo de INTERPRETE_LOCAL_CONFIANZA se delega en OpenAI.
+"""
+import re
+
+from apps.companies.models import normalizar_texto
+
+UNIDADES = {
+    "un": 1, "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9,
+}
+ESPECIALES = {
+    "diez": 10, "once": 11, "doce": 12, "trece": 13, "catorce": 14, "quince": 15,
+    "dieciseis": 16, "diecisiete": 17, "dieciocho": 18, "diecinueve": 19,
+    "veinte": 20, "veintiun": 21, "veintiuno": 21, "veintiuna": 21, "veintidos": 22,
+    "veintitres": 23, "veinticuatro": 24, "veinticinco": 25, "veintiseis": 26,
+    "veintisiete": 27, "veintiocho": 28, "veintinueve": 29, "cien": 100,
+    "docena": 12,
+}
+DECENAS = {
+    "treinta": 30, "cuarenta": 40, "cincuenta": 50, "sesenta": 60,
+    "setenta": 70, "ochenta": 80, "noventa": 90,
+}
+NUMEROS = {**UNIDADES, **ESPECIALES, **DECENAS}
+
+# Cantidad al inicio del texto: "3", "tres", "treinta y dos", "una docena de",
+# "media docena de", "un par de"
+_CANTIDAD = re.compile(
+    r"^(?:"
+    r"(?P<digitos>\d+)"
+    r"|(?P<media>media docena)"
+    r"|(?P<par>un par)"
+    r"|(?P<docenas>(?:una|dos|tres|cuatro|cinco) docenas?)"
+    r"|(?P<decena>" + "|".join(DECENAS) + r")(?: y (?P<unidad>" + "|".join(UNIDADES) + r"))?"
+    r"|(?P<palabra>" + "|".join(sorted(NUMEROS, key=len, reverse=True)) + r")"
+    r")\b\s*(?:(?:unidades|unidad|uds?|piezas?|x)\b\s*)?(?:de\s+)?"
+)
+
+# Precio opcional al final: "a $0.50", "por 2 dolares", "a 1,20 c/u"
+_PRECIO = re.compile(
+    r"\s+(?:a|por|en)\s+\$?\s*\d+(?:[.,]\d+)?\s*(?:\$|dolares?|usd|c/u|cada uno|cada una)?\s*$"
+)
+
+# Separador de items en una venta con varios productos; no corta "1,20"
+_SEPARADOR_ITEMS = re.compile(r"\s*(?<!\d),(?!\d)\s*(?:y\s+)?|\s+y\s+")
+
+_ARTICULOS = re.compile(r"^(?:(?:el|la|los|las|del|de|un|una|unos|unas)\s+)+")
+
+_VERBOS_VENTA = re.compile(
+    r"^(?:(?:ya\s+)?(?:vendi|vendimos|vendio|vendieron|se vendio|se vendieron|acabo de vender|"
+    r"acabamos de vender)"
+    r"|(?:registra|registrar|registre|anota|anotar|apunta|agrega|agregar)\s+(?:una\s+|la\s+)?venta(?:\s+de)?"
+    r"|venta\s+de"
+    r"|nueva\s+venta(?:\s+de)?)\s+(?P<resto>.+)$"
+)
+
+_INICIAR_VENTA = re.compile(
+    r"^(?:quiero\s+|necesito\s+|vamos a\s+|voy a\s+)?"
+    r"(?:registrar|hacer|anotar|crear|nueva|agregar)\s*(?:una\s+|la\s+|nueva\s+)?venta$"
+)
+
+_MAS_VENDIDOS = re.compile(
+    r"\b(?:mas vendid[oa]s?|top (?:de )?ventas|lo que mas se vende|"
+    r"(?:que|cuales)\s+(?:productos\s+)?se venden? mas|productos? estrella|mejores ventas)\b"
+)
+
+_LISTAR = re.compile(
+    r"^(?:(?:listar|lista|listame|mostrar|muestrame|ver|dame|quiero ver)\s+(?:la\s+lista\s+de\s+|el\s+|los\s+|todos\s+los\s+|mis\s+)?(?:productos|inventario|catalogo)"
+    r"|(?:lista\s+de\s+)?(?:todos\s+los\s+)?productos"
+    r"|(?:el\s+)?inventario(?:\s+completo)?"
+    r"|(?:que|cuales)\s+productos\s+(?:tengo|hay|tenemos|vendemos)"
+    r"|(?:todo\s+el\s+)?catalogo)"
+    r"(?:\s+(?:registrados|disponibles|activos|completo|por favor))*$"
+)
+
+_CONSULTAR = re.compile(
+    r"^(?:"
+    r"(?:cual es el\s+|que\s+)?(?:stock|precio|info|informacion|existencias?|detalles?|datos|inventario)"
+    r"(?:\s+(?:actual|disponible))?\s+(?:de|del|de la|de los|de las|para)\s+(?P<p1>.+)"
+    r"|cuanto (?:cuesta|cuestan|vale|valen|sale|salen)\s+(?P<p2>.+)"
+    r"|cuant[oa]s\s+(?P<p3>.+?)\s+(?:hay|quedan|tengo|tenemos|me quedan|nos quedan)"
+    r"|(?:cuant[oa]s\s+)?(?:hay|quedan)\s+(?:de\s+)?(?P<p4>.+?)(?:\s+en stock)?"
+    r"|(?:consultar|consulta|buscar|busca|mostrar|muestrame|ver)\s+(?:el\s+producto\s+|producto\s+)?(?P<p5>.+)"
+    r")$"
+)
+
+# Palabras que indican algo que el intérprete local no sabe resolver
+_AMBIGUO = re.compile(
+    r"(?:,|\sy\s|\so\s|\bpero\b|\bno\b|\bayer\b|\bdevolv|\bdevuel|\bcancel(?:a|ar|o)\b|"
+    r"\bborr(?:a|ar|e)\b|\belimin(?:a|ar|e)\b)"
+)
+
+_PALABRAS_GENERICAS = {
+    "producto", "productos", "algo", "cosas", "eso", "esto", "todo", "todos",
+    "de", "del", "el", "la", "los", "las", "un", "una", "uno",
+}
+
+# Cantidades mayores se envían al LLM (probablemente un error de tipeo)
+CANTIDAD_MAXIMA = 10000
+
+# Confianza de una venta sin cantidad explícita: por debajo del umbral por
+# defecto (INTERPRETE_LOCAL_CONFIANZA), así la resuelve el LLM
+CONFIANZA_DUDOSA = 0.5
+
+
+def _limpiar(mensaje):
+    texto = normalizar_texto(mensaje)
+    texto = re.sub(r"[¿?¡!\"“”]", " ", texto)
+    texto = re.sub(r"\s*[.;:]+\s*$", "", texto)
+    texto = re.sub(r"^(?:hola|buenas|buenos dias|buenas tardes|oye|por favor)[\s,]+", "", texto)
+    texto = re.sub(r"[\s,]+por favor$", "", texto)
+    return " ".join(texto.split())
+
+
+def _extraer_cantidad(texto):
+    """Retorna (cantidad, resto) o (None, texto) si no empieza con cantidad"""
+    match = _CANTIDAD.match(texto)
+    if not match:
+        return None, texto
+
+    if match.group("digitos"):
+        cantidad = int(match.group("digitos"))
+    elif match.group("media"):
+        cantidad = 6
+    elif match.group("par"):
+        cantidad = 2
+    elif match.group("docenas"):
+        cantidad = 12 * NUMEROS[match.group("docenas").split()[0]]
+    elif match.group("decena"):
+        cantidad = DECENAS[match.group("decena")] + UNIDADES.get(match.group("unidad") or "", 0)
+    else:
+        cantidad = NUMEROS[match.group("palabra")]
+
+    resto = texto[match.end():].strip()
+    return cantidad, resto
+
+
+def _producto(texto):
+    """Limpia la mención de producto; None si no parece un producto"""
+    texto = _PRECIO.sub("", texto)
+    texto = _ARTICULOS.sub("", texto).strip(" .,")
+    if not texto or texto in _PALABRAS_GENERICAS:
+        return None
+    if len(texto.split()) > 6 or _AMBIGUO.search(f" {texto} "):
+        return None
+    return texto
+
+
+def _items(texto):
+    """
+    Varios productos en una venta: "3 cuadernos, 2 boligrafos y una regla".
+    Cada parte debe tener cantidad y producto; si no, retorna None.
+    """
+    partes = _SEPARADOR_ITEMS.split(texto)
+    if len(partes) < 2:
+        return None
+
+    items = []
+    for parte in partes:
+        cantidad, resto = _extraer_cantidad(parte)
+        producto = _producto(resto)
+        if cantidad is None or not producto or not 0 < cantidad <= CANTIDAD_MAXIMA:
+            return None
+        items.append({"producto": producto, "cantidad": cantidad})
+    return items
+
+
+def interpretar_local(mensaje):
+    """
+    Retorna (data, confianza). data tiene el mismo formato que la
+    respuesta del LLM: {"accion", "producto", "cantidad"} y "items" en
+    las ventas de varios productos.
+    """
+    texto = _limpiar(mensaje)
+    if not texto:
+        return None, 0.0
+
+    if _INICIAR_VENTA.match(texto):
+        return {"accion": "iniciar_registro_venta", "producto": None, "cantidad": None}, 1.0
+
+    venta = _VERBOS_VENTA.match(texto)
+    if venta:
+        items = _items(venta.group("resto"))
+        if items:
+            return {
+                "accion": "registrar_venta",
+                "producto": None,
+                "cantidad": None,
+                "items": items,
+            }, 0.9
+
+        cantidad, resto = _extraer_cantidad(venta.group("resto"))
+        producto = _producto(resto)
+        if not producto:
+            return None, 0.2
+        if cantidad is not None and not 0 < cantidad <= CANTIDAD_MAXIMA:
+            return None, 0.2
+        data = {"accion": "registrar_venta", "producto": producto, "cantidad": cantidad}
+        if cantidad is None or re.search(r"\d", producto):
+            # Sin cantidad al inicio ("vendi cuadernos x 3", "3x cuadernos",
+            # "venta de hoy"): registrar 1 unidad sería adivinar, decide el LLM
+            return data, CONFIANZA_DUDOSA
+        return data, 0.95
+
+    if _MAS_VENDIDOS.search(texto) and not _AMBIGUO.search(f" {texto} "):
+        return {"accion": "productos_mas_vendidos", "producto": None, "cantidad": None}, 0.95
+
+    if _LISTAR.match(texto):
+        return {"accion": "listar_productos", "producto": None, "cantidad": None}, 0.95
+
+    consulta = _CONSULTAR.match(texto)
+    if consulta:
+        mencion = next(g for g in consulta.groups() if g)
+        producto = _producto(mencion)
+        if producto:
+            return {"accion": "consultar_producto", "producto": producto, "cantidad": None}, 0.9
+
+    return None, 0.0
@@ -0,0 +1,298 @@
+"""
+Backends de LLM para interpretar mensajes del chat.
+
+El backend se elige con LLM_BACKEND:
+- "openai": API de OpenAI (o compatible vía LLM_BASE_URL, p. ej. el
+  ServidorLLMStub de llm_stub para pruebas de carga por HTTP)
+- "local": determinista y en proceso, sin red (CI y pruebas de carga)
+- o la ruta de una clase propia ("paquete.modulo.MiBackend")
+
+Los clientes se construyen de forma perezosa en la primera llamada, así
+importar el módulo no requiere OPENAI_API_KEY. Cada llamada tiene un plazo
+total (LLM_TIMEOUT) que incluye los reintentos (LLM_REINTENTOS).
+"""
+import asyncio
+import logging
+import threading
+import time
+import weakref
+from collections import namedtuple
+
+import httpx
+import openai
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# tokens_cache: tokens del prompt que el proveedor sirvió desde su caché
+RespuestaLLM = namedtuple(
+    "RespuestaLLM",
+    ["contenido", "tokens_prompt", "tokens_respuesta", "tokens_cache"],
+    defaults=[0],
+)
+
+BACKENDS = {
+    "openai": "apps.chatbot.services.llm.BackendOpenAI",
+    "local": "apps.chatbot.services.llm.BackendLocal",
+}
+
+# Errores transitorios que vale la pena reintentar
+_REINTENTABLES = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class ErrorLLM(Exception):
+    """El LLM no respondió dentro del plazo o devolvió un error"""
+
+
+class BackendLLM:
+    """Interfaz común: completar() y acompletar() reciben los mensajes del chat"""
+
+    def __init__(self, modelo=None):
+        self.modelo = modelo or getattr(settings, "LLM_MODELO", "gpt-4o-mini")
+
+    def completar(self, mensajes):
+        raise NotImplementedError
+
+    async def acompletar(self, mensajes):
+        raise NotImplementedError
+
+    def cerrar(self):
+        pass
+
+
+class BackendLocal(BackendLLM):
+    """
+    Responde en proceso con el intérprete local (mismo formato JSON que el
+    modelo). LLM_LOCAL_LATENCIA simula el tiempo de respuesta del proveedor.
+    """
+
+    def __init__(self, modelo=None, latencia=None):
+        super().__init__(modelo)
+        if latencia is None:
+            latencia = getattr(settings, "LLM_LOCAL_LATENCIA", 0.0)
+        self.latencia = latencia
+
+    def _responder(self, mensajes):
+        from .llm_stub import responder
+
+        contenido = responder(mensajes)
+        tokens_prompt = sum(len(m.get("content") or "") for m in mensajes) // 4
+        return RespuestaLLM(contenido, tokens_prompt, len(contenido) // 4)
+
+    def completar(self, mensajes):
+        if self.latencia:
+            time.sleep(self.latencia)
+        return self._responder(mensajes)
+
+    async def acompletar(self, mensajes):
+        if self.latencia:
+            await asyncio.sleep(self.latencia)
+        return self._responder(mensajes)
+
+
+class BackendOpenAI(BackendLLM):
+    """
+    Cliente OpenAI con pool de conexiones httpx compartido, plazo por
+    llamada y reintentos acotados.
+    """
+
+    def __init__(self, modelo=None, api_key=None, base_url=None, timeout=None,
+                 timeout_conexion=None, reintentos=None, max_conexiones=None):
+        super().__init__(modelo)
+        self.api_key = api_key or getattr(settings, "OPENAI_API_KEY", "")
+        self.base_url = base_url or getattr(settings, "LLM_BASE_URL", None) or None
+        self.timeout = timeout or getattr(settings, "LLM_TIMEOUT", 15.0)
+        self.timeout_conexion = timeout_conexion or getattr(settings, "LLM_TIMEOUT_CONEXION", 3.0)
+        self.reintentos = reintentos if reintentos is not None else getattr(settings, "LLM_REINTENTOS", 2)
+        self.max_conexiones = max_conexiones or getattr(settings, "LLM_MAX_CONEXIONES", 20)
+        self._lock = threading.Lock()
+        self._cliente = None
+        self._ssl = None
+        # Un cliente async por event loop persistente (las conexiones del pool
+        # no pueden compartirse entre loops); ver _loop_persistente()
+        self._clientes_async = weakref.WeakKeyDictionary()
+
+    def _opciones(self):
+        if not self.api_key:
+            raise ErrorLLM("OPENAI_API_KEY no está configurada")
+        return {
+            "api_key": self.api_key,
+            "base_url": self.base_url,
+            # Los reintentos se hacen en completar()/acompletar() dentro del plazo
+            "max_retries": 0,
+        }
+
+    def _limites(self):
+        return httpx.Limits(
+            max_connections=self.max_conexiones,
+            max_keepalive_connections=self.max_conexiones,
+        )
+
+    def cliente(self):
+        with self._lock:
+            if self._cliente is None:
+                self._cliente = openai.OpenAI(
+                    http_client=openai.DefaultHttpxClient(limits=self._limites()),
+                    **self._opciones(),
+                )
+            return self._cliente
+
+    def _contexto_ssl(self):
+        # Cargar los certificados cuesta ~40 ms: se hace una vez por backend
+        with self._lock:
+            if self._ssl is None:
+                self._ssl = httpx.create_ssl_context()
+            return self._ssl
+
+    def _nuevo_cliente_async(self):
+        return openai.AsyncOpenAI(
+            http_client=openai.DefaultAsyncHttpxClient(limits=self._limites(), verify=self._contexto_ssl()),
+            **self._opciones(),
+        )
+
+    @staticmethod
+    def _loop_persistente():
+        """
+        Los servidores ASGI corren su event loop en el hilo principal durante
+        toda la vida del proceso. async_to_sync (vistas async bajo WSGI,
+        pruebas) crea en otro hilo un loop por llamada que se cierra al
+        terminar: un pool ligado a ese loop no se reutilizaría nunca.
+        """
+        return threading.current_thread() is threading.main_thread()
+
+    def cliente_async(self):
+        """Cliente del loop actual, compartido mientras el loop viva"""
+        loop = asyncio.get_running_loop()
+        cliente = self._clientes_async.get(loop)
+        if cliente is None:
+            cliente = self._clientes_async[loop] = self._nuevo_cliente_async()
+        return cliente
+
+    def _timeout(self, restante):
+        return httpx.Timeout(restante, connect=min(self.timeout_conexion, restante))
+
+    def _espera(self, intento, restante):
+        """Backoff exponencial corto; None si ya no queda plazo para reintentar"""
+        espera = min(0.25 * 2 ** intento, 2.0)
+        if intento >= self.reintentos or espera >= restante:
+            return None
+        return espera
+
+    def _respuesta(self, response):
+        uso = response.usage
+        detalles = getattr(uso, "prompt_tokens_details", None)
+        return RespuestaLLM(
+            response.choices[0].message.content,
+            uso.prompt_tokens if uso else 0,
+            uso.completion_tokens if uso else 0,
+            (getattr(detalles, "cached_tokens", None) or 0) if detalles else 0,
+        )
+
+    def completar(self, mensajes):
+        cliente = self.cliente()
+        limite = time.monotonic() + self.timeout
+        intento = 0
+        while True:
+            restante = limite - time.monotonic()
+            try:
+                response = cliente.chat.completions.create(
+                    model=self.modelo,
+                    messages=mensajes,
+                    timeout=self._timeout(restante),
+                )
+                return self._respuesta(response)
+            except _REINTENTABLES as e:
+                espera = self._espera(intento, limite - time.monotonic())
+                if espera is None:
+                    raise ErrorLLM(f"LLM no disponible tras {intento + 1} intentos: {e}") from e
+                time.sleep(espera)
+                intento += 1
+            except openai.OpenAIError as e:
+                raise ErrorLLM(str(e)) from e
+
+    async def acompletar(self, mensajes):
+        if self._loop_persistente():
+            return await self._acompletar(self.cliente_async(), mensajes)
+        # Loop de una sola llamada: cliente propio que se cierra al terminar
+        cliente = self._nuevo_cliente_async()
+        try:
+            return await self._acompletar(cliente, mensajes)
+        finally:
+            await cliente.close()
+
+    async def _acompletar(self, cliente, mensajes):
+        limite = time.monotonic() + self.timeout
+        intento = 0
+        while True:
+            restante = limite - time.monotonic()
+            try:
+                response = await asyncio.wait_for(
+                    cliente.chat.completions.create(
+                        model=self.modelo,
+                        messages=mensajes,
+                        timeout=self._timeout(restante),
+                    ),
+                    timeout=restante,
+                )
+                return self._respuesta(response)
+            except (asyncio.TimeoutError, *_REINTENTABLES) as e:
+                espera = self._espera(intento, limite - time.monotonic())
+                if espera is None:
+                    raise ErrorLLM(f"LLM no disponible tras {intento + 1} intentos: {e!r}") from e
+                await asyncio.sleep(espera)
+                intento += 1
+            except openai.OpenAIError as e:
+                raise ErrorLLM(str(e)) from e
+
+    def cerrar(self):
+        with self._lock:
+            if self._cliente is not None:
+                self._cliente.close()
+                self._cliente = None
+            clientes_async = list(self._clientes_async.items())
+            self._clientes_async = weakref.WeakKeyDictionary()
+        # Cada cliente async se cierra en su propio loop
+        for loop, cliente in clientes_async:
+            if loop.is_closed():
+                continue
+            if loop.is_running():
+                loop.call_soon_threadsafe(loop.create_task, cliente.close())
+            else:
+                loop.run_until_complete(cliente.close())
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def obtener_backend():
+    """Backend configurado en LLM_BACKEND (se construye una sola vez)"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            nombre = getattr(settings, "LLM_BACKEND", "openai")
+            _backend = import_string(BACKENDS.get(nombre, nombre))()
+        return _backend
+
+
+def reiniciar_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.cerrar()
+        _backend = None
+
+
+@receiver(setting_changed)
+def _configuracion_cambiada(sender, setting, **kwargs):
+    # override_settings en pruebas
+    if setting.startswith("LLM_") or setting == "OPENAI_API_KEY":
+        reiniciar_backend()
@@ -0,0 +1,143 @@
+"""
+Servidor LLM local compatible con la API de OpenAI (/v1/chat/completions).
+
+Responde de forma determinista usando el intérprete local, con una
+latencia configurable. Sirve para pruebas de concurrencia y de carga sin
+red ni costo de tokens:
+
+    with ServidorLLMStub(latencia=0.3) as servidor:
+        cliente = OpenAI(api_key="stub", base_url=servidor.url)
+"""
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .interprete_local import interpretar_local
+
+def _texto_usuario(mensajes):
+    """El mensaje del usuario es el último mensaje "user" (ver prompts.py)"""
+    contenido = ""
+    for mensaje in mensajes:
+        if mensaje.get("role") == "user":
+            contenido = mensaje.get("content") or ""
+    return contenido
+
+
+def responder(mensajes):
+    """Contenido (JSON de intención) que devolvería el modelo"""
+    data, _ = interpretar_local(_texto_usuario(mensajes))
+    return json.dumps(data or {"accion": "pedir_aclaracion", "producto": None, "cantidad": None})
+
+
+class _Handler(BaseHTTPRequestHandler):
+    servidor_stub = None  # asignado por ServidorLLMStub
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload):
+        cuerpo = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "Ruta no soportada por el stub"}})
+            return
+
+        largo = int(self.headers.get("Content-Length") or 0)
+        try:
+            peticion = json.loads(self.rfile.read(largo) or b"{}")
+        except json.JSONDecodeError:
+            self._json(400, {"error": {"message": "JSON inválido"}})
+            return
+
+        stub = self.servidor_stub
+        stub._entrar()
+        try:
+            if stub.latencia:
+                time.sleep(stub.latencia)
+            mensajes = peticion.get("messages") or []
+            contenido = responder(mensajes)
+        finally:
+            stub._salir()
+
+        tokens_prompt = sum(len(m.get("content") or "") for m in mensajes) // 4
+        tokens_respuesta = len(contenido) // 4
+        self._json(200, {
+            "id": f"chatcmpl-stub-{stub.peticiones}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": peticion.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": contenido},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": tokens_prompt,
+                "completion_tokens": tokens_respuesta,
+                "total_tokens": tokens_prompt + tokens_respuesta,
+            },
+        })
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # El backlog por defecto (5) descarta conexiones bajo carga concurrente
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # El cliente cortó la conexión (timeout): no es un error del stub
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class ServidorLLMStub:
+    """Servidor HTTP en un hilo; `url` es el base_url para el cliente OpenAI"""
+
+    def __init__(self, latencia=0.0, host="127.0.0.1", puerto=0):
+        self.latencia = latencia
+        self.peticiones = 0
+        self.en_curso = 0
+        self.max_en_curso = 0
+        self._lock = threading.Lock()
+        handler = type("Handler", (_Handler,), {"servidor_stub": self})
+        self._httpd = _HTTPServer((host, puerto), handler)
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self._httpd.server_address[:2]
+        return f"http://{host}:{puerto}/v1"
+
+    def _entrar(self):
+        with self._lock:
+            self.peticiones += 1
+            self.en_curso += 1
+            self.max_en_curso = max(self.max_en_curso, self.en_curso)
+
+    def _salir(self):
+        with self._lock:
+            self.en_curso -= 1
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
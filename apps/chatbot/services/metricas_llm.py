@@ -0,0 +1,79 @@
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Latencias recientes que se guardan por acción para los percentiles
+MUESTRAS_LATENCIA = 500
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p * len(ordenados)))]
+
+
+class MetricasLLM:
+    """
+    Contabilidad por acción de las llamadas al LLM: tokens de prompt
+    (y cuántos vinieron de la caché del proveedor), tokens de respuesta y
+    latencia. Los contadores son por proceso.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._por_accion = {}
+
+    def registrar(self, accion, respuesta, latencia):
+        """respuesta: RespuestaLLM; latencia en segundos"""
+        accion = accion or "invalida"
+        with self._lock:
+            datos = self._por_accion.get(accion)
+            if datos is None:
+                datos = self._por_accion[accion] = {
+                    "llamadas": 0,
+                    "tokens_prompt": 0,
+                    "tokens_cache": 0,
+                    "tokens_respuesta": 0,
+                    "latencia_total": 0.0,
+                    "latencias": deque(maxlen=MUESTRAS_LATENCIA),
+                }
+            datos["llamadas"] += 1
+            datos["tokens_prompt"] += respuesta.tokens_prompt
+            datos["tokens_cache"] += respuesta.tokens_cache
+            datos["tokens_respuesta"] += respuesta.tokens_respuesta
+            datos["latencia_total"] += latencia
+            datos["latencias"].append(latencia)
+
+        logger.info(
+            "LLM accion=%s tokens_prompt=%d tokens_cache=%d tokens_respuesta=%d latencia_ms=%.0f",
+            accion, respuesta.tokens_prompt, respuesta.tokens_cache,
+            respuesta.tokens_respuesta, latencia * 1000,
+        )
+
+    def resumen(self):
+        """{accion: {llamadas, tokens..., latencia_media, latencia_p95}}"""
+        with self._lock:
+            resultado = {}
+            for accion, datos in self._por_accion.items():
+                llamadas = datos["llamadas"]
+                resultado[accion] = {
+                    "llamadas": llamadas,
+                    "tokens_prompt": datos["tokens_prompt"],
+                    "tokens_cache": datos["tokens_cache"],
+                    "tokens_respuesta": datos["tokens_respuesta"],
+                    "tokens_prompt_medio": datos["tokens_prompt"] / llamadas,
+                    "tokens_respuesta_medio": datos["tokens_respuesta"] / llamadas,
+                    "latencia_media": datos["latencia_total"] / llamadas,
+                    "latencia_p95": _percentil(datos["latencias"], 0.95),
+                }
+            return resultado
+
+    def limpiar(self):
+        with self._lock:
+            self._por_accion.clear()
+
+
+metricas_llm = MetricasLLM()
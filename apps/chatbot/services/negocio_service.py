@@ -1,298 +1,288 @@
-from apps.companies.models import Producto, Venta, ItemVenta
-from django.db.models import Sum, Q
-from decimal import Decimal
-from rapidfuzz import fuzz, process
+from apps.companies.models import Producto, PronosticoDemanda, SugerenciaReposicion
+from apps.companies.ventas import StockInsuficiente, registrar_venta
+from django.conf import settings
+from . import busqueda_db
+from .indice_productos import indice_productos
+
+
+def _planificacion(producto):
+    """
+    Demanda pronosticada (pronosticar_demanda) y punto de reorden
+    (calcular_reposicion) del producto, si ya se calcularon
+    """
+    datos = {}
+    try:
+        pronostico = producto.pronostico
+    except PronosticoDemanda.DoesNotExist:
+        pass
+    else:
+        cobertura = pronostico.dias_cobertura
+        datos.update({
+            "demanda_pronosticada": round(pronostico.demanda_horizonte, 1),
+            "horizonte_dias": pronostico.horizonte_dias,
+            "dias_cobertura": int(cobertura) if cobertura is not None else None,
+        })
+    try:
+        reposicion = producto.reposicion
+    except SugerenciaReposicion.DoesNotExist:
+        pass
+    else:
+        datos.update({
+            "punto_reorden": reposicion.punto_reorden,
+            "cantidad_sugerida": reposicion.cantidad_sugerida,
+        })
+    return datos
+
+
+def _buscador():
+    if getattr(settings, 'CATALOGO_BUSQUEDA', 'memoria') == 'db':
+        return busqueda_db.buscar
+    return indice_productos.buscar
+
 
 def buscar_producto_inteligente(nombre_busqueda, umbral=60):
     """
     Búsqueda inteligente multicapa con autocompletado
     Retorna: (producto, es_exacto, similitud, sugerencias)
+
+    Las cinco capas (exacta, prefijo, palabras clave, frase parcial y
+    fuzzy) se resuelven según CATALOGO_BUSQUEDA:
+    - "memoria": índice en memoria del catálogo (sin consultas)
+    - "db": índices trigram (PostgreSQL) / FTS5 (SQLite), para catálogos
+      demasiado grandes para tenerlos en cada proceso
+    Después se carga el producto encontrado por su clave primaria.
     """
-    if not nombre_busqueda:
-        return None, False, 0, []
-    
-    nombre_limpio = nombre_busqueda.strip().lower()
-    productos = Producto.objects.filter(activo=True)
-    
-    if not productos.exists():
-        return None, False, 0, []
-    
-    # ✅ CAPA 1: Búsqueda exacta
-    producto_exacto = productos.filter(nombre__iexact=nombre_busqueda).first()
-    if producto_exacto:
-        return producto_exacto, True, 100, []
-    
-    # ✅ CAPA 2: Empieza con... (mayor prioridad)
-    productos_comienzan = productos.filter(nombre__istartswith=nombre_busqueda)
-    if productos_comienzan.count() == 1:
-        return productos_comienzan.first(), False, 95, []
-    elif productos_comienzan.count() > 1:
-        # Múltiples coincidencias - devolver sugerencias
-        sugerencias = [p.nombre for p in productos_comienzan[:5]]
-        return None, False, 90, sugerencias
-    
-    # ✅ CAPA 3: Contiene todas las palabras clave
-    palabras = nombre_limpio.split()
-    if len(palabras) >= 2:
-        # Buscar productos que contengan TODAS las palabras
-        q_objects = Q()
-        for palabra in palabras:
-            if len(palabra) > 2:  # Ignorar palabras muy cortas
-                q_objects &= Q(nombre__icontains=palabra)
-        
-        productos_palabras = productos.filter(q_objects)
-        if productos_palabras.count() == 1:
-            return productos_palabras.first(), False, 85, []
-        elif productos_palabras.count() > 1:
-            sugerencias = [p.nombre for p in productos_palabras[:5]]
-            return None, False, 80, sugerencias
-    
-    # ✅ CAPA 4: Contiene la frase (parcial)
-    productos_contienen = productos.filter(nombre__icontains=nombre_busqueda)
-    if productos_contienen.count() == 1:
-        return productos_contienen.first(), False, 75, []
-    elif productos_contienen.count() > 1:
-        sugerencias = [p.nombre for p in productos_contienen[:5]]
-        return None, False, 70, sugerencias
-    
-    # ✅ CAPA 5: Fuzzy matching (última opción)
-    nombres_productos = {p.nombre: p for p in productos}
-    resultado = process.extractOne(
-        nombre_busqueda,
-        nombres_productos.keys(),
-        scorer=fuzz.token_sort_ratio
-    )
-    
-    if resultado and resultado[1] >= umbral:
-        nombre_match, similitud, _ = resultado
-        return nombres_productos[nombre_match], False, similitud, []
-    
-    # ❌ No se encontró nada - intentar sugerencias generales
-    resultados_fuzzy = process.extract(
-        nombre_busqueda,
-        nombres_productos.keys(),
-        scorer=fuzz.token_sort_ratio,
-        limit=5
-    )
-    
-    sugerencias = [r[0] for r in resultados_fuzzy if r[1] >= 40]
-    
-    return None, False, 0, sugerencias
+    return buscar_productos_inteligente([nombre_busqueda], umbral=umbral)[0]
+
+
+def buscar_productos_inteligente(nombres, umbral=60):
+    """
+    Igual que buscar_producto_inteligente para varios nombres a la vez:
+    los productos encontrados se cargan en una sola consulta.
+    Retorna una lista de (producto, es_exacto, similitud, sugerencias).
+    """
+    buscar = _buscador()
+    resultados = [None] * len(nombres)
+    pendientes = [i for i, nombre in enumerate(nombres) if nombre]
+    for i, nombre in enumerate(nombres):
+        if not nombre:
+            resultados[i] = (None, False, 0, [])
+
+    for _ in range(2):
+        busquedas = {i: buscar(nombres[i], umbral=umbral) for i in pendientes}
+        pks = {pk for pk, _, _, _ in busquedas.values() if pk is not None}
+        productos = (
+            Producto.objects
+            # _planificacion y necesita_reposicion leen pronóstico y reposición
+            .select_related('categoria', 'pronostico', 'reposicion')
+            .filter(activo=True)
+            .in_bulk(pks)
+        ) if pks else {}
+
+        obsoletos = []
+        for i, (pk, es_exacto, similitud, sugerencias) in busquedas.items():
+            if pk is None:
+                resultados[i] = (None, es_exacto, similitud, sugerencias)
+            elif pk in productos:
+                resultados[i] = (productos[pk], es_exacto, similitud, sugerencias)
+            else:
+                obsoletos.append(i)
+
+        if not obsoletos:
+            return resultados
+
+        # El producto se desactivó/eliminó desde otro proceso: índice obsoleto
+        indice_productos.invalidar()
+        pendientes = obsoletos
+
+    for i in pendientes:
+        resultados[i] = (None, False, 0, [])
+    return resultados
+
+
+def _cantidad(valor):
+    """Cantidad entera de un item (1 si no se indicó); None si no es un entero"""
+    if valor is None:
+        return 1
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, int):
+        return valor
+    if isinstance(valor, float):
+        return int(valor) if valor.is_integer() else None
+    if isinstance(valor, str) and valor.strip().isdigit():
+        return int(valor.strip())
+    return None
+
+
+def _items_venta(data):
+    """
+    Items de la intención: lista "items" o el par producto/cantidad.
+    La cantidad queda en None si no se pudo interpretar como entero.
+    """
+    items = data.get("items")
+    if not items:
+        items = [{"producto": data.get("producto"), "cantidad": data.get("cantidad")}]
+
+    return [
+        (item.get("producto") or "", _cantidad(item.get("cantidad")))
+        for item in items
+        if isinstance(item, dict)
+    ]
+
+
+def _texto(texto):
+    return {"tipo": "texto", "texto": texto}
+
+
+def _problema(nombre_producto, sugerencias):
+    """Producto ambiguo (con sugerencias) o no encontrado (sin sugerencias)"""
+    return {"busqueda": nombre_producto, "sugerencias": list(sugerencias)}
+
+
+def listado_productos(pagina=1):
+    """
+    Página del listado de productos activos: filas compactas
+    [nombre, stock, precio] y datos de paginación.
+    """
+    por_pagina = getattr(settings, 'CHAT_LISTADO_POR_PAGINA', 25)
+    productos = Producto.objects.filter(activo=True).order_by('nombre', 'pk')
+    total = productos.count()
+    paginas = max(1, -(-total // por_pagina))
+    pagina = min(max(1, pagina), paginas)
+    inicio = (pagina - 1) * por_pagina
+
+    filas = productos.values_list('nombre', 'stock_actual', 'precio_venta')[inicio:inicio + por_pagina]
+    return {
+        "tipo": "listado_productos",
+        "productos": [[nombre, stock, str(precio)] for nombre, stock, precio in filas],
+        "pagina": pagina,
+        "paginas": paginas,
+        "total": total,
+    }
 
 
 def ejecutar_accion(data):
+    """
+    Ejecuta la intención y retorna un resultado estructurado
+    {"tipo": ..., ...datos} que se guarda tal cual en MensajeChat.datos
+    y se convierte a HTML al mostrarlo (ver services/respuestas.py).
+    """
     accion = data.get("accion")
 
     # 🆕 INICIAR FLUJO DE REGISTRO
     if accion == "iniciar_registro_venta":
-        return (
+        return _texto(
             "📝 Perfecto, vamos a registrar una venta.\n\n"
             "¿Qué producto vendiste y cuántas unidades?\n\n"
             "Ejemplo: 'Vendí 3 cuadernos' o '2 lapiceros a $0.50'"
         )
 
-    # 🛒 REGISTRAR VENTA
+    # 🛒 REGISTRAR VENTA (uno o varios productos)
     if accion == "registrar_venta":
-        nombre_producto = data.get("producto", "")
-        producto, es_exacto, similitud, sugerencias = buscar_producto_inteligente(nombre_producto)
+        items = _items_venta(data)
+        if not items:
+            return _texto("🤔 ¿Qué producto vendiste y cuántas unidades?")
+        # Una cantidad ilegible ("tres y media", "2.5") no se adivina
+        if any(cantidad is None for _, cantidad in items):
+            return _texto("🤔 No entendí la cantidad. ¿Cuántas unidades (número entero) vendiste?")
 
-        # Si hay múltiples sugerencias, mostrarlas
-        if not producto and sugerencias:
-            respuesta = f"🔍 Encontré varios productos similares a '{nombre_producto}':\n\n"
-            for i, sugerencia in enumerate(sugerencias, 1):
-                respuesta += f"{i}. {sugerencia}\n"
-            respuesta += "\n💡 Por favor, especifica cuál producto quieres registrar."
-            return respuesta
+        encontrados = buscar_productos_inteligente([nombre for nombre, _ in items])
 
-        if not producto:
-            return f"❌ No encontré ningún producto similar a '{nombre_producto}'"
+        # Si algún producto no se pudo identificar, no se registra nada
+        problemas = [
+            _problema(nombre_producto, sugerencias)
+            for (nombre_producto, _), (producto, _, _, sugerencias) in zip(items, encontrados)
+            if not producto
+        ]
+        if problemas:
+            return {"tipo": "sugerencias", "objetivo": "registrar", "problemas": problemas}
+
+        lineas = [(producto, cantidad) for (_, cantidad), (producto, _, _, _) in zip(items, encontrados)]
 
-        cantidad = data.get("cantidad", 1)
+        if any(cantidad < 1 for _, cantidad in lineas):
+            return _texto("⚠️ La cantidad debe ser mayor a cero.")
 
-        if producto.stock_actual < cantidad:
-            return (
-                f"⚠️ Stock insuficiente de {producto.nombre}.\n"
-                f"Disponible: {producto.stock_actual}"
+        try:
+            venta = registrar_venta(lineas)
+        except StockInsuficiente as e:
+            return _texto(
+                f"⚠️ Stock insuficiente de {e.producto.nombre}.\n"
+                f"Disponible: {e.disponible}"
             )
 
-        # ✅ Crear la venta
-        venta = Venta.objects.create()
-        
-        ItemVenta.objects.create(
-            venta=venta,
-            producto=producto,
-            cantidad=cantidad,
-            precio_unitario=producto.precio_venta,
-            costo_unitario=producto.precio_compra
-        )
-        
-        venta.calcular_total()
-        
-        producto.stock_actual -= cantidad
-        producto.save()
-
-        respuesta = f"✅ Venta registrada por ${venta.total}\n"
-        respuesta += f"📦 Stock actual de {producto.nombre}: {producto.stock_actual}"
-        
-        if not es_exacto and similitud < 100:
-            respuesta += f"\n\n💡 (Encontré: {producto.nombre})"
-        
-        return respuesta
+        productos_venta = {}
+        for producto, cantidad in lineas:
+            productos_venta.setdefault(producto.pk, [producto, 0])[1] += cantidad
+
+        aproximados = [
+            producto.nombre
+            for producto, es_exacto, similitud, _ in encontrados
+            if not es_exacto and similitud < 100
+        ]
+        return {
+            "tipo": "venta",
+            "total": str(venta.total),
+            "items": [
+                [producto.nombre, cantidad, producto.stock_actual]
+                for producto, cantidad in productos_venta.values()
+            ],
+            "aproximados": list(dict.fromkeys(aproximados)),
+        }
 
     # 📦 CONSULTAR UN PRODUCTO ESPECÍFICO
     if accion == "consultar_producto":
         nombre_producto = data.get("producto", "")
         producto, es_exacto, similitud, sugerencias = buscar_producto_inteligente(nombre_producto)
 
-        # Si hay múltiples sugerencias, mostrarlas
-        if not producto and sugerencias:
-            respuesta = f"🔍 Encontré varios productos similares a '{nombre_producto}':\n\n"
-            respuesta += "<ul style='margin:8px 0; padding-left:20px;'>"
-            for sugerencia in sugerencias:
-                respuesta += f"<li>{sugerencia}</li>"
-            respuesta += "</ul>"
-            respuesta += "<em>💡 Por favor, especifica cuál producto quieres consultar.</em>"
-            return respuesta
-
         if not producto:
-            return f"❌ No encontré ningún producto similar a '{nombre_producto}'"
-
-        # Calcular total vendido
-        total_vendido = producto.ventas.aggregate(
-            total=Sum('cantidad')
-        )['total'] or 0
-
-        respuesta = ""
-        if not es_exacto and similitud < 100:
-            respuesta += f"💡 <em>Encontré: <strong>{producto.nombre}</strong></em><br><br>"
-        
-        respuesta += f"""
-        <strong>📦 {producto.nombre}</strong>
-        <table style="width:100%; border-collapse: collapse; margin-top:8px;">
-            <tr>
-                <td style="padding:6px; border:1px solid #ddd; font-weight:bold;">💰 Precio de venta</td>
-                <td style="padding:6px; border:1px solid #ddd;">${producto.precio_venta}</td>
-            </tr>
-            <tr>
-                <td style="padding:6px; border:1px solid #ddd; font-weight:bold;">📊 Stock actual</td>
-                <td style="padding:6px; border:1px solid #ddd;">{producto.stock_actual} unidades</td>
-            </tr>
-            <tr>
-                <td style="padding:6px; border:1px solid #ddd; font-weight:bold;">⚠️ Stock mínimo</td>
-                <td style="padding:6px; border:1px solid #ddd;">{producto.stock_minimo} unidades</td>
-            </tr>
-            <tr>
-                <td style="padding:6px; border:1px solid #ddd; font-weight:bold;">🔥 Total vendido</td>
-                <td style="padding:6px; border:1px solid #ddd;">{total_vendido} unidades</td>
-            </tr>
-            <tr>
-                <td style="padding:6px; border:1px solid #ddd; font-weight:bold;">📁 Categoría</td>
-                <td style="padding:6px; border:1px solid #ddd;">{producto.categoria.nombre}</td>
-            </tr>
-        </table>
-        """
-        
-        if producto.necesita_reposicion:
-            respuesta += "\n\n⚠️ <strong>¡Atención!</strong> Este producto necesita reposición"
-        
-        return respuesta
-
-    # 🔥 PRODUCTOS MÁS VENDIDOS (AHORA CON TABLA)
+            return {
+                "tipo": "sugerencias",
+                "objetivo": "consultar",
+                "problemas": [_problema(nombre_producto, sugerencias)],
+            }
+
+        return {
+            "tipo": "producto",
+            "nombre": producto.nombre,
+            "precio": str(producto.precio_venta),
+            "stock": producto.stock_actual,
+            "stock_minimo": producto.stock_minimo,
+            "total_vendido": producto.unidades_vendidas,
+            "categoria": producto.categoria.nombre,
+            "aproximado": not es_exacto and similitud < 100,
+            "reposicion": producto.necesita_reposicion,
+            **_planificacion(producto),
+        }
+
+    # 🔥 PRODUCTOS MÁS VENDIDOS
     if accion == "productos_mas_vendidos":
-        productos = (
+        # Contador denormalizado e indexado: no recorre ItemVenta
+        productos = list(
             Producto.objects
-            .annotate(total_vendido=Sum("ventas__cantidad"))
-            .filter(total_vendido__isnull=False)
-            .order_by("-total_vendido")[:5]
+            .filter(unidades_vendidas__gt=0)
+            .order_by("-unidades_vendidas")
+            .values_list("nombre", "unidades_vendidas", "precio_venta")[:5]
         )
 
         if not productos:
-            return "📊 Aún no hay ventas registradas."
-
-        respuesta = """
-        <strong>🔥 Productos más vendidos</strong>
-        <table style="width:100%; border-collapse: collapse; margin-top:8px;">
-            <thead>
-                <tr style="background:#ef476f; color:white;">
-                    <th style="padding:8px; border:1px solid #ddd; text-align:left;">🏆</th>
-                    <th style="padding:8px; border:1px solid #ddd; text-align:left;">Producto</th>
-                    <th style="padding:8px; border:1px solid #ddd; text-align:center;">Vendidos</th>
-                    <th style="padding:8px; border:1px solid #ddd; text-align:right;">Precio</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
-
-        # Emojis de medallas para top 3
-        medallas = ['🥇', '🥈', '🥉', '4️⃣', '5️⃣']
-        
-        for i, p in enumerate(productos):
-            # Color alternado para filas
-            bg_color = '#f8f9fa' if i % 2 == 0 else 'white'
-            
-            respuesta += f"""
-            <tr style="background:{bg_color};">
-                <td style="padding:8px; border:1px solid #ddd; text-align:center; font-size:20px;">
-                    {medallas[i]}
-                </td>
-                <td style="padding:8px; border:1px solid #ddd;">
-                    <strong>{p.nombre}</strong>
-                </td>
-                <td style="padding:8px; border:1px solid #ddd; text-align:center;">
-                    <strong style="color:#06D6A0;">{p.total_vendido}</strong> unidades
-                </td>
-                <td style="padding:8px; border:1px solid #ddd; text-align:right;">
-                    ${p.precio_venta}
-                </td>
-            </tr>
-            """
-
-        respuesta += "</tbody></table>"
-        
-        # Agregar total de unidades vendidas
-        total_unidades = sum(p.total_vendido for p in productos)
-        respuesta += f"<br><em>📊 Total vendido (Top 5): <strong>{total_unidades}</strong> unidades</em>"
-        
-        return respuesta
+            return _texto("📊 Aún no hay ventas registradas.")
+
+        return {
+            "tipo": "mas_vendidos",
+            "productos": [[nombre, total, str(precio)] for nombre, total, precio in productos],
+            "total_unidades": sum(total for _, total, _ in productos),
+        }
     
-    # 📋 LISTAR PRODUCTOS
+    # 📋 LISTAR PRODUCTOS (primera página; las demás se piden por AJAX)
     if accion == "listar_productos":
-        productos = Producto.objects.filter(activo=True)
-
-        if not productos.exists():
-            return "📦 No tienes productos registrados"
-
-        respuesta = """
-        <strong>📦 Productos registrados</strong>
-        <table style="width:100%; border-collapse: collapse; margin-top:8px;">
-            <thead>
-                <tr style="background:#4f46e5; color:white;">
-                    <th style="padding:6px; border:1px solid #ddd;">Producto</th>
-                    <th style="padding:6px; border:1px solid #ddd;">Stock</th>
-                    <th style="padding:6px; border:1px solid #ddd;">Precio</th>
-                </tr>
-            </thead>
-            <tbody>
-        """
-
-        for p in productos:
-            respuesta += f"""
-            <tr>
-                <td style="padding:6px; border:1px solid #ddd;">{p.nombre}</td>
-                <td style="padding:6px; border:1px solid #ddd; text-align:center;">
-                    {p.stock_actual}
-                </td>
-                <td style="padding:6px; border:1px solid #ddd;">
-                    ${p.precio_venta}
-                </td>
-            </tr>
-            """
-
-        respuesta += "</tbody></table>"
-        return respuesta
+        listado = listado_productos()
+        if not listado["total"]:
+            return _texto("📦 No tienes productos registrados")
+        return listado
 
     # 🤔 ACLARACIÓN
     if accion == "pedir_aclaracion":
-        return "🤔 ¿Podrías darme más detalles?"
+        return _texto("🤔 ¿Podrías darme más detalles?")
 
-    return "❌ No entendí la acción"
+    return _texto("❌ No entendí la acción")
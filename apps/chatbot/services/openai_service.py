@@ -1,54 +1,115 @@
-from openai import OpenAI
-from decouple import config
+from asgiref.sync import sync_to_async
 import json
+import logging
 import re
+import time
+from django.conf import settings
+from apps.core.instrumentacion import medir
+from .cache_intenciones import cache_intenciones
+from .interprete_local import interpretar_local
+from .llm import ErrorLLM, obtener_backend
+from .metricas_llm import metricas_llm
+from .prompts import mensajes_intencion
+
+logger = logging.getLogger(__name__)
+
+
+def _resolver_sin_llm(mensaje):
+    """Intérprete local; retorna la intención o None"""
+    data, confianza = interpretar_local(mensaje)
+    if data and confianza >= getattr(settings, "INTERPRETE_LOCAL_CONFIANZA", 0.8):
+        return data
+    return None
 
-client = OpenAI(
-    api_key=config("OPENAI_API_KEY")
-)
 
 def interpretar_mensaje(mensaje):
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{
-            "role": "user",
-            "content": f"""
-Devuelve EXCLUSIVAMENTE JSON válido.
-NO texto adicional.
-NO markdown.
-
-Formato exacto:
-{{
-  "accion": "registrar_venta | consultar_producto | productos_mas_vendidos | listar_productos | iniciar_registro_venta | pedir_aclaracion",
-  "producto": null,
-  "cantidad": null
-}}x
-
-Reglas IMPORTANTES:
-- Si pregunta por UN producto ESPECÍFICO (ej: "stock de tijeras", "precio de cuadernos", "info de lapiceros") → consultar_producto
-- Si pregunta por TODOS los productos, inventario completo o lista general → listar_productos
-- Si el mensaje es SOLO "Registrar venta" SIN especificar producto → iniciar_registro_venta
-- Si el mensaje incluye producto y cantidad específicos para vender → registrar_venta
-- Si pregunta por productos más vendidos → productos_mas_vendidos
-- Si falta información → pedir_aclaracion
-- Si no se menciona cantidad → usar 1
-
-Mensaje: "{mensaje}"
-"""
-        }]
-    )
-
-    texto = response.choices[0].message.content
+    """
+    Interpreta el mensaje del usuario y devuelve la intención
+    ({"accion", "producto", "cantidad"}).
+    1. Intérprete local para los patrones frecuentes (sin red)
+    2. Caché de frases ya interpretadas
+    3. OpenAI solo si lo anterior no alcanza
+    """
+    data = _resolver_sin_llm(mensaje)
+    if data is not None:
+        return data
 
-    if not texto:
+    data = cache_intenciones.obtener(mensaje)
+    if data is not None:
+        return data
+
+    data = _interpretar_con_openai(mensaje)
+    if data is None:
         return {"accion": "pedir_aclaracion"}
 
+    cache_intenciones.guardar(mensaje, data)
+    return data
+
+
+async def interpretar_mensaje_async(mensaje):
+    """Versión async de interpretar_mensaje (no bloquea el event loop)"""
+    data = _resolver_sin_llm(mensaje)
+    if data is not None:
+        return data
+
+    # La caché persistente consulta la base de datos
+    if cache_intenciones.persistente:
+        data = await sync_to_async(cache_intenciones.obtener)(mensaje)
+    else:
+        data = cache_intenciones.obtener(mensaje)
+    if data is not None:
+        return data
+
+    inicio = time.perf_counter()
+    try:
+        with medir("llm"):
+            respuesta = await obtener_backend().acompletar(mensajes_intencion(mensaje))
+    except ErrorLLM as e:
+        logger.warning("No se pudo interpretar el mensaje con el LLM: %s", e)
+        return {"accion": "pedir_aclaracion"}
+
+    data = _procesar_respuesta(respuesta, time.perf_counter() - inicio)
+    if data is None:
+        return {"accion": "pedir_aclaracion"}
+
+    if cache_intenciones.persistente:
+        await sync_to_async(cache_intenciones.guardar)(mensaje, data)
+    else:
+        cache_intenciones.guardar(mensaje, data)
+    return data
+
+
+def _interpretar_con_openai(mensaje):
+    """Llama al LLM; retorna None si no responde o la respuesta no es JSON válido"""
+    inicio = time.perf_counter()
+    try:
+        with medir("llm"):
+            respuesta = obtener_backend().completar(mensajes_intencion(mensaje))
+    except ErrorLLM as e:
+        logger.warning("No se pudo interpretar el mensaje con el LLM: %s", e)
+        return None
+    return _procesar_respuesta(respuesta, time.perf_counter() - inicio)
+
+
+def _procesar_respuesta(respuesta, latencia):
+    """Parsea la respuesta y registra tokens y latencia por acción"""
+    data = _parsear_respuesta(respuesta.contenido)
+    metricas_llm.registrar(data.get("accion") if data else None, respuesta, latencia)
+    return data
+
+
+def _parsear_respuesta(texto):
+    if not texto:
+        return None
+
     match = re.search(r"\{.*\}", texto, re.DOTALL)
 
     if not match:
-        return {"accion": "pedir_aclaracion"}
+        return None
 
     try:
-        return json.loads(match.group())
+        data = json.loads(match.group())
     except json.JSONDecodeError:
-        return {"accion": "pedir_aclaracion"}
\ No newline at end of file
+        return None
+
+    return data if isinstance(data, dict) else None
@@ -0,0 +1,57 @@
+"""
+Prompts del intérprete de intenciones.
+
+El bloque de instrucciones va como mensaje "system" idéntico en todas las
+llamadas y el texto del usuario como un mensaje "user" aparte, al final.
+El ahorro real es el de tokens: ~268 por llamada con "completo", ~97 con
+"compacto". El prompt caching del proveedor no aplica por ahora: OpenAI
+solo cachea prompts de 1024 tokens o más, así que tokens_cache en
+metricas_llm queda en 0. El prefijo estable solo serviría si el prompt
+creciera por encima de ese mínimo.
+
+LLM_PROMPT elige la variante: "completo" (con ejemplos) o "compacto"
+(mismas reglas, menos tokens).
+"""
+from django.conf import settings
+
+PROMPT_COMPLETO = """Devuelve EXCLUSIVAMENTE JSON válido.
+NO texto adicional.
+NO markdown.
+
+Formato exacto:
+{
+  "accion": "registrar_venta | consultar_producto | productos_mas_vendidos | listar_productos | iniciar_registro_venta | pedir_aclaracion",
+  "producto": null,
+  "cantidad": null,
+  "items": null
+}
+
+Reglas IMPORTANTES:
+- Si pregunta por UN producto ESPECÍFICO (ej: "stock de tijeras", "precio de cuadernos", "info de lapiceros") → consultar_producto
+- Si pregunta por TODOS los productos, inventario completo o lista general → listar_productos
+- Si el mensaje es SOLO "Registrar venta" SIN especificar producto → iniciar_registro_venta
+- Si el mensaje incluye producto y cantidad específicos para vender → registrar_venta
+- Si la venta incluye VARIOS productos → registrar_venta con "items": [{"producto": "...", "cantidad": 1}, ...] (uno por producto)
+- Si pregunta por productos más vendidos → productos_mas_vendidos
+- Si falta información → pedir_aclaracion
+- Si no se menciona cantidad → usar 1
+
+El siguiente mensaje del usuario es el texto a interpretar."""
+
+PROMPT_COMPACTO = """Responde solo JSON: {"accion","producto","cantidad","items"}.
+accion: registrar_venta (producto+cantidad; varios → items:[{producto,cantidad}]), consultar_producto (un producto), listar_productos (todo el inventario), productos_mas_vendidos, iniciar_registro_venta ("registrar venta" sin producto), pedir_aclaracion.
+Campos no usados: null. Cantidad por defecto: 1."""
+
+PROMPTS = {
+    "completo": PROMPT_COMPLETO,
+    "compacto": PROMPT_COMPACTO,
+}
+
+
+def mensajes_intencion(mensaje, variante=None):
+    """Mensajes para el LLM: prefijo de sistema fijo + texto del usuario"""
+    variante = variante or getattr(settings, "LLM_PROMPT", "completo")
+    return [
+        {"role": "system", "content": PROMPTS[variante]},
+        {"role": "user", "content": mensaje},
+    ]
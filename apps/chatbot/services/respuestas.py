@@ -0,0 +1,37 @@
+"""
+Conversión de los resultados estructurados de ejecutar_accion a HTML.
+
+Cada tipo de resultado tiene su plantilla en chatbot/respuestas/<tipo>.html.
+Django compila cada plantilla una sola vez por proceso (loader con caché),
+así mostrar un mensaje cuesta lo mismo que renderizar sus filas.
+"""
+from django.template.loader import render_to_string
+from django.utils.html import escape, linebreaks
+from django.utils.safestring import mark_safe
+
+TIPOS = {"texto", "sugerencias", "venta", "producto", "mas_vendidos", "listado_productos"}
+
+MEDALLAS = ['🥇', '🥈', '🥉', '4️⃣', '5️⃣']
+
+
+def _contexto(datos):
+    if datos["tipo"] == "mas_vendidos":
+        return {**datos, "productos": [
+            [medalla, *fila] for medalla, fila in zip(MEDALLAS, datos["productos"])
+        ]}
+    return datos
+
+
+def renderizar(datos):
+    """HTML (seguro) de un resultado {"tipo": ..., ...}"""
+    tipo = datos.get("tipo") if isinstance(datos, dict) else None
+    if tipo not in TIPOS:
+        return mark_safe(linebreaks(escape(str(datos))))
+    return mark_safe(render_to_string(f"chatbot/respuestas/{tipo}.html", _contexto(datos)).strip())
+
+
+def texto_plano(datos):
+    """Texto guardado en MensajeChat.mensaje (solo para respuestas de texto)"""
+    if isinstance(datos, dict) and datos.get("tipo") == "texto":
+        return datos.get("texto", "")
+    return ""
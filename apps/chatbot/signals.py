@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.companies.models import Producto
+from .services.indice_productos import indice_productos
+
+
+@receiver(post_save, sender=Producto)
+def actualizar_indice_producto(sender, instance, **kwargs):
+    """Mantiene el índice de búsqueda al crear/modificar un producto"""
+    indice_productos.actualizar_producto(instance)
+
+
+@receiver(post_delete, sender=Producto)
+def quitar_indice_producto(sender, instance, **kwargs):
+    """Quita del índice de búsqueda un producto eliminado"""
+    indice_productos.eliminar_producto(instance.pk)
@@ -202,13 +202,74 @@ const ChatAPI = {
         return response.json();
     },
 
-    async getConversationMessages(conversacionId) {
-        const response = await fetch(`/chatbot/chat/mensajes/${conversacionId}/`, {
+    // Envía el mensaje y procesa los Server-Sent Events a medida que llegan
+    async sendMessageStream(message, conversacionId, onEvent) {
+        const response = await fetch('/chatbot/chat/api/stream/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+                'X-CSRFToken': Utils.getCookie('csrftoken')
+            },
+            credentials: 'same-origin',
+            body: JSON.stringify({
+                mensaje: message,
+                conversacion_id: conversacionId
+            })
+        });
+
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!response.ok || !response.body || !contentType.startsWith('text/event-stream')) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Cada evento termina con una línea en blanco
+            let separator;
+            while ((separator = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, separator);
+                buffer = buffer.slice(separator + 2);
+
+                let eventName = 'message';
+                let dataText = '';
+                rawEvent.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    else if (line.startsWith('data:')) dataText += line.slice(5).trim();
+                });
+                onEvent(eventName, dataText ? JSON.parse(dataText) : {});
+            }
+        }
+    },
+
+    async getConversationMessages(conversacionId, antes = null) {
+        const query = antes ? `?antes=${encodeURIComponent(antes)}` : '';
+        const response = await fetch(`/chatbot/chat/mensajes/${conversacionId}/${query}`, {
+            method: 'GET',
+            headers: {
+                'Content-Type': 'application/json'
+            }
+        });
+        return response.json();
+    },
+
+    async getProductPage(pagina) {
+        const response = await fetch(`/chatbot/chat/productos/?pagina=${encodeURIComponent(pagina)}`, {
             method: 'GET',
             headers: {
                 'Content-Type': 'application/json'
             }
         });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
         return response.json();
     },
 
@@ -401,13 +462,15 @@ const NavigationManager = {
             const titleElement = document.querySelector('.chatbot-title');
             titleElement.textContent = data.titulo;
             
-            // Renderizar mensajes
+            // Renderizar mensajes (solo la página más reciente)
             if (data.mensajes.length === 0) {
                 this.showWelcomeMessage();
+                HistoryLoader.renderButton(null);
             } else {
                 data.mensajes.forEach(msg => {
                     ChatUI.addMessageFromData(msg);
                 });
+                HistoryLoader.renderButton(data.cursor_anteriores);
                 
                 // ✅ MARCAR que esta conversación tiene mensajes
                 EmptyConversationManager.conversationsWithMessages.add(data.conversacion_id);
@@ -576,7 +639,7 @@ const ChatUI = {
     },
 
 
-    addMessageFromData(msgData) {
+    createMessageElement(msgData) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${msgData.tipo}`;
         
@@ -586,8 +649,11 @@ const ChatUI = {
                 <div class="message-time">${msgData.fecha}</div>
             </div>
         `;
-        
-        DOM.messagesContainer.appendChild(messageDiv);
+        return messageDiv;
+    },
+
+    addMessageFromData(msgData) {
+        DOM.messagesContainer.appendChild(this.createMessageElement(msgData));
         this.scrollToBottom();
     },
 
@@ -612,6 +678,56 @@ const ChatUI = {
         }
     },
 
+    // Texto de estado bajo los puntos mientras llega la respuesta en streaming
+    setTypingStatus(text) {
+        if (!this.typingIndicator) return;
+        let status = this.typingIndicator.querySelector('.typing-status');
+        if (!status) {
+            status = document.createElement('div');
+            status.className = 'typing-status message-time';
+            this.typingIndicator.appendChild(status);
+        }
+        status.textContent = text;
+    },
+
+    // Mensaje del bot que se va llenando con los fragmentos recibidos
+    startStreamingMessage() {
+        const messageDiv = document.createElement('div');
+        messageDiv.className = 'message bot';
+
+        const content = document.createElement('div');
+        content.className = 'message-content';
+        const body = document.createElement('div');
+        content.appendChild(body);
+        messageDiv.appendChild(content);
+
+        if (this.typingIndicator) {
+            this.typingIndicator.replaceWith(messageDiv);
+            this.typingIndicator = null;
+        } else {
+            DOM.messagesContainer.appendChild(messageDiv);
+        }
+
+        let html = '';
+        return {
+            append: (fragment) => {
+                html += fragment;
+                body.innerHTML = html;
+                this.scrollToBottom();
+            },
+            finish: () => {
+                const time = document.createElement('div');
+                time.className = 'message-time';
+                time.textContent = new Date().toLocaleTimeString('es-EC', {
+                    hour: '2-digit',
+                    minute: '2-digit'
+                });
+                content.appendChild(time);
+                this.scrollToBottom();
+            }
+        };
+    },
+
     scrollToBottom() {
         DOM.messagesContainer.scrollTop = DOM.messagesContainer.scrollHeight;
     },
@@ -625,6 +741,109 @@ const ChatUI = {
     }
 };
 
+// ==========================================
+// MÓDULO: Historial - Cargar mensajes anteriores
+// ==========================================
+const HistoryLoader = {
+    loading: false,
+
+    init() {
+        this.renderButton(window.CURSOR_ANTERIORES);
+
+        // Cargar automáticamente al llegar al inicio del historial
+        DOM.messagesContainer.addEventListener('scroll', () => {
+            if (DOM.messagesContainer.scrollTop < 40) {
+                this.loadOlder();
+            }
+        });
+    },
+
+    renderButton(cursor) {
+        window.CURSOR_ANTERIORES = cursor || null;
+        let button = document.getElementById('loadOlderBtn');
+
+        if (!cursor) {
+            if (button) button.remove();
+            return;
+        }
+
+        if (!button) {
+            button = document.createElement('button');
+            button.type = 'button';
+            button.id = 'loadOlderBtn';
+            button.className = 'load-older-btn';
+            DOM.messagesContainer.prepend(button);
+        }
+        button.textContent = 'Cargar mensajes anteriores';
+        button.disabled = false;
+        button.onclick = () => this.loadOlder();
+    },
+
+    async loadOlder() {
+        const button = document.getElementById('loadOlderBtn');
+        if (this.loading || !window.CURSOR_ANTERIORES || !button) return;
+
+        this.loading = true;
+        button.disabled = true;
+        button.textContent = 'Cargando...';
+
+        const conversacionId = window.CONVERSACION_ID;
+        try {
+            const data = await ChatAPI.getConversationMessages(conversacionId, window.CURSOR_ANTERIORES);
+
+            // El usuario cambió de conversación mientras se cargaba
+            if (conversacionId !== window.CONVERSACION_ID) return;
+
+            // Insertar arriba manteniendo la posición visible del scroll
+            const previousHeight = DOM.messagesContainer.scrollHeight;
+            const fragment = document.createDocumentFragment();
+            data.mensajes.forEach(msg => {
+                fragment.appendChild(ChatUI.createMessageElement(msg));
+            });
+            button.after(fragment);
+            DOM.messagesContainer.scrollTop += DOM.messagesContainer.scrollHeight - previousHeight;
+
+            this.renderButton(data.cursor_anteriores);
+        } catch (error) {
+            console.error('❌ Error al cargar mensajes anteriores:', error);
+            Notification.error('Error al cargar', 'No se pudieron cargar los mensajes anteriores');
+            this.renderButton(window.CURSOR_ANTERIORES);
+        } finally {
+            this.loading = false;
+        }
+    }
+};
+
+// ==========================================
+// MÓDULO: Listado paginado de productos
+// ==========================================
+const ProductListPager = {
+    init() {
+        // Delegación: los listados llegan dentro de mensajes del bot
+        DOM.messagesContainer.addEventListener('click', (e) => {
+            const button = e.target.closest('.chat-page-btn');
+            if (button) {
+                this.loadPage(button);
+            }
+        });
+    },
+
+    async loadPage(button) {
+        const listado = button.closest('.chat-listado');
+        if (!listado) return;
+
+        button.disabled = true;
+        try {
+            const data = await ChatAPI.getProductPage(button.dataset.pagina);
+            listado.outerHTML = data.html;
+        } catch (error) {
+            console.error('❌ Error al cargar la página del listado:', error);
+            Notification.error('Error al cargar', 'No se pudo cargar la página de productos');
+            button.disabled = false;
+        }
+    }
+};
+
 // ==========================================
 // MÓDULO: Títulos - Gestión de títulos
 // ==========================================
@@ -829,6 +1048,15 @@ const ConversationManager = {
 // ==========================================
 // MÓDULO: Mensajes - Envío de mensajes
 // ==========================================
+const STREAM_STATUS = {
+    recibido: 'Mensaje recibido...',
+    interpretando: 'Interpretando tu mensaje...',
+    ejecutando: 'Consultando el inventario...',
+    registrar_venta: 'Registrando la venta...',
+    listar_productos: 'Cargando productos...',
+    productos_mas_vendidos: 'Calculando los más vendidos...'
+};
+
 const MessageHandler = {
     async send() {
         const message = DOM.input.value.trim();
@@ -838,9 +1066,58 @@ const MessageHandler = {
         ChatUI.clearInput();
         ChatUI.showTypingIndicator();
 
+        console.log('📤 Enviando mensaje a conversación:', window.CONVERSACION_ID); // ✅ LOG
+
+        let received = false;
+        try {
+            await this.sendStream(message, () => { received = true; });
+        } catch (error) {
+            if (received) {
+                // El stream se cortó a mitad: la respuesta ya quedó guardada
+                this.handleError(error);
+                return;
+            }
+            console.warn('⚠️ Streaming no disponible, usando la API JSON:', error);
+            await this.sendJson(message);
+        }
+    },
+
+    async sendStream(message, onFirstEvent) {
+        let streamingMessage = null;
+        let nuevoTitulo = null;
+
+        await ChatAPI.sendMessageStream(message, window.CONVERSACION_ID, (event, data) => {
+            onFirstEvent();
+            switch (event) {
+                case 'estado':
+                    ChatUI.setTypingStatus(
+                        STREAM_STATUS[data.accion] || STREAM_STATUS[data.etapa] || ''
+                    );
+                    break;
+                case 'titulo':
+                    nuevoTitulo = data.nuevo_titulo;
+                    break;
+                case 'fragmento':
+                    if (!streamingMessage) {
+                        streamingMessage = ChatUI.startStreamingMessage();
+                    }
+                    streamingMessage.append(data.texto);
+                    break;
+                case 'fin':
+                    if (streamingMessage) streamingMessage.finish();
+                    EmptyConversationManager.markCurrentAsHavingMessages();
+                    if (data.es_primer_mensaje && nuevoTitulo) {
+                        TitleManager.updateBothTitles(window.CONVERSACION_ID, nuevoTitulo);
+                    }
+                    break;
+            }
+        });
+
+        ChatUI.hideTypingIndicator();
+    },
+
+    async sendJson(message) {
         try {
-            console.log('📤 Enviando mensaje a conversación:', window.CONVERSACION_ID); // ✅ LOG
-            
             const data = await ChatAPI.sendMessage(message, window.CONVERSACION_ID);
             
             ChatUI.hideTypingIndicator();
@@ -858,16 +1135,20 @@ const MessageHandler = {
                 TitleManager.updateBothTitles(window.CONVERSACION_ID, data.nuevo_titulo);
             }
         } catch (error) {
-            ChatUI.hideTypingIndicator();
-            ChatUI.addMessage(MESSAGES.SERVER_ERROR.message, 'bot');
-            
-            Notification.error(
-                MESSAGES.SERVER_ERROR.title,
-                MESSAGES.SERVER_ERROR.message
-            );
-            
-            console.error('❌ Error al enviar mensaje:', error); // ✅ LOG
+            this.handleError(error);
         }
+    },
+
+    handleError(error) {
+        ChatUI.hideTypingIndicator();
+        ChatUI.addMessage(MESSAGES.SERVER_ERROR.message, 'bot');
+        
+        Notification.error(
+            MESSAGES.SERVER_ERROR.title,
+            MESSAGES.SERVER_ERROR.message
+        );
+        
+        console.error('❌ Error al enviar mensaje:', error); // ✅ LOG
     }
 };
 
@@ -1005,6 +1286,8 @@ document.addEventListener('DOMContentLoaded', () => {
     Notification.init();
     EmptyConversationManager.init(CONVERSACION_ID);
     ChatUI.scrollToBottom();
+    HistoryLoader.init();
+    ProductListPager.init();
     SidebarManager.restoreState();
     VoiceRecognition.init();
     setupEventListeners();
@@ -1,3 +1,592 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+from decimal import Decimal
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.chatbot.models import Conversacion, IntencionCache, MensajeChat
+from apps.chatbot.services import busqueda_db, openai_service
+from apps.chatbot.services.llm import BackendOpenAI, RespuestaLLM
+from apps.chatbot.services.metricas_llm import MetricasLLM, metricas_llm
+from apps.chatbot.services.prompts import mensajes_intencion
+from apps.chatbot.services.negocio_service import ejecutar_accion
+from apps.companies.busqueda import busqueda_disponible
+from apps.companies.models import Categoria, Producto, PronosticoDemanda, SugerenciaReposicion, Venta
+from apps.chatbot.services.cache_intenciones import CacheIntenciones, cache_intenciones
+from apps.chatbot.services.indice_productos import IndiceProductos, indice_productos
+from apps.chatbot.services.interprete_local import interpretar_local
+from apps.chatbot.services.llm_stub import ServidorLLMStub
+
+
+# Sin intérprete local: todos los mensajes pasan por el LLM (stub)
+@override_settings(INTERPRETE_LOCAL_CONFIANZA=1.1)
+class ChatbotApiConcurrenciaTests(TestCase):
+    LATENCIA = 0.2
+    CONVERSACIONES = 25
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ServidorLLMStub(latencia=cls.LATENCIA).iniciar()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.detener()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache_intenciones.limpiar()
+
+    async def test_conversaciones_concurrentes_no_esperan_una_a_otra(self):
+        conversaciones = [await Conversacion.objects.acreate() for _ in range(self.CONVERSACIONES)]
+
+        async def enviar(i, conversacion):
+            return await self.async_client.post(
+                "/chatbot/chat/api/",
+                data=json.dumps({"mensaje": f"consulta número {i}", "conversacion_id": conversacion.id}),
+                content_type="application/json",
+            )
+
+        with self.settings(LLM_BACKEND="openai", LLM_BASE_URL=self.servidor.url, OPENAI_API_KEY="stub"):
+            inicio = time.perf_counter()
+            respuestas = await asyncio.gather(
+                *(enviar(i, c) for i, c in enumerate(conversaciones))
+            )
+            duracion = time.perf_counter() - inicio
+
+        self.assertTrue(all(r.status_code == 200 for r in respuestas))
+        self.assertEqual(self.servidor.peticiones, self.CONVERSACIONES)
+        self.assertEqual(await MensajeChat.objects.acount(), 2 * self.CONVERSACIONES)
+        # En serie tardaría CONVERSACIONES × LATENCIA (5 s); en paralelo ~LATENCIA
+        self.assertGreater(self.servidor.max_en_curso, 1)
+        self.assertLess(duracion, self.CONVERSACIONES * self.LATENCIA / 4)
+
+
+@override_settings(CATALOGO_BUSQUEDA="db")
+class VentaVariosProductosTests(TestCase):
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre="Útiles")
+        for nombre, stock, precio in (("Cuaderno", 10, "1.50"), ("Regla", 3, "0.75")):
+            Producto.objects.create(
+                nombre=nombre, categoria=categoria, stock_actual=stock,
+                precio_venta=Decimal(precio), precio_compra=Decimal("0.50"),
+            )
+
+    def _stock(self):
+        return dict(Producto.objects.values_list("nombre", "stock_actual"))
+
+    def _vender(self, *items):
+        return ejecutar_accion({
+            "accion": "registrar_venta", "producto": None, "cantidad": None,
+            "items": [{"producto": producto, "cantidad": cantidad} for producto, cantidad in items],
+        })
+
+    def test_interprete_separa_los_items(self):
+        data, confianza = interpretar_local("Vendí 3 cuadernos, 2 reglas y una goma")
+        self.assertEqual(data["accion"], "registrar_venta")
+        self.assertEqual(data["items"], [
+            {"producto": "cuadernos", "cantidad": 3},
+            {"producto": "reglas", "cantidad": 2},
+            {"producto": "goma", "cantidad": 1},
+        ])
+        self.assertGreaterEqual(confianza, 0.8)
+
+    def test_registra_todos_los_items_en_una_venta(self):
+        self._vender(("cuaderno", 3), ("regla", 2), ("cuaderno", 1))
+
+        venta = Venta.objects.get()
+        # Los items repetidos se suman: 4 × 1.50 + 2 × 0.75
+        self.assertEqual(venta.total, Decimal("7.50"))
+        self.assertEqual(
+            sorted(venta.items.values_list("producto__nombre", "cantidad")),
+            [("Cuaderno", 4), ("Regla", 2)],
+        )
+        self.assertEqual(self._stock(), {"Cuaderno": 6, "Regla": 1})
+
+    def test_no_registra_nada_si_un_item_falla(self):
+        self._vender(("cuaderno", 2), ("regla", 5))
+        self._vender(("cuaderno", 2), ("xyzw", 1))
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(self._stock(), {"Cuaderno": 10, "Regla": 3})
+
+
+@override_settings(INTERPRETE_LOCAL_CONFIANZA=1.1, OPENAI_API_KEY="stub", LLM_BACKEND="openai")
+class BackendLLMPlazoTests(TestCase):
+    def setUp(self):
+        cache_intenciones.limpiar()
+
+    def test_llm_lento_respeta_el_plazo_total(self):
+        with ServidorLLMStub(latencia=2.0) as servidor:
+            with self.settings(LLM_BASE_URL=servidor.url, LLM_TIMEOUT=0.5, LLM_REINTENTOS=3):
+                inicio = time.perf_counter()
+                data = openai_service.interpretar_mensaje("stock de tijeras")
+                duracion = time.perf_counter() - inicio
+
+        self.assertEqual(data, {"accion": "pedir_aclaracion"})
+        self.assertLess(duracion, 1.5)
+        # Un fallo no se guarda en la caché
+        self.assertIsNone(cache_intenciones.obtener("stock de tijeras"))
+
+    async def test_loop_de_una_llamada_cierra_su_cliente(self):
+        # Las pruebas async corren en un loop de async_to_sync, como las vistas async bajo WSGI
+        with ServidorLLMStub() as servidor:
+            backend = BackendOpenAI(base_url=servidor.url)
+            creados = []
+            nuevo = backend._nuevo_cliente_async
+
+            def registrar():
+                creados.append(nuevo())
+                return creados[-1]
+
+            backend._nuevo_cliente_async = registrar
+            for _ in range(2):
+                await backend.acompletar([{"role": "user", "content": "stock de tijeras"}])
+
+        self.assertEqual(len(creados), 2)
+        self.assertTrue(all(cliente.is_closed() for cliente in creados))
+        self.assertEqual(len(backend._clientes_async), 0)
+
+    async def test_cerrar_cierra_los_clientes_async(self):
+        backend = BackendOpenAI()
+        cliente = backend.cliente_async()
+        backend.cerrar()
+        await asyncio.sleep(0.01)
+        self.assertTrue(cliente.is_closed())
+
+    @override_settings(LLM_BACKEND="local")
+    def test_backend_local_no_usa_red(self):
+        data = openai_service.interpretar_mensaje("vendí 3 cuadernos")
+        self.assertEqual(data, {"accion": "registrar_venta", "producto": "cuadernos", "cantidad": 3})
+
+
+class MetricasLLMTests(SimpleTestCase):
+    def test_registrar_y_resumen_por_accion(self):
+        metricas = MetricasLLM()
+        metricas.registrar("consultar_producto", RespuestaLLM("{}", 300, 20, 256), 0.2)
+        metricas.registrar("consultar_producto", RespuestaLLM("{}", 100, 10), 0.4)
+        metricas.registrar(None, RespuestaLLM("no es json", 50, 5), 0.1)
+
+        resumen = metricas.resumen()
+        self.assertEqual(set(resumen), {"consultar_producto", "invalida"})
+        consulta = resumen["consultar_producto"]
+        self.assertEqual(
+            [consulta[clave] for clave in ("llamadas", "tokens_prompt", "tokens_cache", "tokens_respuesta")],
+            [2, 400, 256, 30],
+        )
+        self.assertEqual((consulta["tokens_prompt_medio"], consulta["tokens_respuesta_medio"]), (200, 15))
+        self.assertAlmostEqual(consulta["latencia_media"], 0.3)
+        self.assertEqual(consulta["latencia_p95"], 0.4)
+        self.assertEqual(resumen["invalida"]["tokens_cache"], 0)
+
+        metricas.limpiar()
+        self.assertEqual(metricas.resumen(), {})
+
+    def test_tokens_cache_desde_el_uso_del_proveedor(self):
+        def respuesta(uso):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="{}"))], usage=uso)
+
+        backend = BackendOpenAI(base_url="http://localhost")
+        uso = SimpleNamespace(
+            prompt_tokens=1200, completion_tokens=15, prompt_tokens_details=SimpleNamespace(cached_tokens=1024)
+        )
+        self.assertEqual(backend._respuesta(respuesta(uso)), RespuestaLLM("{}", 1200, 15, 1024))
+        # Prompts cortos: el proveedor no envía el detalle o lo envía en 0
+        uso = SimpleNamespace(prompt_tokens=270, completion_tokens=15, prompt_tokens_details=None)
+        self.assertEqual(backend._respuesta(respuesta(uso)).tokens_cache, 0)
+        self.assertEqual(backend._respuesta(respuesta(None)), RespuestaLLM("{}", 0, 0, 0))
+
+    @override_settings(INTERPRETE_LOCAL_CONFIANZA=1.1, OPENAI_API_KEY="stub", LLM_BACKEND="openai")
+    def test_interpretar_registra_los_tokens_de_la_llamada(self):
+        cache_intenciones.limpiar()
+        metricas_llm.limpiar()
+        self.addCleanup(metricas_llm.limpiar)
+        with ServidorLLMStub() as servidor, self.settings(LLM_BASE_URL=servidor.url):
+            openai_service.interpretar_mensaje("stock de tijeras")
+
+        consulta = metricas_llm.resumen()["consultar_producto"]
+        self.assertEqual(consulta["llamadas"], 1)
+        # El stub estima 4 caracteres por token y no cachea prompts
+        caracteres = sum(len(m["content"]) for m in mensajes_intencion("stock de tijeras"))
+        self.assertEqual(consulta["tokens_prompt"], caracteres // 4)
+        self.assertEqual(consulta["tokens_cache"], 0)
+
+
+class InterpreteLocalTests(SimpleTestCase):
+    def test_venta_con_cantidad(self):
+        data, confianza = interpretar_local("Vendí tres cuadernos")
+        self.assertEqual(data, {"accion": "registrar_venta", "producto": "cuadernos", "cantidad": 3})
+        self.assertGreaterEqual(confianza, 0.8)
+
+    def test_venta_sin_cantidad_explicita_va_al_llm(self):
+        for mensaje in ("vendí cuadernos x 3", "vendi cuadernos 3", "vendí 3x cuadernos",
+                        "venta de hoy", "vendí cuadernos"):
+            with self.subTest(mensaje=mensaje):
+                data, confianza = interpretar_local(mensaje)
+                self.assertLess(confianza, 0.8)
+                self.assertIsNone(data["cantidad"])
+
+
+class RegistrarVentaChatTests(TestCase):
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre="Útiles")
+        self.cuaderno = Producto.objects.create(
+            nombre="Cuaderno", categoria=categoria, stock_actual=10,
+            precio_venta=Decimal("1.50"), precio_compra=Decimal("0.50"),
+        )
+
+    def test_cantidad_ilegible_pide_aclaracion(self):
+        for cantidad in ("tres y media", "abc", "2.5", 2.5, True):
+            with self.subTest(cantidad=cantidad):
+                resultado = ejecutar_accion({"accion": "registrar_venta", "producto": "cuaderno", "cantidad": cantidad})
+                self.assertEqual(resultado["tipo"], "texto")
+                self.assertIn("cantidad", resultado["texto"])
+        self.assertFalse(Venta.objects.exists())
+
+    def test_cantidad_entera_como_texto(self):
+        ejecutar_accion({"accion": "registrar_venta", "items": [{"producto": "cuaderno", "cantidad": "3"}]})
+        self.assertEqual(Producto.objects.get(pk=self.cuaderno.pk).stock_actual, 7)
+
+
+class ChatbotApiStreamTests(TestCase):
+    def setUp(self):
+        cache_intenciones.limpiar()
+        Producto.objects.create(
+            nombre="Cuaderno", categoria=Categoria.objects.create(nombre="Útiles"), stock_actual=10,
+            precio_venta=Decimal("1.50"), precio_compra=Decimal("0.50"),
+        )
+
+    @staticmethod
+    def _eventos(contenido):
+        eventos = []
+        for bloque in contenido.split("\n\n"):
+            if bloque:
+                campos = dict(linea.split(": ", 1) for linea in bloque.splitlines())
+                eventos.append((campos["event"], json.loads(campos["data"])))
+        return eventos
+
+    async def test_orden_de_eventos_y_respuesta_guardada(self):
+        conversacion = await Conversacion.objects.acreate()
+        response = await self.async_client.post(
+            "/chatbot/chat/api/stream/",
+            data=json.dumps({"mensaje": "stock de cuaderno", "conversacion_id": conversacion.id}),
+            content_type="application/json",
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        contenido = "".join([fragmento.decode() async for fragmento in response.streaming_content])
+        eventos = self._eventos(contenido)
+
+        nombres = [evento for evento, _ in eventos]
+        self.assertEqual(nombres[:5], ["estado", "titulo", "estado", "intencion", "estado"])
+        self.assertEqual(set(nombres[5:-1]), {"fragmento"})
+        self.assertEqual(eventos[-1], ("fin", {"es_primer_mensaje": True}))
+        self.assertEqual(
+            [datos["etapa"] for evento, datos in eventos if evento == "estado"],
+            ["recibido", "interpretando", "ejecutando"],
+        )
+        self.assertEqual(eventos[3][1]["accion"], "consultar_producto")
+
+        mensajes = [m async for m in MensajeChat.objects.filter(conversacion=conversacion).order_by("fecha", "id")]
+        self.assertEqual([m.tipo for m in mensajes], ["user", "bot"])
+        self.assertEqual(mensajes[1].datos["tipo"], "producto")
+        # Lo que se envió por fragmentos es lo que se muestra al recargar
+        texto = "".join(datos["texto"] for evento, datos in eventos if evento == "fragmento")
+        self.assertEqual(texto, str(await sync_to_async(lambda: mensajes[1].html)()))
+
+
+class MensajesGuardadosTests(TestCase):
+    FICHA_ANTIGUA = """
+        <div><strong>📦 Cuaderno</strong>
+        <table>
+            <tr><td>💰 Precio de venta</td><td>$1.50</td></tr>
+            <tr><td>📊 Stock actual</td><td>10 unidades</td></tr>
+            <tr><td>📁 Categoría</td><td>Útiles</td></tr>
+        </table></div>
+    """
+
+    def setUp(self):
+        self.conversacion = Conversacion.objects.create()
+
+    def _mensaje(self, tipo, mensaje, datos=None):
+        return MensajeChat.objects.create(conversacion=self.conversacion, tipo=tipo, mensaje=mensaje, datos=datos)
+
+    def test_html_escapa_lo_que_no_son_datos(self):
+        usuario = self._mensaje("user", '<img src=x onerror="alert(1)">')
+        self.assertEqual(usuario.html, "&lt;img src=x onerror=&quot;alert(1)&quot;&gt;")
+        self.assertNotIn("<strong>", self._mensaje("bot", self.FICHA_ANTIGUA).html)
+
+        texto = self._mensaje("bot", "", {"tipo": "texto", "texto": "<b>Hola</b>\nChau"})
+        self.assertEqual(texto.html, "&lt;b&gt;Hola&lt;/b&gt;<br>Chau")
+
+    def test_compactar_mensajes(self):
+        ficha = self._mensaje("bot", self.FICHA_ANTIGUA)
+        desconocido = self._mensaje("bot", "<p>Hola <em>mundo</em></p><script>alert(1)</script><div>Chau</div>")
+        usuario = self._mensaje("user", "<b>no se toca</b>")
+
+        call_command("compactar_mensajes", "--dry-run", stdout=StringIO())
+        self.assertEqual(MensajeChat.objects.filter(datos__isnull=False).count(), 0)
+
+        salida = StringIO()
+        call_command("compactar_mensajes", "--lote", "1", stdout=salida)
+        self.assertIn("1 mensajes a datos estructurados, 1 a texto plano", salida.getvalue())
+
+        ficha.refresh_from_db()
+        self.assertEqual(ficha.mensaje, "")
+        self.assertEqual(
+            {clave: ficha.datos[clave] for clave in ("tipo", "nombre", "precio", "stock", "categoria")},
+            {"tipo": "producto", "nombre": "Cuaderno", "precio": "1.50", "stock": 10, "categoria": "Útiles"},
+        )
+        desconocido.refresh_from_db()
+        self.assertEqual(desconocido.datos, {"tipo": "texto", "texto": "Hola mundo\nChau"})
+        self.assertNotIn("<script>", desconocido.html)
+        usuario.refresh_from_db()
+        self.assertEqual((usuario.mensaje, usuario.datos), ("<b>no se toca</b>", None))
+
+        salida = StringIO()
+        call_command("compactar_mensajes", stdout=salida)
+        self.assertIn("0 mensajes a datos estructurados, 0 a texto plano", salida.getvalue())
+
+    @override_settings(CHAT_LISTADO_POR_PAGINA=2)
+    def test_listado_antiguo_conserva_todas_las_filas(self):
+        filas = "".join(f"<tr><td>Producto {i}</td><td>{i} unidades</td><td>$1.00</td></tr>" for i in range(5))
+        listado = self._mensaje("bot", f"<strong>📦 Productos registrados</strong><table>{filas}</table>")
+        call_command("compactar_mensajes", stdout=StringIO())
+
+        listado.refresh_from_db()
+        self.assertEqual(len(listado.datos["productos"]), 5)
+        self.assertEqual((listado.datos["paginas"], listado.datos["total"]), (1, 5))
+        # Sin paginador: las otras páginas mostrarían el catálogo actual
+        self.assertNotIn("chat-page-btn", listado.html)
+
+
+class PaginaMensajesTests(TestCase):
+    def setUp(self):
+        self.conversacion = Conversacion.objects.create()
+        self.mensajes = [
+            MensajeChat.objects.create(conversacion=self.conversacion, tipo="user", mensaje=f"mensaje {i}")
+            for i in range(7)
+        ]
+        # Mensajes con la misma fecha: el cursor desempata por id
+        MensajeChat.objects.filter(pk__in=[m.pk for m in self.mensajes[2:5]]).update(fecha=self.mensajes[2].fecha)
+
+    def _pagina(self, conversacion=None, **parametros):
+        conversacion = conversacion or self.conversacion
+        return self.client.get(f"/chatbot/chat/mensajes/{conversacion.pk}/", parametros)
+
+    def test_recorre_todas_las_paginas_sin_repetir(self):
+        vistos, cursor, paginas = [], None, 0
+        while True:
+            parametros = {"limite": 3, **({"antes": cursor} if cursor else {})}
+            datos = self._pagina(**parametros).json()
+            vistos = [m["mensaje"] for m in datos["mensajes"]] + vistos
+            paginas += 1
+            cursor = datos["cursor_anteriores"]
+            if cursor is None:
+                break
+        self.assertEqual(paginas, 3)
+        self.assertEqual(vistos, [f"mensaje {i}" for i in range(7)])
+
+    def test_limite_justo_no_deja_cursor(self):
+        datos = self._pagina(limite=7).json()
+        self.assertEqual(len(datos["mensajes"]), 7)
+        self.assertIsNone(datos["cursor_anteriores"])
+
+        datos = self._pagina(limite=6).json()
+        self.assertEqual(datos["mensajes"][0]["mensaje"], "mensaje 1")
+        ultima = self._pagina(limite=6, antes=datos["cursor_anteriores"]).json()
+        self.assertEqual([m["mensaje"] for m in ultima["mensajes"]], ["mensaje 0"])
+        self.assertIsNone(ultima["cursor_anteriores"])
+
+    def test_cursor_o_limite_invalidos(self):
+        for parametros in ({"antes": "no-es-un-cursor"}, {"antes": "bWFs"}, {"limite": "tres"}):
+            with self.subTest(**parametros):
+                self.assertEqual(self._pagina(**parametros).status_code, 400)
+
+    def test_indice_de_paginacion_existe(self):
+        with connection.cursor() as cursor:
+            restricciones = connection.introspection.get_constraints(cursor, MensajeChat._meta.db_table)
+        self.assertEqual(restricciones["chatbot_mensaje_conv_fecha"]["columns"], ["conversacion_id", "fecha", "id"])
+
+    def test_cursor_de_otra_conversacion(self):
+        cursor = self._pagina(limite=3).json()["cursor_anteriores"]
+        otra = Conversacion.objects.create()
+        MensajeChat.objects.create(conversacion=otra, tipo="user", mensaje="de otra")
+        self.assertEqual(self._pagina(otra, antes=cursor).status_code, 400)
+
+
+class CacheIntencionesTests(TestCase):
+    INTENCION = {"accion": "productos_mas_vendidos"}
+
+    def test_normaliza_el_mensaje_y_devuelve_copias(self):
+        cache = CacheIntenciones(persistente=False)
+        cache.guardar("¿Productos MÁS  vendidos?", self.INTENCION)
+        datos = cache.obtener("productos mas vendidos")
+        self.assertEqual(datos, self.INTENCION)
+        datos["accion"] = "otra"
+        self.assertEqual(cache.obtener("¡productos más vendidos!"), self.INTENCION)
+        self.assertIsNone(cache.obtener("productos menos vendidos"))
+        self.assertIsNone(cache.obtener("¿?"))
+        self.assertEqual(
+            {clave: cache.estadisticas()[clave] for clave in ("aciertos", "aciertos_db", "fallos", "tamano")},
+            {"aciertos": 2, "aciertos_db": 0, "fallos": 1, "tamano": 1},
+        )
+
+    def test_persistente_se_comparte_entre_instancias(self):
+        CacheIntenciones(persistente=True).guardar("productos más vendidos", self.INTENCION)
+        self.assertIsNone(CacheIntenciones(persistente=False).obtener("productos más vendidos"))
+
+        # Otro proceso: lee de la tabla y después de su memoria
+        otra = CacheIntenciones(persistente=True)
+        self.assertEqual(otra.obtener("productos mas vendidos"), self.INTENCION)
+        self.assertEqual(otra.obtener("productos mas vendidos"), self.INTENCION)
+        self.assertEqual((otra.aciertos_db, otra.aciertos), (1, 1))
+        self.assertEqual(IntencionCache.objects.get().aciertos, 1)
+
+    def test_ttl_vence_en_memoria_y_en_la_tabla(self):
+        cache = CacheIntenciones(ttl=0.05, persistente=True)
+        cache.guardar("productos más vendidos", self.INTENCION)
+        self.assertEqual(cache.obtener("productos mas vendidos"), self.INTENCION)
+        time.sleep(0.1)
+        self.assertIsNone(cache.obtener("productos mas vendidos"))
+        self.assertIsNone(CacheIntenciones(ttl=0.05, persistente=True).obtener("productos mas vendidos"))
+
+
+class CatalogoTestCase(TestCase):
+    NOMBRES = ("Cuaderno Universitario", "Cuaderno Espiral", "Lápiz HB", "Borrador blanco", "Regla 30 cm")
+
+    def setUp(self):
+        self.categoria = Categoria.objects.create(nombre="Útiles")
+        self.productos = {nombre: self._crear(nombre) for nombre in self.NOMBRES}
+        # El índice global pudo construirse con productos de otros tests
+        indice_productos.invalidar()
+        self.addCleanup(indice_productos.invalidar)
+
+    def _crear(self, nombre):
+        return Producto.objects.create(
+            nombre=nombre, categoria=self.categoria, stock_actual=10,
+            precio_venta=Decimal("1.50"), precio_compra=Decimal("0.50"),
+        )
+
+    def _pk(self, nombre):
+        return self.productos[nombre].pk
+
+
+class IndiceProductosTests(CatalogoTestCase):
+    def test_capas_de_busqueda(self):
+        indice = IndiceProductos()
+        # Exacta, sin tildes ni mayúsculas
+        self.assertEqual(indice.buscar("lapiz hb"), (self._pk("Lápiz HB"), True, 100, []))
+        # Prefijo: único o ambiguo
+        self.assertEqual(indice.buscar("borr"), (self._pk("Borrador blanco"), False, 95, []))
+        self.assertEqual(
+            indice.buscar("cuaderno"), (None, False, 90, ["Cuaderno Espiral", "Cuaderno Universitario"])
+        )
+        # Todas las palabras clave, en cualquier orden
+        self.assertEqual(indice.buscar("universitario cuaderno"), (self._pk("Cuaderno Universitario"), False, 85, []))
+        # Frase parcial con palabras cortas
+        self.assertEqual(indice.buscar("30 cm"), (self._pk("Regla 30 cm"), False, 75, []))
+        # Fuzzy con errores de tipeo
+        pk, exacto, similitud, _ = indice.buscar("cuadrno espirall")
+        self.assertEqual((pk, exacto), (self._pk("Cuaderno Espiral"), False))
+        self.assertTrue(60 <= similitud < 100)
+        # Sin coincidencias
+        self.assertEqual(indice.buscar("zzzz")[:3], (None, False, 0))
+
+    def test_se_actualiza_al_guardar_y_eliminar(self):
+        self.assertEqual(indice_productos.buscar("tijeras")[0], None)
+        tijeras = self._crear("Tijeras")
+        self.assertEqual(indice_productos.buscar("tijeras")[:2], (tijeras.pk, True))
+
+        tijeras.nombre = "Tijera punta roma"
+        tijeras.save()
+        self.assertFalse(indice_productos.buscar("tijeras")[1])
+        self.assertEqual(indice_productos.buscar("tijera punta roma")[:2], (tijeras.pk, True))
+
+        lapiz = self.productos["Lápiz HB"]
+        lapiz.activo = False
+        lapiz.save()
+        self.assertNotEqual(indice_productos.buscar("lapiz hb")[0], lapiz.pk)
+
+        pk = tijeras.pk
+        tijeras.delete()
+        self.assertNotEqual(indice_productos.buscar("tijera punta roma")[0], pk)
+
+    def test_ttl_recoge_cambios_sin_senales(self):
+        con_ttl, sin_ttl = IndiceProductos(ttl=300), IndiceProductos(ttl=0)
+        con_ttl.buscar("regla"), sin_ttl.buscar("regla")
+        # update() no dispara post_save
+        Producto.objects.filter(pk=self._pk("Regla 30 cm")).update(nombre="Escuadra")
+
+        self.assertEqual(con_ttl.buscar("escuadra")[0], None)
+        self.assertEqual(sin_ttl.buscar("escuadra")[:2], (self._pk("Regla 30 cm"), True))
+        con_ttl.invalidar()
+        self.assertEqual(con_ttl.buscar("escuadra")[:2], (self._pk("Regla 30 cm"), True))
+
+
+class BusquedaDbTests(CatalogoTestCase):
+    """busqueda_db.buscar con la tabla FTS5 trigram de SQLite"""
+
+    def setUp(self):
+        super().setUp()
+        if connection.vendor != "sqlite" or not busqueda_disponible(connection):
+            self.skipTest("Requiere SQLite con FTS5 y tokenizer trigram")
+
+    def test_mismas_capas_que_el_indice_en_memoria(self):
+        indice = IndiceProductos()
+        for texto in ("lapiz hb", "borr", "cuaderno", "universitario cuaderno", "30 cm", "cuadrno espirall", "zzzz"):
+            with self.subTest(texto=texto):
+                self.assertEqual(busqueda_db.buscar(texto), indice.buscar(texto))
+
+    def test_triggers_mantienen_la_tabla_fts(self):
+        tijeras = self._crear("Tijeras punta roma")
+        self.assertEqual(busqueda_db.buscar("punta"), (tijeras.pk, False, 75, []))
+
+        tijeras.nombre = "Tijeras escolares"
+        tijeras.save()
+        self.assertEqual(busqueda_db.buscar("escolar"), (tijeras.pk, False, 75, []))
+        self.assertNotEqual(busqueda_db.buscar("punta")[0], tijeras.pk)
+
+        pk = tijeras.pk
+        tijeras.delete()
+        self.assertNotEqual(busqueda_db.buscar("escolar")[0], pk)
+
+    def test_sin_indices_usa_el_indice_en_memoria(self):
+        with mock.patch.object(busqueda_db, "busqueda_disponible", return_value=False), \
+                self.assertNumQueries(1):  # la carga del índice
+            self.assertEqual(busqueda_db.buscar("lapiz hb")[:2], (self._pk("Lápiz HB"), True))
+
+
+@override_settings(CATALOGO_BUSQUEDA="db")
+class ConsultarProductoTests(TestCase):
+    def setUp(self):
+        categoria = Categoria.objects.create(nombre="Útiles")
+        self.cuaderno = Producto.objects.create(
+            nombre="Cuaderno", categoria=categoria, stock_actual=10,
+            precio_venta=Decimal("1.50"), precio_compra=Decimal("0.50"),
+        )
+
+    def test_planificacion_sin_consultas_extra(self):
+        def consultar():
+            return ejecutar_accion({"accion": "consultar_producto", "producto": "cuaderno"})
+
+        self.assertNotIn("punto_reorden", consultar())
+
+        ahora = timezone.now()
+        PronosticoDemanda.objects.create(
+            producto=self.cuaderno, metodo="suavizado", demanda_diaria=2, demanda_horizonte=14,
+            dias_historia=30, fecha_calculo=ahora,
+        )
+        SugerenciaReposicion.objects.create(
+            producto=self.cuaderno, punto_reorden=12, nivel_objetivo=30, fecha_calculo=ahora,
+        )
+        with self.assertNumQueries(2):  # búsqueda + carga del producto
+            resultado = consultar()
+        self.assertEqual((resultado["punto_reorden"], resultado["dias_cobertura"]), (12, 5))
+        self.assertTrue(resultado["reposicion"])
@@ -7,8 +7,10 @@ urlpatterns = [
     path('chat/', views.chatbot, name='chatbot'),
     path('chat/<int:conversacion_id>/', views.chatbot, name='chatbot_conversacion'),
     path('chat/api/', views.chatbot_api, name='chatbot_api'),
+    path('chat/api/stream/', views.chatbot_api_stream, name='chatbot_api_stream'),
     path('chat/nueva/', views.nueva_conversacion, name='nueva_conversacion'),
     path('chat/eliminar/<int:conversacion_id>/', views.eliminar_conversacion, name='eliminar_conversacion'),
     path('chat/mensajes/<int:conversacion_id>/', views.obtener_mensajes_conversacion, name='obtener_mensajes'),  # ✅ NUEVA RUTA
+    path('chat/productos/', views.listado_productos, name='listado_productos'),
 
 ]
@@ -1,10 +1,13 @@
-from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.shortcuts import render, get_object_or_404, redirect, aget_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST, require_http_methods
+from asgiref.sync import sync_to_async
+import asyncio
 import json
-from .services.openai_service import interpretar_mensaje
-from .services.negocio_service import ejecutar_accion
+from .services.openai_service import interpretar_mensaje_async
+from .services.negocio_service import ejecutar_accion, listado_productos as pagina_listado_productos
+from .services.respuestas import renderizar, texto_plano
 from apps.chatbot.models import MensajeChat, Conversacion
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
@@ -26,8 +29,8 @@ def chatbot(request, conversacion_id=None):
         # Redirigir a la URL con el ID para evitar crear duplicados al recargar
         return redirect('chatbot:chatbot_conversacion', conversacion_id=conversacion_actual.id)
     
-    # Cargar mensajes de la conversación actual
-    mensajes = conversacion_actual.mensajes.all()
+    # Cargar solo los mensajes más recientes (los anteriores se piden por AJAX)
+    mensajes, cursor_anteriores = conversacion_actual.pagina_mensajes()
     
     # Listar todas las conversaciones para el sidebar
     conversaciones = Conversacion.objects.all()[:20]
@@ -35,16 +38,17 @@ def chatbot(request, conversacion_id=None):
     return render(request, 'chatbot/chatbot.html', {
         'conversacion_actual': conversacion_actual,
         'mensajes': mensajes,
+        'cursor_anteriores': cursor_anteriores,
         'conversaciones': conversaciones
     })
 
 
-@require_POST
-def chatbot_api(request):
+def _leer_peticion_chat(request):
+    """Retorna (mensaje, conversacion_id, respuesta_error)"""
     try:
         body = json.loads(request.body)
     except json.JSONDecodeError:
-        return JsonResponse(
+        return None, None, JsonResponse(
             {"respuesta": "❌ Formato de mensaje inválido"},
             status=400
         )
@@ -53,48 +57,78 @@ def chatbot_api(request):
     conversacion_id = body.get("conversacion_id")
     
     if not mensaje:
-        return JsonResponse({"respuesta": "❌ Mensaje vacío"})
+        return None, None, JsonResponse({"respuesta": "❌ Mensaje vacío"})
     
     if not conversacion_id:
-        return JsonResponse({"error": "❌ ID de conversación requerido"}, status=400)
+        return None, None, JsonResponse({"error": "❌ ID de conversación requerido"}, status=400)
 
-    # Obtener conversación
-    conversacion = get_object_or_404(Conversacion, id=conversacion_id)
+    return mensaje, conversacion_id, None
 
-    # ✅ GUARDAR MENSAJE DEL USUARIO
-    MensajeChat.objects.create(
+
+async def _guardar_mensaje_usuario(conversacion, mensaje):
+    """Guarda el mensaje del usuario; retorna True si es el primero"""
+    await MensajeChat.objects.acreate(
         conversacion=conversacion,
         tipo='user',
         mensaje=mensaje
     )
     
     # Verificar si es el primer mensaje
-    es_primer_mensaje = conversacion.mensajes.count() == 1
+    es_primer_mensaje = await conversacion.mensajes.acount() == 1
     
     # Generar título automático si es el primer mensaje
     if es_primer_mensaje:
-        conversacion.generar_titulo_automatico()
+        await conversacion.agenerar_titulo_automatico()
 
-    # Interpretar con OpenAI
-    data = interpretar_mensaje(mensaje)
+    return es_primer_mensaje
 
+
+async def _responder(data):
+    """Resultado estructurado de la acción (ver ejecutar_accion)"""
     if not data:
-        respuesta = "⚠️ No entendí tu mensaje, intenta decirlo de otra forma."
-    else:
-        respuesta = ejecutar_accion(data)
+        return {"tipo": "texto", "texto": "⚠️ No entendí tu mensaje, intenta decirlo de otra forma."}
+    # La lógica de negocio usa transacciones: se ejecuta en un hilo
+    return await sync_to_async(ejecutar_accion)(data)
 
-    # ✅ GUARDAR RESPUESTA DEL BOT
-    MensajeChat.objects.create(
+
+async def _guardar_respuesta_bot(conversacion, resultado):
+    # Se guardan los datos, no el HTML: se renderiza al mostrar el mensaje
+    await MensajeChat.objects.acreate(
         conversacion=conversacion,
         tipo='bot',
-        mensaje=respuesta
+        mensaje=texto_plano(resultado),
+        datos=resultado
     )
     
     # Actualizar fecha de actualización
-    conversacion.save()
+    await conversacion.asave()
+
+
+@require_POST
+async def chatbot_api(request):
+    """
+    Vista async: mientras espera al LLM no ocupa un worker, así un solo
+    proceso ASGI atiende cientos de conversaciones a la vez.
+    """
+    mensaje, conversacion_id, error = _leer_peticion_chat(request)
+    if error:
+        return error
+
+    # Obtener conversación
+    conversacion = await aget_object_or_404(Conversacion, id=conversacion_id)
+
+    # ✅ GUARDAR MENSAJE DEL USUARIO
+    es_primer_mensaje = await _guardar_mensaje_usuario(conversacion, mensaje)
+
+    # Interpretar (local, caché u OpenAI async)
+    data = await interpretar_mensaje_async(mensaje)
+    resultado = await _responder(data)
+
+    # ✅ GUARDAR RESPUESTA DEL BOT
+    await _guardar_respuesta_bot(conversacion, resultado)
 
     # ✅ DEVOLVER TAMBIÉN EL TÍTULO SI ES EL PRIMER MENSAJE
-    response_data = {"respuesta": respuesta}
+    response_data = {"respuesta": renderizar(resultado)}
     
     if es_primer_mensaje:
         response_data["nuevo_titulo"] = conversacion.titulo
@@ -103,6 +137,73 @@ def chatbot_api(request):
     return JsonResponse(response_data)
 
 
+# Tamaño aproximado (caracteres) de cada fragmento de respuesta enviado
+TAMANO_FRAGMENTO = 400
+
+
+def _evento_sse(evento, data):
+    return f"event: {evento}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _fragmentar(texto, tamano=TAMANO_FRAGMENTO):
+    """Divide la respuesta en fragmentos de líneas completas"""
+    fragmento = ""
+    for linea in texto.splitlines(keepends=True):
+        fragmento += linea
+        if len(fragmento) >= tamano:
+            yield fragmento
+            fragmento = ""
+    if fragmento:
+        yield fragmento
+
+
+@require_POST
+async def chatbot_api_stream(request):
+    """
+    Igual que chatbot_api pero con Server-Sent Events: envía el progreso
+    (estado, título, intención) y la respuesta por fragmentos a medida que
+    están disponibles. Eventos: estado, titulo, intencion, fragmento, fin.
+    """
+    mensaje, conversacion_id, error = _leer_peticion_chat(request)
+    if error:
+        return error
+
+    conversacion = await aget_object_or_404(Conversacion, id=conversacion_id)
+
+    async def eventos():
+        resultado = None
+        guardada = False
+        try:
+            yield _evento_sse("estado", {"etapa": "recibido"})
+
+            es_primer_mensaje = await _guardar_mensaje_usuario(conversacion, mensaje)
+            if es_primer_mensaje:
+                yield _evento_sse("titulo", {"nuevo_titulo": conversacion.titulo})
+
+            yield _evento_sse("estado", {"etapa": "interpretando"})
+            data = await interpretar_mensaje_async(mensaje)
+            yield _evento_sse("intencion", data or {})
+
+            yield _evento_sse("estado", {"etapa": "ejecutando", "accion": (data or {}).get("accion")})
+            resultado = await _responder(data)
+
+            for fragmento in _fragmentar(renderizar(resultado)):
+                yield _evento_sse("fragmento", {"texto": fragmento})
+
+            await _guardar_respuesta_bot(conversacion, resultado)
+            guardada = True
+            yield _evento_sse("fin", {"es_primer_mensaje": es_primer_mensaje})
+        finally:
+            if resultado is not None and not guardada:
+                # El cliente se desconectó a mitad del stream: persistir igual
+                await asyncio.shield(_guardar_respuesta_bot(conversacion, resultado))
+
+    response = StreamingHttpResponse(eventos(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # sin buffer en nginx
+    return response
+
+
 @require_POST
 def nueva_conversacion(request):
     """Crear nueva conversación"""
@@ -140,14 +241,25 @@ def eliminar_conversacion(request, conversacion_id):
         
 @require_GET
 def obtener_mensajes_conversacion(request, conversacion_id):
-    """Obtener mensajes de una conversación via AJAX"""
+    """
+    Obtener mensajes de una conversación via AJAX.
+    Devuelve la página más reciente; con ?antes=<cursor> la página anterior
+    a ese cursor ("cargar mensajes anteriores").
+    """
     conversacion = get_object_or_404(Conversacion, id=conversacion_id)
-    mensajes = conversacion.mensajes.all()
+
+    try:
+        limite = max(0, min(int(request.GET.get('limite', 0)), 100)) or None
+        mensajes, cursor_anteriores = conversacion.pagina_mensajes(
+            antes=request.GET.get('antes'), limite=limite
+        )
+    except ValueError:
+        return JsonResponse({'error': '❌ Parámetros de paginación inválidos'}, status=400)
     
     mensajes_data = [
         {
             'tipo': msg.tipo,
-            'mensaje': msg.mensaje,
+            'mensaje': msg.html,
             'fecha': msg.fecha.strftime('%H:%M')
         }
         for msg in mensajes
@@ -156,5 +268,16 @@ def obtener_mensajes_conversacion(request, conversacion_id):
     return JsonResponse({
         'conversacion_id': conversacion.id,
         'titulo': conversacion.titulo,
-        'mensajes': mensajes_data
-    })
\ No newline at end of file
+        'mensajes': mensajes_data,
+        'cursor_anteriores': cursor_anteriores
+    })
+
+
+@require_GET
+def listado_productos(request):
+    """Otra página del listado de productos de una respuesta del chat (HTML)"""
+    try:
+        pagina = int(request.GET.get('pagina', 1))
+    except ValueError:
+        pagina = 1
+    return JsonResponse({'html': renderizar(pagina_listado_productos(pagina))})
@@ -0,0 +1,149 @@
+"""
+Instantánea columnar de los items vendidos para análisis pesados.
+
+exportar_ventas() vuelca ItemVenta a un arreglo binario por columna en
+ANALITICA_DIR (little-endian, sin cabecera):
+
+    fecha.bin            int64   segundos Unix de la venta
+    producto.bin         int32   id del producto
+    cantidad.bin         int32
+    precio_centavos.bin  int64   precio unitario × 100
+    costo_centavos.bin   int64   costo unitario × 100
+
+meta.json guarda el número de filas válidas y la marca de agua (último id
+de ItemVenta exportado); cada ejecución agrega solo los items nuevos. Si
+una exportación se interrumpe, los bytes sobrantes se descartan en la
+siguiente porque meta.json se actualiza al final (reemplazo atómico).
+
+abrir_ventas() devuelve las columnas como np.memmap de solo lectura: el
+sistema operativo pagina los datos bajo demanda, sin copiarlos ni crear
+un objeto por fila. Ejemplo (unidades por producto):
+
+    columnas = abrir_ventas()
+    unidades = np.bincount(columnas['producto'], weights=columnas['cantidad'])
+
+Los items editados o borrados después de exportarse no se reflejan:
+usar reconstruir=True (comando exportar_ventas --reconstruir).
+"""
+import json
+import os
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ItemVenta
+
+COLUMNAS = {
+    'fecha': np.dtype('<i8'),
+    'producto': np.dtype('<i4'),
+    'cantidad': np.dtype('<i4'),
+    'precio_centavos': np.dtype('<i8'),
+    'costo_centavos': np.dtype('<i8'),
+}
+FORMATO = 1
+
+# Los items de ventas creadas hace menos de esto esperan a la siguiente
+# exportación: una transacción con un id menor aún podría no haber confirmado
+MARGEN_CONFIRMACION = timedelta(seconds=10)
+
+
+def _directorio(directorio=None):
+    return Path(directorio or getattr(settings, 'ANALITICA_DIR', settings.BASE_DIR / 'analitica'))
+
+
+def leer_meta(directorio=None):
+    ruta = _directorio(directorio) / 'meta.json'
+    if not ruta.exists():
+        return {'formato': FORMATO, 'filas': 0, 'ultimo_id': 0}
+    with open(ruta) as archivo:
+        meta = json.load(archivo)
+    if meta.get('formato') != FORMATO:
+        raise ValueError(f"Formato de instantánea {meta.get('formato')} no soportado; usar --reconstruir")
+    return meta
+
+
+def _guardar_meta(directorio, meta):
+    temporal = directorio / 'meta.json.tmp'
+    with open(temporal, 'w') as archivo:
+        json.dump(meta, archivo, indent=2)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, directorio / 'meta.json')
+
+
+def _centavos(valor):
+    return int(valor.scaleb(2))
+
+
+def exportar_ventas(directorio=None, lote=50000, reconstruir=False, margen=MARGEN_CONFIRMACION):
+    """
+    Agrega a la instantánea los items con id mayor a la marca de agua.
+    Retorna (filas agregadas, filas totales).
+    """
+    directorio = _directorio(directorio)
+    directorio.mkdir(parents=True, exist_ok=True)
+    meta = {'formato': FORMATO, 'filas': 0, 'ultimo_id': 0} if reconstruir else leer_meta(directorio)
+
+    # Descarta lo escrito por una exportación interrumpida (o todo, si se reconstruye)
+    for columna, dtype in COLUMNAS.items():
+        with open(directorio / f'{columna}.bin', 'ab') as archivo:
+            archivo.truncate(meta['filas'] * dtype.itemsize)
+
+    limite = timezone.now() - margen
+    pendientes = (
+        ItemVenta.objects
+        .order_by('pk')
+        .values_list(
+            'pk', 'venta__fecha_creacion', 'venta__fecha', 'producto_id', 'cantidad',
+            'precio_unitario', 'costo_unitario',
+        )
+    )
+    tipo_fila = np.dtype([('id', '<i8'), *COLUMNAS.items()])
+
+    agregadas = 0
+    archivos = {columna: open(directorio / f'{columna}.bin', 'ab') for columna in COLUMNAS}
+    try:
+        while True:
+            bloque = list(pendientes.filter(pk__gt=meta['ultimo_id'])[:lote])
+            # El lote se corta en el primer item demasiado reciente: la marca
+            # de agua no puede pasar por encima de una fila sin exportar
+            corte = next((i for i, fila in enumerate(bloque) if fila[1] > limite), len(bloque))
+            filas = np.fromiter(
+                (
+                    (pk, int(fecha.timestamp()), producto, cantidad, _centavos(precio), _centavos(costo))
+                    for pk, _, fecha, producto, cantidad, precio, costo in bloque[:corte]
+                ),
+                dtype=tipo_fila,
+            )
+            if len(filas):
+                for columna, archivo in archivos.items():
+                    archivo.write(np.ascontiguousarray(filas[columna]).tobytes())
+                meta['ultimo_id'] = int(filas['id'][-1])
+                meta['filas'] += len(filas)
+                agregadas += len(filas)
+            if corte < lote:
+                break
+    finally:
+        for archivo in archivos.values():
+            archivo.flush()
+            os.fsync(archivo.fileno())
+            archivo.close()
+
+    meta['actualizado'] = timezone.now().isoformat()
+    _guardar_meta(directorio, meta)
+    return agregadas, meta['filas']
+
+
+def abrir_ventas(directorio=None):
+    """{columna: np.memmap de solo lectura} con las filas confirmadas en meta.json"""
+    directorio = _directorio(directorio)
+    filas = leer_meta(directorio)['filas']
+    if not filas:
+        return {columna: np.empty(0, dtype=dtype) for columna, dtype in COLUMNAS.items()}
+    return {
+        columna: np.memmap(directorio / f'{columna}.bin', dtype=dtype, mode='r', shape=(filas,))
+        for columna, dtype in COLUMNAS.items()
+    }
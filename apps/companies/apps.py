@@ -1,5 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def instalar_busqueda(sender, using, **kwargs):
+    from django.db import connections
+    from .busqueda import instalar_indices_busqueda
+    instalar_indices_busqueda(connections[using])
 
 
 class CompaniesConfig(AppConfig):
     name = 'apps.companies'
+
+    def ready(self):
+        post_migrate.connect(instalar_busqueda, sender=self)
+
+        from .cache_dashboard import conectar_invalidacion
+        conectar_invalidacion()
+
+        from .ventas import conectar_resumen_diario
+        conectar_resumen_diario()
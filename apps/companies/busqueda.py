@@ -0,0 +1,153 @@
+"""
+Índices de búsqueda de productos del lado de la base de datos.
+
+- PostgreSQL: extensión pg_trgm + índice GIN (gin_trgm_ops) sobre
+  Producto.nombre_normalizado, usado por LIKE '%...%' y el operador %.
+- SQLite: tabla virtual FTS5 con tokenizer trigram sincronizada con
+  companies_producto mediante triggers.
+
+Los triggers de SQLite se pierden cuando Django reconstruye la tabla en
+una migración, por eso instalar_indices_busqueda() es idempotente y se
+vuelve a ejecutar en cada post_migrate.
+
+CREATE EXTENSION pg_trgm requiere un rol con privilegios (superusuario o
+dueño de la base en PostgreSQL 13+ con extensión "trusted"). Si el rol de
+la aplicación no los tiene, la migración sigue sin el índice GIN y la
+búsqueda usa el índice en memoria (busqueda_disponible() es False) hasta
+que un administrador ejecute "CREATE EXTENSION pg_trgm;" y se vuelva a
+correr migrate.
+"""
+import logging
+
+from django.db import transaction
+from django.db.utils import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+TABLA_PRODUCTO = 'companies_producto'
+FTS_TABLA = 'companies_producto_fts'
+GIN_INDICE = 'companies_producto_nombre_trgm'
+
+_SQL_SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_ai AFTER INSERT ON {TABLA_PRODUCTO} BEGIN
+        INSERT INTO {FTS_TABLA}(rowid, nombre_normalizado)
+        VALUES (new.id, new.nombre_normalizado);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_ad AFTER DELETE ON {TABLA_PRODUCTO} BEGIN
+        INSERT INTO {FTS_TABLA}({FTS_TABLA}, rowid, nombre_normalizado)
+        VALUES ('delete', old.id, old.nombre_normalizado);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_au AFTER UPDATE OF nombre_normalizado ON {TABLA_PRODUCTO} BEGIN
+        INSERT INTO {FTS_TABLA}({FTS_TABLA}, rowid, nombre_normalizado)
+        VALUES ('delete', old.id, old.nombre_normalizado);
+        INSERT INTO {FTS_TABLA}(rowid, nombre_normalizado)
+        VALUES (new.id, new.nombre_normalizado);
+    END
+    """,
+]
+
+# Resultado de busqueda_disponible() por alias de conexión
+_disponible_por_alias = {}
+
+
+def _trgm_instalado(cursor):
+    cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    return cursor.fetchone() is not None
+
+
+def _instalar_postgresql(connection, cursor):
+    try:
+        # Savepoint: el error no debe abortar la transacción de la migración
+        with transaction.atomic(using=connection.alias):
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as error:
+        if not _trgm_instalado(cursor):
+            logger.warning(
+                "No se pudo crear la extensión pg_trgm (%s); la búsqueda de productos "
+                "usará el índice en memoria. Ejecutar como superusuario: CREATE EXTENSION pg_trgm;",
+                error,
+            )
+            return
+    cursor.execute(
+        f"CREATE INDEX IF NOT EXISTS {GIN_INDICE} "
+        f"ON {TABLA_PRODUCTO} USING gin (nombre_normalizado gin_trgm_ops)"
+    )
+
+
+def _instalar_sqlite(cursor):
+    try:
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLA} USING fts5("
+            f"nombre_normalizado, content='{TABLA_PRODUCTO}', content_rowid='id', "
+            f"tokenize='trigram')"
+        )
+    except DatabaseError:
+        # SQLite compilado sin FTS5 o anterior a 3.34 (sin tokenizer trigram)
+        return
+
+    cursor.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+        [f"{FTS_TABLA}_a_"],
+    )
+    triggers_existentes = cursor.fetchone()[0]
+
+    for sql in _SQL_SQLITE_TRIGGERS:
+        cursor.execute(sql)
+
+    if triggers_existentes < len(_SQL_SQLITE_TRIGGERS):
+        # Índice creado ahora o triggers perdidos: reindexar desde la tabla
+        cursor.execute(f"INSERT INTO {FTS_TABLA}({FTS_TABLA}) VALUES ('rebuild')")
+
+
+def _columna_disponible(connection, cursor):
+    if TABLA_PRODUCTO not in connection.introspection.table_names(cursor):
+        return False
+    columnas = connection.introspection.get_table_description(cursor, TABLA_PRODUCTO)
+    return any(columna.name == 'nombre_normalizado' for columna in columnas)
+
+
+def instalar_indices_busqueda(connection):
+    """Crea (si faltan) los índices de búsqueda para la base de datos dada"""
+    with connection.cursor() as cursor:
+        if not _columna_disponible(connection, cursor):
+            # Migraciones de companies revertidas por debajo de 0002
+            pass
+        elif connection.vendor == 'postgresql':
+            _instalar_postgresql(connection, cursor)
+        elif connection.vendor == 'sqlite':
+            _instalar_sqlite(cursor)
+    _disponible_por_alias.pop(connection.alias, None)
+
+
+def eliminar_indices_busqueda(connection):
+    """Revierte instalar_indices_busqueda()"""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {GIN_INDICE}")
+        elif connection.vendor == 'sqlite':
+            for sufijo in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLA}_{sufijo}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLA}")
+    _disponible_por_alias.pop(connection.alias, None)
+
+
+def busqueda_disponible(connection):
+    """
+    Indica si existen los índices de búsqueda en esta conexión: la tabla
+    FTS5 en SQLite o la extensión pg_trgm en PostgreSQL
+    """
+    if connection.alias not in _disponible_por_alias:
+        if connection.vendor == 'sqlite':
+            disponible = FTS_TABLA in connection.introspection.table_names()
+        elif connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                disponible = _trgm_instalado(cursor)
+        else:
+            disponible = False
+        _disponible_por_alias[connection.alias] = disponible
+    return _disponible_por_alias[connection.alias]
@@ -0,0 +1,82 @@
+"""
+Caché versionada de las métricas del dashboard.
+
+Una "versión de datos" en la caché de Django cambia cada vez que se
+escribe una venta, un item o un producto (señales + invalidar_dashboard()
+en las escrituras masivas). Las métricas se guardan bajo esa versión y el
+día actual, así un sondeo sin cambios no toca la base de datos: la vista
+responde 304 comparando solo el ETag.
+
+Con varios procesos (gunicorn, etc.) CACHES debe apuntar a una caché
+compartida (Redis, Memcached o base de datos); LocMemCache es por proceso.
+"""
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import ItemVenta, Producto, Venta, VentaDiaria
+
+CLAVE_VERSION = 'companies:dashboard:version'
+
+
+def _nueva_version():
+    # Basada en el reloj: un reinicio con caché vacía nunca repite versión
+    return time.time_ns(), time.time()
+
+
+def version_datos():
+    """(version, datetime de la última escritura)"""
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, _nueva_version(), None)
+        version = cache.get(CLAVE_VERSION) or _nueva_version()
+    numero, marca = version
+    return numero, datetime.fromtimestamp(marca, tz=dt_timezone.utc)
+
+
+def invalidar_dashboard():
+    """Cambia la versión de datos cuando la transacción actual confirma"""
+    transaction.on_commit(lambda: cache.set(CLAVE_VERSION, _nueva_version(), None))
+
+
+def etag_dashboard(request=None):
+    version, _ = version_datos()
+    # El día entra en el ETag: "ventas de hoy" cambia a medianoche sin escrituras
+    return f'"{version:x}-{timezone.localdate():%Y%m%d}"'
+
+
+def ultima_modificacion(request=None):
+    _, modificado = version_datos()
+    inicio_dia = timezone.make_aware(
+        datetime.combine(timezone.localdate(), datetime.min.time())
+    )
+    return max(modificado, inicio_dia)
+
+
+def datos_dashboard():
+    """Métricas de metricas_dashboard() para la versión de datos actual"""
+    # Import diferido: metricas usa módulos que a su vez invalidan esta caché
+    from .metricas import metricas_dashboard
+
+    version, _ = version_datos()
+    clave = f'companies:dashboard:{version}:{timezone.localdate():%Y%m%d}'
+    datos = cache.get(clave)
+    if datos is None:
+        datos = metricas_dashboard()
+        cache.set(clave, datos, getattr(settings, 'DASHBOARD_CACHE_TTL', 300))
+    return datos
+
+
+def _escritura(sender, **kwargs):
+    invalidar_dashboard()
+
+
+def conectar_invalidacion():
+    for modelo in (Venta, ItemVenta, Producto, VentaDiaria):
+        post_save.connect(_escritura, sender=modelo, dispatch_uid=f'dashboard_{modelo.__name__}_save')
+        post_delete.connect(_escritura, sender=modelo, dispatch_uid=f'dashboard_{modelo.__name__}_delete')
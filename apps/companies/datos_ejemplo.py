@@ -0,0 +1,300 @@
+"""
+Generador de datos de ejemplo (comando seed_data), también para pruebas
+de rendimiento con catálogos e historiales grandes.
+
+Todo se decide primero con NumPy y una semilla fija (misma semilla y
+parámetros → mismos productos, ventas e items):
+
+- popularidad de cola larga: el peso del producto de rango k es 1/k^s
+  (Zipf), repartido al azar en el catálogo
+- estacionalidad: más ventas al inicio de clases (abril y septiembre),
+  los fines de semana, y una leve tendencia creciente
+- items por venta y cantidades: pocos por ticket, con cola hacia arriba
+
+Luego se inserta en lotes con bulk_create. Los contadores de Producto y
+el resumen diario (VentaDiaria) salen de los mismos arreglos, sin
+volver a leer los items.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .cache_dashboard import invalidar_dashboard
+from .models import (
+    Categoria, Compra, ItemCompra, ItemVenta, Producto, Proveedor, PronosticoDemanda,
+    SugerenciaReposicion, Venta, VentaDiaria, normalizar_texto,
+)
+
+CATEGORIAS = [
+    ('Libros', 'Libros de diversos géneros'),
+    ('Cuadernos', 'Cuadernos y libretas'),
+    ('Útiles Escolares', 'Lápices, plumas, borradores'),
+    ('Papelería', 'Hojas, folders, sobres'),
+    ('Arte', 'Material de arte y manualidades'),
+]
+
+PROVEEDORES = [
+    ('Distribuidora LibroMax', '0991234567', 'ventas@libromax.com'),
+    ('Papelería El Estudiante', '0987654321', 'info@elestudiante.com'),
+    ('Arte y Diseño SA', '0998765432', 'contacto@artediseno.com'),
+]
+
+# (nombre, categoría, costo, precio, stock, stock mínimo)
+CATALOGO = [
+    # Libros
+    ('Cien Años de Soledad', 'Libros', 8.50, 15.00, 20, 5),
+    ('Don Quijote de la Mancha', 'Libros', 10.00, 18.00, 15, 3),
+    ('El Principito', 'Libros', 5.00, 10.00, 30, 5),
+    ('Harry Potter y la Piedra Filosofal', 'Libros', 12.00, 22.00, 12, 3),
+    ('1984 - George Orwell', 'Libros', 7.00, 13.00, 18, 4),
+    ('Crónica de una Muerte Anunciada', 'Libros', 6.50, 12.00, 25, 5),
+
+    # Cuadernos
+    ('Cuaderno Universitario 100 hojas', 'Cuadernos', 1.20, 2.50, 80, 10),
+    ('Cuaderno Espiral A4', 'Cuadernos', 1.50, 3.00, 60, 10),
+    ('Libreta Pequeña 50 hojas', 'Cuadernos', 0.80, 1.50, 100, 15),
+    ('Cuaderno Empastado 200 hojas', 'Cuadernos', 2.50, 5.00, 40, 8),
+    ('Cuaderno de Dibujo A3', 'Cuadernos', 3.00, 6.00, 25, 5),
+
+    # Útiles Escolares
+    ('Lápiz Grafito HB (unidad)', 'Útiles Escolares', 0.20, 0.50, 200, 30),
+    ('Borrador Blanco', 'Útiles Escolares', 0.15, 0.35, 150, 25),
+    ('Sacapuntas Metálico', 'Útiles Escolares', 0.30, 0.70, 100, 20),
+    ('Bolígrafo Azul', 'Útiles Escolares', 0.25, 0.60, 180, 30),
+    ('Bolígrafo Negro', 'Útiles Escolares', 0.25, 0.60, 180, 30),
+    ('Regla 30cm', 'Útiles Escolares', 0.50, 1.20, 70, 10),
+    ('Tijeras Escolares', 'Útiles Escolares', 1.00, 2.50, 50, 8),
+    ('Pegamento en Barra', 'Útiles Escolares', 0.80, 1.80, 90, 15),
+    ('Corrector Líquido', 'Útiles Escolares', 0.90, 2.00, 60, 10),
+
+    # Papelería
+    ('Resma de Papel A4 (500 hojas)', 'Papelería', 3.50, 7.00, 30, 5),
+    ('Folder Manila (paquete 10)', 'Papelería', 1.00, 2.50, 40, 8),
+    ('Sobres Carta (paquete 25)', 'Papelería', 1.50, 3.50, 35, 7),
+    ('Papel Bond Colores (100 hojas)', 'Papelería', 2.00, 4.50, 25, 5),
+
+    # Arte
+    ('Caja de Colores 12 unidades', 'Arte', 2.50, 5.00, 45, 8),
+    ('Caja de Colores 24 unidades', 'Arte', 4.50, 9.00, 30, 6),
+    ('Temperas x6 colores', 'Arte', 3.00, 6.50, 35, 7),
+    ('Pinceles Set x3', 'Arte', 2.00, 4.50, 40, 8),
+    ('Cartulina A3 (unidad)', 'Arte', 0.30, 0.70, 120, 20),
+    ('Marcadores Permanentes x4', 'Arte', 2.50, 5.50, 50, 10),
+]
+
+# Exponente de la distribución de popularidad (mayor → cola más larga)
+EXPONENTE_ZIPF = 1.1
+# Días del año con más ventas (inicio de clases en la Costa y en la Sierra)
+PICOS_TEMPORADA = (95, 245)
+# Lunes a domingo
+FACTOR_SEMANA = np.array([1.0, 0.95, 1.0, 1.05, 1.15, 1.3, 0.55])
+HORA_APERTURA, HORA_CIERRE = 8, 21
+
+
+def vaciar_datos():
+    """
+    Borra compras, ventas, productos, proveedores y categorías con un
+    DELETE por tabla: QuerySet.delete() traería cada fila a Python para
+    las señales, inviable con millones de items.
+    """
+    modelos = [
+        ItemCompra, Compra, SugerenciaReposicion, PronosticoDemanda, VentaDiaria,
+        ItemVenta, Venta, Producto, Proveedor, Categoria,
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        for modelo in modelos:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+        invalidar_dashboard()
+
+
+def _popularidad(rng, productos):
+    pesos = 1.0 / np.arange(1, productos + 1) ** EXPONENTE_ZIPF
+    rng.shuffle(pesos)
+    return pesos / pesos.sum()
+
+
+def _peso_dias(fechas):
+    dia_anio = np.array([fecha.timetuple().tm_yday for fecha in fechas])
+    temporada = 1 + sum(0.8 * np.exp(-((dia_anio - pico) / 12.0) ** 2) for pico in PICOS_TEMPORADA)
+    semana = FACTOR_SEMANA[[fecha.weekday() for fecha in fechas]]
+    tendencia = np.linspace(0.85, 1.15, len(fechas))
+    return temporada * semana * tendencia
+
+
+def _centavos(valores):
+    return np.round(np.asarray(valores) * 100).astype(np.int64)
+
+
+def _decimal(centavos):
+    return Decimal(int(centavos)).scaleb(-2)
+
+
+def generar_datos(productos=30, ventas=60, dias=30, proveedores=3, items_max=5,
+                  semilla=42, lote=5000, progreso=None):
+    """
+    Reemplaza los datos por un catálogo de `productos` productos y
+    `ventas` ventas repartidas en los últimos `dias` días (hoy incluido,
+    sin ventas en el futuro). Los primeros productos y proveedores son los
+    del catálogo fijo; el resto son variantes. Retorna los conteos creados.
+    """
+    progreso = progreso or (lambda mensaje: None)
+    rng = np.random.default_rng(semilla)
+
+    # --- Catálogo ---
+    plantilla = np.arange(productos) % len(CATALOGO)
+    variante = np.arange(productos) // len(CATALOGO)
+    _, categoria_de, costo, precio, stock, minimo = zip(*CATALOGO)
+    factor = np.where(variante > 0, rng.lognormal(0, 0.25, productos), 1.0)
+    costo_c = np.maximum(_centavos(np.array(costo)[plantilla] * factor), 1)
+    precio_c = np.maximum(_centavos(np.array(precio)[plantilla] * factor), costo_c + 1)
+    stock_minimo = np.array(minimo)[plantilla]
+    proveedor_de = rng.integers(0, proveedores, productos)
+    popularidad = _popularidad(rng, productos)
+
+    # --- Calendario: días con peso estacional; hoy solo hasta la hora actual ---
+    ahora = timezone.localtime()
+    primer_dia = ahora.date() - timedelta(days=dias - 1)
+    inicio = timezone.make_aware(datetime.combine(primer_dia, time.min))
+    fechas = [primer_dia + timedelta(days=d) for d in range(dias)]
+    apertura = np.full(dias, HORA_APERTURA * 3600)
+    cierre = np.full(dias, HORA_CIERRE * 3600)
+    segundos_hoy = ahora.hour * 3600 + ahora.minute * 60 + ahora.second
+    cierre[-1] = np.clip(segundos_hoy, apertura[-1], cierre[-1])
+    pesos_dias = _peso_dias(fechas) * (cierre - apertura) / ((HORA_CIERRE - HORA_APERTURA) * 3600)
+
+    if not pesos_dias.sum():
+        if ventas:
+            raise ValueError("Aún no abre el local hoy: usar al menos 2 días para generar ventas")
+        pesos_dias[:] = 1
+
+    # --- Ventas (ordenadas por fecha, como si se registraran en orden) ---
+    dia_venta = rng.choice(dias, size=ventas, p=pesos_dias / pesos_dias.sum())
+    segundo = apertura[dia_venta] + (rng.random(ventas) * (cierre - apertura)[dia_venta]).astype(np.int64)
+    orden = np.argsort(dia_venta * 86400 + segundo, kind='stable')
+    dia_venta, segundo = dia_venta[orden], segundo[orden]
+
+    items_por_venta = np.minimum(1 + rng.poisson(1.2, ventas), items_max)
+    venta_de_item = np.repeat(np.arange(ventas), items_por_venta)
+    producto_de_item = rng.choice(productos, size=len(venta_de_item), p=popularidad)
+    cantidad = np.minimum(rng.geometric(0.55, len(venta_de_item)), 12)
+    subtotal_c = cantidad * precio_c[producto_de_item]
+    dia_item = dia_venta[venta_de_item]
+
+    # --- Contadores, stock y total de cada venta ---
+    vendidas = np.bincount(producto_de_item, weights=cantidad, minlength=productos).astype(np.int64)
+    ingresos_c = np.bincount(producto_de_item, weights=subtotal_c, minlength=productos).astype(np.int64)
+    ultima = np.full(productos, -1, dtype=np.int64)
+    np.maximum.at(ultima, producto_de_item, (dia_venta * 86400 + segundo)[venta_de_item])
+    diaria = vendidas / dias
+    stock_actual = rng.poisson(
+        np.array(stock)[plantilla] * rng.uniform(0.1, 1.5, productos) + diaria * rng.uniform(0, 30, productos)
+    )
+    total_c = np.bincount(venta_de_item, weights=subtotal_c, minlength=ventas).astype(np.int64)
+
+    def fecha(segundos):
+        return inicio + timedelta(seconds=int(segundos))
+
+    progreso('Limpiando datos anteriores...')
+    vaciar_datos()
+
+    with transaction.atomic():
+        progreso('Creando categorías y proveedores...')
+        categorias = {
+            nombre: categoria
+            for (nombre, _), categoria in zip(CATEGORIAS, Categoria.objects.bulk_create(
+                [Categoria(nombre=nombre, descripcion=descripcion) for nombre, descripcion in CATEGORIAS]
+            ))
+        }
+        entregas = rng.integers(2, 15, proveedores)
+        datos_proveedores = PROVEEDORES + [
+            (f'Distribuidora {i + 1:04d}', None, None) for i in range(len(PROVEEDORES), proveedores)
+        ]
+        proveedores_creados = Proveedor.objects.bulk_create([
+            Proveedor(nombre=nombre, telefono=telefono, email=email, dias_entrega=int(entrega))
+            for (nombre, telefono, email), entrega in zip(datos_proveedores, entregas)
+        ])
+
+        progreso(f'Creando {productos} productos...')
+        producto_pks = []
+        for desde in range(0, productos, lote):
+            nuevos = []
+            for i in range(desde, min(desde + lote, productos)):
+                nombre = CATALOGO[plantilla[i]][0]
+                if variante[i]:
+                    nombre = f'{nombre} - Ref. {variante[i]:05d}'
+                nuevos.append(Producto(
+                    nombre=nombre,
+                    # bulk_create no llama a Producto.save()
+                    nombre_normalizado=normalizar_texto(nombre),
+                    categoria=categorias[categoria_de[plantilla[i]]],
+                    proveedor=proveedores_creados[proveedor_de[i]],
+                    precio_venta=_decimal(precio_c[i]),
+                    precio_compra=_decimal(costo_c[i]),
+                    stock_actual=int(stock_actual[i]),
+                    stock_minimo=int(stock_minimo[i]),
+                    unidades_vendidas=int(vendidas[i]),
+                    ingresos_totales=_decimal(ingresos_c[i]),
+                    fecha_ultima_venta=fecha(ultima[i]) if ultima[i] >= 0 else None,
+                ))
+            producto_pks += [producto.pk for producto in Producto.objects.bulk_create(nuevos, batch_size=1000)]
+        precios = [_decimal(c) for c in precio_c]
+        costos = [_decimal(c) for c in costo_c]
+
+        progreso(f'Creando {ventas} ventas con {len(venta_de_item)} items...')
+        limites = np.searchsorted(venta_de_item, np.arange(0, ventas + lote, lote))
+        for n, desde in enumerate(range(0, ventas, lote)):
+            hasta = min(desde + lote, ventas)
+            creadas = Venta.objects.bulk_create([
+                Venta(fecha=fecha(dia * 86400 + seg), total=_decimal(total))
+                for dia, seg, total in zip(
+                    dia_venta[desde:hasta].tolist(), segundo[desde:hasta].tolist(), total_c[desde:hasta].tolist()
+                )
+            ], batch_size=1000)
+            items = slice(limites[n], limites[n + 1])
+            ItemVenta.objects.bulk_create([
+                ItemVenta(
+                    venta_id=creadas[venta - desde].pk,
+                    producto_id=producto_pks[producto],
+                    cantidad=c,
+                    precio_unitario=precios[producto],
+                    costo_unitario=costos[producto],
+                    subtotal=_decimal(subtotal),
+                )
+                for venta, producto, c, subtotal in zip(
+                    venta_de_item[items].tolist(), producto_de_item[items].tolist(),
+                    cantidad[items].tolist(), subtotal_c[items].tolist(),
+                )
+            ], batch_size=1000)
+
+        progreso('Creando el resumen diario...')
+        clave, grupo = np.unique(dia_item * productos + producto_de_item, return_inverse=True)
+        unidades = np.bincount(grupo, weights=cantidad).astype(np.int64)
+        ingresos = np.bincount(grupo, weights=subtotal_c).astype(np.int64)
+        costo_dia = np.bincount(grupo, weights=cantidad * costo_c[producto_de_item]).astype(np.int64)
+        for desde in range(0, len(clave), lote):
+            VentaDiaria.objects.bulk_create([
+                VentaDiaria(
+                    fecha=fechas[k // productos],
+                    producto_id=producto_pks[k % productos],
+                    unidades=u,
+                    ingresos=_decimal(i),
+                    costo=_decimal(c),
+                )
+                for k, u, i, c in zip(
+                    clave[desde:desde + lote].tolist(), unidades[desde:desde + lote].tolist(),
+                    ingresos[desde:desde + lote].tolist(), costo_dia[desde:desde + lote].tolist(),
+                )
+            ], batch_size=1000)
+        invalidar_dashboard()
+
+    return {
+        'categorias': len(categorias),
+        'proveedores': proveedores,
+        'productos': productos,
+        'ventas': ventas,
+        'items': len(venta_de_item),
+        'ventas_diarias': len(clave),
+    }
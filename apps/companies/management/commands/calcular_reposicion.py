@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.companies.reposicion import calcular_reposicion, generar_borradores_compra
+
+
+class Command(BaseCommand):
+    help = (
+        'Calcula punto de reorden y nivel objetivo de cada producto a partir de '
+        'la demanda pronosticada; con --borradores crea compras sugeridas por proveedor'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nivel-servicio', type=float,
+                            help='Probabilidad de no quedarse sin stock durante la entrega (por defecto 0.95)')
+        parser.add_argument('--dias-revision', type=int,
+                            help='Días entre pedidos al mismo proveedor (por defecto 7)')
+        parser.add_argument('--borradores', action='store_true',
+                            help='Reemplaza las compras en borrador por los pedidos sugeridos')
+
+    def handle(self, *args, **options):
+        nivel_servicio = options['nivel_servicio']
+        if nivel_servicio is not None and not 0.5 <= nivel_servicio < 1:
+            raise CommandError("--nivel-servicio debe estar entre 0.5 y 1")
+
+        t0 = time.perf_counter()
+        calculados = calcular_reposicion(
+            nivel_servicio=nivel_servicio, dias_revision=options['dias_revision']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Puntos de reorden calculados: {calculados} productos en {time.perf_counter() - t0:.2f}s"
+        ))
+
+        if options['borradores']:
+            compras = generar_borradores_compra()
+            for compra in compras:
+                self.stdout.write(f"  - Borrador {compra.pk}: proveedor {compra.proveedor_id}, ${compra.total}")
+            self.stdout.write(self.style.SUCCESS(f"Compras en borrador: {len(compras)}"))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.companies.models import Compra
+
+
+class Command(BaseCommand):
+    help = (
+        'Confirma compras en borrador (p. ej. las de calcular_reposicion --borradores): '
+        'suma al stock las cantidades de sus items'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('ids', nargs='*', type=int, help='Ids de las compras a confirmar')
+        parser.add_argument('--todas', action='store_true', help='Confirma todas las compras en borrador')
+        parser.add_argument('--dry-run', action='store_true', help='Solo lista los borradores que se confirmarían')
+
+    def handle(self, *args, **options):
+        if bool(options['ids']) == options['todas']:
+            raise CommandError("Indica los ids de las compras o --todas (no ambos)")
+
+        compras = Compra.objects.filter(estado='borrador').select_related('proveedor').order_by('pk')
+        if options['ids']:
+            compras = compras.filter(pk__in=options['ids'])
+            faltantes = set(options['ids']) - set(compras.values_list('pk', flat=True))
+            if faltantes:
+                raise CommandError(
+                    f"No son compras en borrador: {', '.join(map(str, sorted(faltantes)))}"
+                )
+
+        confirmadas = 0
+        for compra in compras:
+            self.stdout.write(f"  - Compra {compra.pk}: {compra.proveedor.nombre}, ${compra.total}")
+            if not options['dry_run'] and compra.confirmar():
+                confirmadas += 1
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"Se confirmarían {len(compras)} compras (dry-run)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Compras confirmadas: {confirmadas}"))
@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.companies.analitica import abrir_ventas, exportar_ventas
+
+
+class Command(BaseCommand):
+    help = (
+        'Exporta los items vendidos a arreglos columnares de NumPy (ANALITICA_DIR) '
+        'para leerlos con np.memmap; solo agrega lo nuevo desde la última exportación'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directorio', help='Destino (por defecto ANALITICA_DIR)')
+        parser.add_argument('--lote', type=int, default=50000,
+                            help='Items leídos por consulta (por defecto 50000)')
+        parser.add_argument('--reconstruir', action='store_true',
+                            help='Descarta la instantánea y exporta todo el historial')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError("--lote debe ser al menos 1")
+
+        t0 = time.perf_counter()
+        try:
+            agregadas, total = exportar_ventas(
+                options['directorio'], lote=options['lote'], reconstruir=options['reconstruir']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        t1 = time.perf_counter()
+
+        columnas = abrir_ventas(options['directorio'])
+        unidades = int(columnas['cantidad'].sum(dtype='int64'))
+        t2 = time.perf_counter()
+
+        tamano = sum(columna.nbytes for columna in columnas.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Exportados {agregadas} items en {t1 - t0:.2f}s; instantánea: {total} items "
+            f"({tamano / 1024 / 1024:.1f} MB)"
+        ))
+        self.stdout.write(f"Lectura con memmap: {unidades} unidades sumadas en {(t2 - t1) * 1000:.1f} ms")
@@ -0,0 +1,59 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.companies.pronostico import METODOS, calcular_pronosticos, guardar_pronosticos, matriz_demanda
+
+
+class Command(BaseCommand):
+    help = (
+        'Pronostica la demanda diaria de todos los productos activos '
+        '(media móvil, suavizado exponencial o Croston) y la guarda en PronosticoDemanda'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=90,
+                            help='Días de historia usados (por defecto 90)')
+        parser.add_argument('--horizonte', type=int, default=7,
+                            help='Días pronosticados hacia adelante (por defecto 7)')
+        parser.add_argument('--alfa', type=float, default=0.3,
+                            help='Constante de suavizado entre 0 y 1 (por defecto 0.3)')
+        parser.add_argument('--ventana', type=int, default=28,
+                            help='Días de la media móvil (por defecto 28)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Calcula y muestra el resumen sin guardar')
+
+    def handle(self, *args, **options):
+        if options['dias'] < 2 or options['horizonte'] < 1 or options['ventana'] < 1:
+            raise CommandError("--dias debe ser al menos 2; --horizonte y --ventana al menos 1")
+        if not 0 < options['alfa'] < 1:
+            raise CommandError("--alfa debe estar entre 0 y 1")
+
+        t0 = time.perf_counter()
+        productos, desde, matriz = matriz_demanda(options['dias'])
+        t1 = time.perf_counter()
+        metodo, demanda, desviacion = calcular_pronosticos(
+            matriz, alfa=options['alfa'], ventana=options['ventana']
+        )
+        t2 = time.perf_counter()
+
+        self.stdout.write(
+            f"Matriz {matriz.shape[0]} productos × {matriz.shape[1]} días desde {desde} "
+            f"({matriz.nbytes / 1024 / 1024:.1f} MB) en {t1 - t0:.2f}s; modelos en {t2 - t1:.2f}s"
+        )
+        conteo = np.bincount(metodo, minlength=len(METODOS))
+        for nombre, cantidad in zip(METODOS, conteo):
+            self.stdout.write(f"  - {nombre}: {cantidad} productos")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run: no se guardó nada"))
+            return
+
+        guardados = guardar_pronosticos(
+            productos, metodo, demanda, desviacion, options['horizonte'], options['dias']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Pronósticos guardados: {guardados} productos en {time.perf_counter() - t2:.2f}s "
+            f"(total {time.perf_counter() - t0:.2f}s)"
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from apps.companies.ventas import reconciliar_contadores
+
+
+class Command(BaseCommand):
+    help = (
+        'Recalcula los contadores de ventas de cada producto (unidades, '
+        'ingresos y última venta) a partir de los items vendidos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo muestra los productos desalineados, sin guardar cambios')
+
+    def handle(self, *args, **options):
+        corregidos = reconciliar_contadores(dry_run=options['dry_run'])
+
+        for producto in corregidos[:20]:
+            self.stdout.write(
+                f"  - {producto.nombre}: {producto.unidades_vendidas} unidades, "
+                f"${producto.ingresos_totales}"
+            )
+        if len(corregidos) > 20:
+            self.stdout.write(f"  ... y {len(corregidos) - 20} más")
+
+        accion = "Se corregirían" if options['dry_run'] else "Corregidos"
+        self.stdout.write(self.style.SUCCESS(f"{accion}: {len(corregidos)} productos"))
@@ -0,0 +1,34 @@
+from argparse import ArgumentTypeError
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.companies.ventas import reconstruir_ventas_diarias
+
+
+def _fecha(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise ArgumentTypeError(f"fecha inválida: {valor} (formato AAAA-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconstruye el resumen de ventas por día y producto (VentaDiaria) '
+        'a partir de los items vendidos'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=_fecha,
+                            help='Primer día a reconstruir (AAAA-MM-DD); por defecto todo el historial')
+        parser.add_argument('--hasta', type=_fecha,
+                            help='Último día a reconstruir (AAAA-MM-DD), inclusive')
+
+    def handle(self, *args, **options):
+        desde, hasta = options['desde'], options['hasta']
+        if desde and hasta and desde > hasta:
+            raise CommandError("--desde no puede ser posterior a --hasta")
+
+        filas = reconstruir_ventas_diarias(desde=desde, hasta=hasta)
+        self.stdout.write(self.style.SUCCESS(f"Resumen diario reconstruido: {filas} filas (día, producto)"))
@@ -0,0 +1,98 @@
+"""
+Métricas del dashboard en un número fijo de consultas.
+
+Todo sale de agregaciones en la base de datos sobre el resumen diario
+(VentaDiaria) y Producto, sin recorrer filas en Python:
+
+1. ingresos y ganancia por día desde el inicio del mes (o de la semana,
+   si empezó antes): de ahí salen hoy, el mes y el gráfico de 7 días
+2. top 10 de productos de los últimos 30 días
+3. top 10 de productos por margen unitario
+4. productos a reponer (punto de reorden materializado por companies.reposicion)
+5. top 10 de demanda pronosticada (PronosticoDemanda)
+
+El número de consultas no depende de cuántas ventas o productos haya.
+"""
+from datetime import timedelta
+
+from django.db.models import F, FloatField, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import Producto, PronosticoDemanda, VentaDiaria
+from .reposicion import productos_a_reponer
+
+DIAS_GRAFICO = 7
+DIAS_TOP = 30
+LIMITE_TOP = 10
+
+
+def _por_dia(desde):
+    """{fecha: (ingresos, ganancia)} desde la fecha indicada"""
+    filas = (
+        VentaDiaria.objects
+        .filter(fecha__gte=desde)
+        .values('fecha')
+        .annotate(total=Sum('ingresos'), ganancia=Sum(F('ingresos') - F('costo')))
+        .values_list('fecha', 'total', 'ganancia')
+        .order_by()
+    )
+    return {fecha: (ingresos, ganancia) for fecha, ingresos, ganancia in filas}
+
+
+def metricas_dashboard(hoy=None):
+    """
+    Todas las métricas del dashboard (vista HTML y API JSON).
+    Los importes son Decimal; las listas son diccionarios simples.
+    """
+    hoy = hoy or timezone.localdate()
+    inicio_mes = hoy.replace(day=1)
+    inicio_grafico = hoy - timedelta(days=DIAS_GRAFICO - 1)
+
+    por_dia = _por_dia(min(inicio_mes, inicio_grafico))
+    del_mes = [valores for fecha, valores in por_dia.items() if fecha >= inicio_mes]
+
+    dias = [inicio_grafico + timedelta(days=i) for i in range(DIAS_GRAFICO)]
+
+    productos_top = list(
+        VentaDiaria.objects
+        .filter(fecha__gte=hoy - timedelta(days=DIAS_TOP))
+        .values('producto__nombre')
+        .annotate(total=Sum('unidades'), ingresos=Sum('ingresos'))
+        .order_by('-total')[:LIMITE_TOP]
+    )
+
+    productos_margen = list(
+        Producto.objects
+        .filter(activo=True)
+        .annotate(margen=F('precio_venta') - F('precio_compra'))
+        .order_by('-margen')
+        .values('nombre', 'precio_compra', 'precio_venta', 'margen')[:LIMITE_TOP]
+    )
+
+    productos_reponer = list(
+        productos_a_reponer()
+        .order_by('stock_actual')
+        .values('nombre', 'stock_actual', 'stock_minimo', 'punto_reorden', 'cantidad_sugerida')
+    )
+
+    productos_demanda = list(
+        PronosticoDemanda.objects
+        .filter(demanda_horizonte__gt=0, producto__activo=True)
+        .annotate(cobertura=Cast('producto__stock_actual', FloatField()) / F('demanda_diaria'))
+        .order_by('-demanda_horizonte')
+        .values('producto__nombre', 'producto__stock_actual', 'demanda_horizonte', 'horizonte_dias', 'cobertura')
+        [:LIMITE_TOP]
+    )
+
+    return {
+        'ventas_hoy': por_dia.get(hoy, (0, 0))[0] or 0,
+        'ventas_mes': sum(ingresos or 0 for ingresos, _ in del_mes),
+        'ganancia_mes': sum(ganancia or 0 for _, ganancia in del_mes),
+        'productos_top': productos_top,
+        'productos_margen': productos_margen,
+        'productos_reponer': productos_reponer,
+        'productos_demanda': productos_demanda,
+        'labels_semana': [dia.strftime('%d/%m') for dia in dias],
+        'datos_semana': [float(por_dia.get(dia, (0, 0))[0] or 0) for dia in dias],
+    }
@@ -0,0 +1,114 @@
+# Generated by Django 6.0 on 2026-10-18 10:12
+
+import unicodedata
+
+from django.db import migrations, models, transaction
+from django.db.utils import DatabaseError
+
+# Copia de apps.companies.busqueda al momento de esta migración: las
+# migraciones no importan código de la aplicación, que puede cambiar.
+# Los triggers e índices se vuelven a instalar en cada post_migrate con
+# instalar_indices_busqueda().
+TABLA_PRODUCTO = 'companies_producto'
+FTS_TABLA = 'companies_producto_fts'
+GIN_INDICE = 'companies_producto_nombre_trgm'
+
+SQL_SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_ai AFTER INSERT ON {TABLA_PRODUCTO} BEGIN
+        INSERT INTO {FTS_TABLA}(rowid, nombre_normalizado)
+        VALUES (new.id, new.nombre_normalizado);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_ad AFTER DELETE ON {TABLA_PRODUCTO} BEGIN
+        INSERT INTO {FTS_TABLA}({FTS_TABLA}, rowid, nombre_normalizado)
+        VALUES ('delete', old.id, old.nombre_normalizado);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLA}_au AFTER UPDATE OF nombre_normalizado ON {TABLA_PRODUCTO} BEGIN
+        INSERT INTO {FTS_TABLA}({FTS_TABLA}, rowid, nombre_normalizado)
+        VALUES ('delete', old.id, old.nombre_normalizado);
+        INSERT INTO {FTS_TABLA}(rowid, nombre_normalizado)
+        VALUES (new.id, new.nombre_normalizado);
+    END
+    """,
+]
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin tildes y con espacios simples (copia de apps.companies.models)"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def poblar_nombre_normalizado(apps, schema_editor):
+    Producto = apps.get_model('companies', 'Producto')
+    productos = list(Producto.objects.using(schema_editor.connection.alias).only('id', 'nombre'))
+    for producto in productos:
+        producto.nombre_normalizado = normalizar_texto(producto.nombre)
+    Producto.objects.using(schema_editor.connection.alias).bulk_update(
+        productos, ['nombre_normalizado'], batch_size=1000
+    )
+
+
+def crear_indices_busqueda(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            try:
+                # Requiere privilegios para crear extensiones; sin ellos se
+                # sigue sin índice GIN y la búsqueda usa el índice en memoria
+                with transaction.atomic(using=connection.alias):
+                    cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            except DatabaseError:
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+                if cursor.fetchone() is None:
+                    return
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {GIN_INDICE} "
+                f"ON {TABLA_PRODUCTO} USING gin (nombre_normalizado gin_trgm_ops)"
+            )
+        elif connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLA} USING fts5("
+                    f"nombre_normalizado, content='{TABLA_PRODUCTO}', content_rowid='id', "
+                    f"tokenize='trigram')"
+                )
+            except DatabaseError:
+                # SQLite compilado sin FTS5 o anterior a 3.34 (sin tokenizer trigram)
+                return
+            for sql in SQL_SQLITE_TRIGGERS:
+                cursor.execute(sql)
+            cursor.execute(f"INSERT INTO {FTS_TABLA}({FTS_TABLA}) VALUES ('rebuild')")
+
+
+def eliminar_indices(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {GIN_INDICE}")
+        elif connection.vendor == 'sqlite':
+            for sufijo in ('ai', 'ad', 'au'):
+                cursor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLA}_{sufijo}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLA}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='nombre_normalizado',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(poblar_nombre_normalizado, migrations.RunPython.noop),
+        migrations.RunPython(crear_indices_busqueda, eliminar_indices),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 6.0 on 2026-10-18 14:30
+
+from django.db import migrations, models
+from django.db.models import Max, Sum
+
+
+def poblar_contadores(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    Producto = apps.get_model('companies', 'Producto')
+    ItemVenta = apps.get_model('companies', 'ItemVenta')
+    totales = (
+        ItemVenta.objects.using(alias)
+        .values('producto')
+        .annotate(unidades=Sum('cantidad'), ingresos=Sum('subtotal'), ultima=Max('venta__fecha'))
+    )
+    productos = []
+    for fila in totales:
+        productos.append(Producto(
+            pk=fila['producto'],
+            unidades_vendidas=fila['unidades'] or 0,
+            ingresos_totales=fila['ingresos'] or 0,
+            fecha_ultima_venta=fila['ultima'],
+        ))
+    Producto.objects.using(alias).bulk_update(
+        productos, ['unidades_vendidas', 'ingresos_totales', 'fecha_ultima_venta'], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0002_producto_nombre_normalizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='fecha_ultima_venta',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='ingresos_totales',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='unidades_vendidas',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 6.0 on 2026-10-18 15:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum
+from django.db.models.functions import TruncDate
+
+
+def poblar_ventas_diarias(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    ItemVenta = apps.get_model('companies', 'ItemVenta')
+    VentaDiaria = apps.get_model('companies', 'VentaDiaria')
+    filas = (
+        ItemVenta.objects.using(alias)
+        .annotate(dia=TruncDate('venta__fecha'))
+        .values('dia', 'producto')
+        .annotate(unidades=Sum('cantidad'), ingresos=Sum('subtotal'),
+                  costo=Sum(F('costo_unitario') * F('cantidad')))
+        .order_by()
+    )
+    VentaDiaria.objects.using(alias).bulk_create(
+        [
+            VentaDiaria(fecha=fila['dia'], producto_id=fila['producto'], unidades=fila['unidades'],
+                        ingresos=fila['ingresos'], costo=fila['costo'])
+            for fila in filas
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0003_producto_contadores_ventas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='companies.producto')),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas diarias',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto'), name='companies_ventadiaria_fecha_producto')],
+            },
+        ),
+        migrations.RunPython(poblar_ventas_diarias, migrations.RunPython.noop),
+    ]
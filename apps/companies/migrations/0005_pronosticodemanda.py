@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0004_ventadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PronosticoDemanda',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metodo', models.CharField(choices=[('media_movil', 'Media móvil'), ('suavizado', 'Suavizado exponencial'), ('croston', 'Croston (demanda intermitente)')], max_length=20)),
+                ('demanda_diaria', models.FloatField(default=0)),
+                ('desviacion_diaria', models.FloatField(default=0)),
+                ('horizonte_dias', models.PositiveSmallIntegerField(default=7)),
+                ('demanda_horizonte', models.FloatField(db_index=True, default=0)),
+                ('dias_historia', models.PositiveSmallIntegerField()),
+                ('fecha_calculo', models.DateTimeField()),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pronostico', to='companies.producto')),
+            ],
+            options={
+                'verbose_name': 'Pronóstico de demanda',
+                'verbose_name_plural': 'Pronósticos de demanda',
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-18 17:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0005_pronosticodemanda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='compra',
+            name='estado',
+            field=models.CharField(choices=[('borrador', 'Borrador'), ('confirmada', 'Confirmada')], db_index=True, default='confirmada', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='proveedor',
+            name='dias_entrega',
+            field=models.PositiveSmallIntegerField(default=7),
+        ),
+        migrations.CreateModel(
+            name='SugerenciaReposicion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_seguridad', models.PositiveIntegerField(default=0)),
+                ('punto_reorden', models.PositiveIntegerField(db_index=True, default=0)),
+                ('nivel_objetivo', models.PositiveIntegerField(default=0)),
+                ('demanda_diaria', models.FloatField(default=0)),
+                ('dias_entrega', models.PositiveSmallIntegerField(default=7)),
+                ('fecha_calculo', models.DateTimeField()),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reposicion', to='companies.producto')),
+                ('proveedor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reposiciones', to='companies.proveedor')),
+            ],
+            options={
+                'verbose_name': 'Sugerencia de reposición',
+                'verbose_name_plural': 'Sugerencias de reposición',
+            },
+        ),
+    ]
@@ -1,9 +1,18 @@
 # models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from decimal import Decimal
+import unicodedata
+
+
+def normalizar_texto(texto):
+    """Minúsculas, sin tildes y con espacios simples (para búsquedas)"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
 
 class Categoria(models.Model):
     """Categorías de productos: Libros, Cuadernos, Útiles, etc."""
@@ -25,6 +34,8 @@ class Proveedor(models.Model):
     telefono = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
     activo = models.BooleanField(default=True)
+    # Días entre hacer un pedido y recibirlo (para el punto de reorden)
+    dias_entrega = models.PositiveSmallIntegerField(default=7)
     
     class Meta:
         verbose_name_plural = "Proveedores"
@@ -36,6 +47,8 @@ class Proveedor(models.Model):
 class Producto(models.Model):
     """Productos de la librería"""
     nombre = models.CharField(max_length=200)
+    # Columna de búsqueda: nombre en minúsculas y sin tildes (ver save())
+    nombre_normalizado = models.CharField(max_length=200, default='', editable=False, db_index=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.PROTECT, related_name='productos')
     proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True, related_name='productos')
     
@@ -47,6 +60,12 @@ class Producto(models.Model):
     stock_actual = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     stock_minimo = models.IntegerField(default=5, validators=[MinValueValidator(0)])
     
+    # Contadores de ventas (denormalizados): los mantiene
+    # ventas.registrar_venta y se recalculan con reconciliar_contadores
+    unidades_vendidas = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    ingresos_totales = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False)
+    fecha_ultima_venta = models.DateTimeField(null=True, blank=True, editable=False)
+    
     # Información adicional
     codigo_barras = models.CharField(max_length=50, blank=True, null=True, unique=True)
     descripcion = models.TextField(blank=True, null=True)
@@ -62,6 +81,14 @@ class Producto(models.Model):
     def __str__(self):
         return f"{self.nombre} - ${self.precio_venta}"
     
+    def save(self, *args, **kwargs):
+        # Mantiene sincronizada la columna de búsqueda
+        self.nombre_normalizado = normalizar_texto(self.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nombre' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nombre_normalizado'}
+        super().save(*args, **kwargs)
+    
     @property
     def margen_ganancia(self):
         """Calcula el margen de ganancia en porcentaje"""
@@ -76,8 +103,15 @@ class Producto(models.Model):
     
     @property
     def necesita_reposicion(self):
-        """Verifica si el stock está por debajo del mínimo"""
-        return self.stock_actual <= self.stock_minimo
+        """
+        Verifica si el stock llegó al punto de reorden calculado
+        (companies.reposicion) o, si aún no hay, al stock mínimo
+        """
+        try:
+            punto_reorden = self.reposicion.punto_reorden
+        except SugerenciaReposicion.DoesNotExist:
+            punto_reorden = self.stock_minimo
+        return self.stock_actual <= punto_reorden
 
 
 class Venta(models.Model):
@@ -135,11 +169,118 @@ class ItemVenta(models.Model):
         super().save(*args, **kwargs)
 
 
+class VentaDiaria(models.Model):
+    """
+    Resumen de ventas por día y producto. Se acumula en la misma
+    transacción que registra cada venta (ventas.registrar_venta) y se
+    reconstruye desde ItemVenta con el comando reconstruir_ventas_diarias.
+    Guardar o borrar un ItemVenta con save()/delete() rehace su fila
+    (señales en ventas.conectar_resumen_diario); las escrituras masivas
+    (bulk_create, update(), borrado por queryset sin señales) y los cambios
+    de fecha de una Venta requieren correr el comando para esos días.
+    """
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='ventas_diarias')
+    
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        verbose_name_plural = "Ventas diarias"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto'], name='companies_ventadiaria_fecha_producto'),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.producto.nombre}: {self.unidades}"
+    
+    @property
+    def ganancia(self):
+        return self.ingresos - self.costo
+
+
+class PronosticoDemanda(models.Model):
+    """
+    Pronóstico de demanda diaria por producto. Lo calcula para todo el
+    catálogo a la vez el comando pronosticar_demanda (companies.pronostico).
+    """
+    METODOS = [
+        ('media_movil', 'Media móvil'),
+        ('suavizado', 'Suavizado exponencial'),
+        ('croston', 'Croston (demanda intermitente)'),
+    ]
+    
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name='pronostico')
+    metodo = models.CharField(max_length=20, choices=METODOS)
+    
+    demanda_diaria = models.FloatField(default=0)
+    desviacion_diaria = models.FloatField(default=0)
+    horizonte_dias = models.PositiveSmallIntegerField(default=7)
+    demanda_horizonte = models.FloatField(default=0, db_index=True)
+    
+    dias_historia = models.PositiveSmallIntegerField()
+    fecha_calculo = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Pronóstico de demanda"
+        verbose_name_plural = "Pronósticos de demanda"
+    
+    def __str__(self):
+        return f"{self.producto.nombre}: {self.demanda_horizonte:.1f} en {self.horizonte_dias} días"
+    
+    @property
+    def dias_cobertura(self):
+        """Días que alcanza el stock actual con la demanda pronosticada"""
+        if self.demanda_diaria <= 0:
+            return None
+        return self.producto.stock_actual / self.demanda_diaria
+
+
+class SugerenciaReposicion(models.Model):
+    """
+    Punto de reorden y nivel objetivo por producto, calculados en lote a
+    partir de la demanda pronosticada y su variabilidad (comando
+    calcular_reposicion). La cantidad a pedir se obtiene con el stock actual.
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name='reposicion')
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.SET_NULL, null=True, blank=True, related_name='reposiciones')
+    
+    stock_seguridad = models.PositiveIntegerField(default=0)
+    punto_reorden = models.PositiveIntegerField(default=0, db_index=True)
+    # Nivel al que se repone el stock (pedir = nivel_objetivo - stock_actual)
+    nivel_objetivo = models.PositiveIntegerField(default=0)
+    
+    demanda_diaria = models.FloatField(default=0)
+    dias_entrega = models.PositiveSmallIntegerField(default=7)
+    fecha_calculo = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = "Sugerencia de reposición"
+        verbose_name_plural = "Sugerencias de reposición"
+    
+    def __str__(self):
+        return f"{self.producto.nombre}: reordenar en {self.punto_reorden}"
+    
+    @property
+    def cantidad_sugerida(self):
+        if self.producto.stock_actual > self.punto_reorden:
+            return 0
+        return max(0, self.nivel_objetivo - self.producto.stock_actual)
+
+
 class Compra(models.Model):
     """Registro de compras a proveedores"""
+    ESTADOS = [
+        ('borrador', 'Borrador'),
+        ('confirmada', 'Confirmada'),
+    ]
+    
     proveedor = models.ForeignKey(Proveedor, on_delete=models.PROTECT, related_name='compras')
     fecha = models.DateTimeField(default=timezone.now)
     total = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Los borradores (pedidos sugeridos) no suman stock hasta confirmarse
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='confirmada', db_index=True)
     
     notas = models.TextField(blank=True, null=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
@@ -149,6 +290,35 @@ class Compra(models.Model):
     
     def __str__(self):
         return f"Compra {self.id} - {self.proveedor.nombre} (${self.total})"
+    
+    def confirmar(self):
+        """
+        Confirma un borrador: suma al stock las cantidades de sus items.
+        El cambio de estado es condicional, así dos confirmaciones
+        simultáneas no suman el stock dos veces. Retorna True si confirmó.
+        """
+        fecha = timezone.now()
+        with transaction.atomic():
+            confirmada = Compra.objects.filter(pk=self.pk, estado='borrador').update(
+                estado='confirmada', fecha=fecha
+            )
+            if not confirmada:
+                return False
+            cantidades = (
+                ItemCompra.objects
+                .filter(compra_id=self.pk, producto_id=models.OuterRef('pk'))
+                .values('producto_id')
+                .annotate(total=models.Sum('cantidad'))
+                .values('total')
+            )
+            Producto.objects.filter(pk__in=self.items.values('producto_id')).update(
+                stock_actual=models.F('stock_actual') + models.Subquery(cantidades)
+            )
+            from .cache_dashboard import invalidar_dashboard
+            invalidar_dashboard()
+        self.estado = 'confirmada'
+        self.fecha = fecha
+        return True
 
 
 class ItemCompra(models.Model):
@@ -165,8 +335,16 @@ class ItemCompra(models.Model):
     
     def save(self, *args, **kwargs):
         self.subtotal = self.cantidad * self.precio_unitario
+        nuevo = self._state.adding
         super().save(*args, **kwargs)
         
-        # Actualiza el stock del producto
-        self.producto.stock_actual += self.cantidad
-        self.producto.save()
\ No newline at end of file
+        # Actualiza el stock del producto (los borradores suman al confirmarse).
+        # Solo al crear el item: volver a guardarlo no debe sumarlo otra vez.
+        # UPDATE atómico: un save() completo pisaría los contadores de ventas
+        if nuevo and self.compra.estado == 'confirmada':
+            Producto.objects.filter(pk=self.producto_id).update(
+                stock_actual=models.F('stock_actual') + self.cantidad
+            )
+            self.producto.refresh_from_db(fields=['stock_actual'])
+            from .cache_dashboard import invalidar_dashboard
+            invalidar_dashboard()
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""
+Pronóstico de demanda para todo el catálogo con NumPy.
+
+1. matriz_demanda(): matriz productos × días de unidades vendidas,
+   construida desde el resumen diario (VentaDiaria, derivado de ItemVenta)
+   en una sola consulta.
+2. calcular_pronosticos(): aplica los modelos a todas las filas a la vez.
+   - media móvil: media de los últimos `ventana` días
+   - suavizado exponencial simple: producto matriz × vector de pesos
+     alfa·(1-alfa)^k (equivale a la recursión, sin bucle)
+   - Croston (variante SBA) para demanda intermitente: recorre los días,
+     pero cada paso opera sobre todos los productos
+   El método de cada producto se elige por su intervalo medio entre
+   demandas (ADI, criterio de Syntetos-Boylan).
+3. guardar_pronosticos(): materializa el resultado en PronosticoDemanda.
+
+El costo crece con días × productos y no hay bucles por producto en Python.
+"""
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .cache_dashboard import invalidar_dashboard
+from .models import Producto, PronosticoDemanda, VentaDiaria
+
+# Intervalo medio entre demandas a partir del cual la demanda es intermitente
+ADI_INTERMITENTE = 1.32
+
+METODOS = np.array(['media_movil', 'suavizado', 'croston'])
+MEDIA_MOVIL, SUAVIZADO, CROSTON = range(3)
+
+
+def matriz_demanda(dias=90, hasta=None):
+    """
+    (ids de producto ordenados, primer día, matriz float32 productos × días)
+    con las unidades vendidas de cada producto activo en cada día hasta
+    `hasta` (hoy por defecto), inclusive.
+    """
+    hasta = hasta or timezone.localdate()
+    desde = hasta - timedelta(days=dias - 1)
+
+    productos = np.fromiter(
+        Producto.objects.filter(activo=True).order_by('pk').values_list('pk', flat=True),
+        dtype=np.int64,
+    )
+    filas = (
+        VentaDiaria.objects
+        .filter(fecha__range=(desde, hasta), producto__activo=True)
+        .values_list('producto_id', 'fecha', 'unidades')
+        .order_by()
+    )
+    origen = desde.toordinal()
+    registros = np.fromiter(
+        ((producto, fecha.toordinal() - origen, unidades)
+         for producto, fecha, unidades in filas.iterator(chunk_size=5000)),
+        dtype=[('producto', np.int64), ('dia', np.int32), ('unidades', np.float32)],
+    )
+
+    matriz = np.zeros((len(productos), dias), dtype=np.float32)
+    if len(registros):
+        # Los productos activados entre las dos consultas no están en la lista
+        registros = registros[np.isin(registros['producto'], productos)]
+        # (fecha, producto) es único en VentaDiaria: asignación directa
+        matriz[np.searchsorted(productos, registros['producto']), registros['dia']] = registros['unidades']
+    return productos, desde, matriz
+
+
+def media_movil(matriz, ventana):
+    return matriz[:, -ventana:].mean(axis=1)
+
+
+def suavizado_exponencial(matriz, alfa):
+    """Nivel final del suavizado exponencial simple de cada fila"""
+    dias = matriz.shape[1]
+    # Peso de cada día: alfa·(1-alfa)^antigüedad; el primero arrastra el resto
+    pesos = alfa * (1 - alfa) ** np.arange(dias - 1, -1, -1, dtype=np.float64)
+    pesos[0] = (1 - alfa) ** (dias - 1)
+    return matriz @ pesos.astype(matriz.dtype)
+
+
+def croston(matriz, alfa, sba=True):
+    """
+    Demanda diaria según Croston: suaviza por separado el tamaño de las
+    demandas no nulas y el intervalo entre ellas. Con sba=True aplica la
+    corrección de sesgo de Syntetos-Boylan (factor 1 - alfa/2).
+    """
+    productos = matriz.shape[0]
+    tamano = np.zeros(productos)
+    intervalo = np.zeros(productos)
+    desde_ultima = np.ones(productos)
+    iniciado = np.zeros(productos, dtype=bool)
+
+    for demanda in matriz.T:
+        hay = demanda > 0
+        nuevo = hay & ~iniciado
+        sigue = hay & iniciado
+        tamano = np.where(nuevo, demanda, np.where(sigue, tamano + alfa * (demanda - tamano), tamano))
+        intervalo = np.where(
+            nuevo, desde_ultima,
+            np.where(sigue, intervalo + alfa * (desde_ultima - intervalo), intervalo),
+        )
+        iniciado |= hay
+        desde_ultima = np.where(hay, 1, desde_ultima + 1)
+
+    pronostico = np.divide(tamano, intervalo, out=np.zeros(productos), where=intervalo > 0)
+    if sba:
+        pronostico *= 1 - alfa / 2
+    return pronostico
+
+
+def calcular_pronosticos(matriz, alfa=0.3, ventana=28):
+    """
+    (método elegido, demanda diaria, desviación diaria) por fila.
+    Sin ventas en el período → media móvil (0); ADI alto → Croston;
+    el resto → suavizado exponencial.
+    """
+    dias = matriz.shape[1]
+    con_demanda = np.count_nonzero(matriz, axis=1)
+    # ADI desde la primera venta: un producto nuevo no cuenta como intermitente
+    desde_primera = dias - np.argmax(matriz > 0, axis=1)
+    adi = np.divide(desde_primera, con_demanda, out=np.full(len(matriz), np.inf), where=con_demanda > 0)
+
+    metodo = np.where(
+        con_demanda == 0, MEDIA_MOVIL,
+        np.where(adi >= ADI_INTERMITENTE, CROSTON, SUAVIZADO),
+    )
+    candidatos = np.stack([
+        media_movil(matriz, min(ventana, dias)),
+        suavizado_exponencial(matriz, alfa),
+        croston(matriz, alfa),
+    ])
+    demanda = candidatos[metodo, np.arange(len(matriz))]
+    return metodo, demanda, matriz.std(axis=1)
+
+
+def guardar_pronosticos(productos, metodo, demanda, desviacion, horizonte, dias):
+    """Inserta o actualiza PronosticoDemanda de todos los productos"""
+    ahora = timezone.now()
+    pronosticos = [
+        PronosticoDemanda(
+            producto_id=int(producto),
+            metodo=METODOS[codigo],
+            demanda_diaria=round(float(diaria), 4),
+            desviacion_diaria=round(float(desv), 4),
+            horizonte_dias=horizonte,
+            demanda_horizonte=round(float(diaria) * horizonte, 2),
+            dias_historia=dias,
+            fecha_calculo=ahora,
+        )
+        for producto, codigo, diaria, desv in zip(productos, metodo, demanda, desviacion)
+    ]
+    with transaction.atomic():
+        # Productos desactivados desde el cálculo anterior
+        PronosticoDemanda.objects.exclude(producto__activo=True).delete()
+        PronosticoDemanda.objects.bulk_create(
+            pronosticos,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['producto'],
+            update_fields=[
+                'metodo', 'demanda_diaria', 'desviacion_diaria', 'horizonte_dias',
+                'demanda_horizonte', 'dias_historia', 'fecha_calculo',
+            ],
+        )
+        invalidar_dashboard()
+    return len(pronosticos)
@@ -0,0 +1,165 @@
+"""
+Puntos de reorden y pedidos sugeridos a partir de la demanda pronosticada.
+
+Para cada producto activo (en lote, con NumPy):
+- stock de seguridad = z · σ_diaria · √(días de entrega)
+- punto de reorden   = demanda_diaria · días de entrega + stock de seguridad
+                       (nunca menor que el stock_minimo fijado a mano)
+- nivel objetivo     = demanda_diaria · (entrega + revisión) + stock de seguridad
+                       (al menos punto de reorden + stock mínimo)
+
+z sale del nivel de servicio (REPOSICION_NIVEL_SERVICIO) y los días de
+entrega del Proveedor. La demanda y su variabilidad vienen de
+PronosticoDemanda; sin pronóstico se usa el stock mínimo.
+
+El resultado se materializa en SugerenciaReposicion y
+generar_borradores_compra() crea una Compra en borrador por proveedor.
+"""
+from itertools import groupby
+from statistics import NormalDist
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache_dashboard import invalidar_dashboard
+from .models import Compra, ItemCompra, Producto, SugerenciaReposicion
+
+
+def _arreglo(valores, defecto):
+    return np.array([defecto if v is None else v for v in valores], dtype=np.float64)
+
+
+def calcular_puntos_reorden(demanda, desviacion, dias_entrega, stock_minimo,
+                            nivel_servicio=0.95, dias_revision=7):
+    """(stock_seguridad, punto_reorden, nivel_objetivo) como arreglos de enteros"""
+    z = NormalDist().inv_cdf(nivel_servicio)
+    seguridad = np.ceil(z * desviacion * np.sqrt(dias_entrega))
+    punto_reorden = np.maximum(np.ceil(demanda * dias_entrega + seguridad), stock_minimo)
+    objetivo = np.maximum(
+        np.ceil(demanda * (dias_entrega + dias_revision) + seguridad),
+        punto_reorden + stock_minimo,
+    )
+    return seguridad.astype(np.int64), punto_reorden.astype(np.int64), objetivo.astype(np.int64)
+
+
+def calcular_reposicion(nivel_servicio=None, dias_revision=None):
+    """Recalcula SugerenciaReposicion de todos los productos activos"""
+    if nivel_servicio is None:
+        nivel_servicio = getattr(settings, 'REPOSICION_NIVEL_SERVICIO', 0.95)
+    if dias_revision is None:
+        dias_revision = getattr(settings, 'REPOSICION_DIAS_REVISION', 7)
+    entrega_defecto = getattr(settings, 'REPOSICION_DIAS_ENTREGA', 7)
+
+    filas = list(
+        Producto.objects
+        .filter(activo=True)
+        .order_by('pk')
+        .values_list(
+            'pk', 'proveedor_id', 'proveedor__dias_entrega', 'stock_minimo',
+            'pronostico__demanda_diaria', 'pronostico__desviacion_diaria',
+        )
+    )
+    if not filas:
+        return 0
+    productos, proveedores, entregas, minimos, demandas, desviaciones = zip(*filas)
+
+    demanda = _arreglo(demandas, 0.0)
+    dias_entrega = _arreglo(entregas, entrega_defecto)
+    seguridad, punto_reorden, objetivo = calcular_puntos_reorden(
+        demanda, _arreglo(desviaciones, 0.0), dias_entrega, _arreglo(minimos, 0),
+        nivel_servicio=nivel_servicio, dias_revision=dias_revision,
+    )
+
+    ahora = timezone.now()
+    sugerencias = [
+        SugerenciaReposicion(
+            producto_id=producto,
+            proveedor_id=proveedor,
+            stock_seguridad=int(seguridad[i]),
+            punto_reorden=int(punto_reorden[i]),
+            nivel_objetivo=int(objetivo[i]),
+            demanda_diaria=round(float(demanda[i]), 4),
+            dias_entrega=int(dias_entrega[i]),
+            fecha_calculo=ahora,
+        )
+        for i, (producto, proveedor) in enumerate(zip(productos, proveedores))
+    ]
+    with transaction.atomic():
+        SugerenciaReposicion.objects.exclude(producto__activo=True).delete()
+        SugerenciaReposicion.objects.bulk_create(
+            sugerencias,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['producto'],
+            update_fields=[
+                'proveedor', 'stock_seguridad', 'punto_reorden', 'nivel_objetivo',
+                'demanda_diaria', 'dias_entrega', 'fecha_calculo',
+            ],
+        )
+        invalidar_dashboard()
+    return len(sugerencias)
+
+
+def productos_a_reponer():
+    """
+    Productos activos en o bajo su punto de reorden, con la cantidad a
+    pedir. Sin sugerencia calculada se usa stock_minimo (y el doble como
+    nivel objetivo). Una sola consulta.
+    """
+    return (
+        Producto.objects
+        .filter(activo=True)
+        .annotate(
+            punto_reorden=Coalesce('reposicion__punto_reorden', 'stock_minimo'),
+            cantidad_sugerida=Coalesce('reposicion__nivel_objetivo', F('stock_minimo') * 2) - F('stock_actual'),
+        )
+        .filter(stock_actual__lte=F('punto_reorden'))
+    )
+
+
+def generar_borradores_compra():
+    """
+    Reemplaza los borradores de compra anteriores por uno nuevo por
+    proveedor con los productos a reponer. Los productos sin proveedor
+    quedan fuera. Retorna las compras creadas.
+    """
+    lineas = (
+        productos_a_reponer()
+        .filter(proveedor__isnull=False, cantidad_sugerida__gt=0)
+        .order_by('proveedor_id', 'nombre')
+        .values_list('proveedor_id', 'pk', 'cantidad_sugerida', 'precio_compra')
+    )
+
+    with transaction.atomic():
+        Compra.objects.filter(estado='borrador').delete()
+
+        por_proveedor = [
+            (proveedor, list(items))
+            for proveedor, items in groupby(lineas, key=lambda linea: linea[0])
+        ]
+        compras = Compra.objects.bulk_create([
+            Compra(
+                proveedor_id=proveedor,
+                estado='borrador',
+                total=sum(cantidad * precio for _, _, cantidad, precio in items),
+                notas='Pedido sugerido por el cálculo de reposición',
+            )
+            for proveedor, items in por_proveedor
+        ])
+        # bulk_create no llama a ItemCompra.save() (que sumaría stock)
+        ItemCompra.objects.bulk_create([
+            ItemCompra(
+                compra=compra,
+                producto_id=producto,
+                cantidad=cantidad,
+                precio_unitario=precio,
+                subtotal=cantidad * precio,
+            )
+            for compra, (_, items) in zip(compras, por_proveedor)
+            for _, producto, cantidad, precio in items
+        ], batch_size=1000)
+    return compras
@@ -1,14 +1,24 @@
-// Variables globales
-let chartInstance = null;
+// Variables globales (el gráfico lo crea la plantilla en window.chartInstance)
 let updateInterval = null;
+// ETag de la última respuesta: si los datos no cambiaron el servidor responde 304
+let dashboardEtag = null;
+
+const STREAM_URL = '/companies/api/dashboard-stream/';
+const POLL_INTERVAL = 10000;
+// Errores seguidos sin haber recibido datos antes de pasar a sondeo
+const STREAM_MAX_FALLOS = 3;
 
 // Inicializar al cargar la página
 document.addEventListener('DOMContentLoaded', function() {
-    // Iniciar actualizaciones automáticas cada 10 segundos
-    updateInterval = setInterval(updateDashboard, 10000);
-    
     // Mostrar indicador de actualización
     createUpdateIndicator();
+    
+    // Actualizaciones en tiempo real por SSE; si no hay soporte, sondeo cada 10 segundos
+    if (window.EventSource) {
+        startStream();
+    } else {
+        startPolling();
+    }
 });
 
 // Crear indicador de actualización
@@ -34,25 +44,60 @@ function createUpdateIndicator() {
     document.body.appendChild(indicator);
 }
 
-// Función para actualizar el dashboard
+// Canal SSE: "datos" trae todo al conectar y "cambios" solo lo que cambió
+function startStream() {
+    const source = new EventSource(STREAM_URL);
+    let fallos = 0;
+    
+    const onData = (event) => {
+        fallos = 0;
+        showUpdateAnimation();
+        applyDashboardData(JSON.parse(event.data));
+        hideUpdateAnimation();
+    };
+    source.addEventListener('datos', onData);
+    source.addEventListener('cambios', onData);
+    
+    source.onerror = () => {
+        // EventSource se reconecta solo; si el canal no está disponible, sondeo
+        fallos += 1;
+        if (source.readyState === EventSource.CLOSED || fallos >= STREAM_MAX_FALLOS) {
+            source.close();
+            startPolling();
+        }
+    };
+    
+    window.addEventListener('beforeunload', () => source.close());
+}
+
+function startPolling() {
+    if (updateInterval) return;
+    updateInterval = setInterval(updateDashboard, POLL_INTERVAL);
+    updateDashboard();
+}
+
+// Función para actualizar el dashboard (sondeo)
 async function updateDashboard() {
     try {
         showUpdateAnimation();
         
-        const response = await fetch('/companies/api/dashboard-data/');
-        const data = await response.json();
-        
-        // Actualizar métricas principales
-        updateMetrics(data);
-        
-        // Actualizar tabla de productos top
-        updateTopProductos(data.productos_top);
+        const headers = dashboardEtag ? { 'If-None-Match': dashboardEtag } : {};
+        const response = await fetch('/companies/api/dashboard-data/', {
+            headers,
+            cache: 'no-store',
+        });
         
-        // Actualizar productos a reponer
-        updateProductosReponer(data.productos_reponer, data.productos_reponer_count);
+        // Sin cambios desde el último sondeo
+        if (response.status === 304) {
+            hideUpdateAnimation();
+            return;
+        }
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
         
-        // Actualizar gráfico
-        updateChart(data.labels_semana, data.datos_semana);
+        dashboardEtag = response.headers.get('ETag');
+        applyDashboardData(await response.json());
         
         hideUpdateAnimation();
     } catch (error) {
@@ -60,6 +105,27 @@ async function updateDashboard() {
     }
 }
 
+// Aplica los datos recibidos; admite datos parciales (solo las claves que cambiaron)
+function applyDashboardData(data) {
+    // Actualizar métricas principales
+    updateMetrics(data);
+    
+    // Actualizar tabla de productos top
+    if (data.productos_top) {
+        updateTopProductos(data.productos_top);
+    }
+    
+    // Actualizar productos a reponer
+    if (data.productos_reponer) {
+        updateProductosReponer(data.productos_reponer, data.productos_reponer_count);
+    }
+    
+    // Actualizar gráfico
+    if (data.labels_semana || data.datos_semana) {
+        updateChart(data.labels_semana, data.datos_semana);
+    }
+}
+
 // Mostrar animación de actualización
 function showUpdateAnimation() {
     const indicator = document.getElementById('update-indicator');
@@ -81,10 +147,15 @@ function hideUpdateAnimation() {
 
 // Actualizar métricas principales
 function updateMetrics(data) {
-    animateValue('ventas-hoy', data.ventas_hoy);
-    animateValue('ventas-mes', data.ventas_mes);
-    animateValue('ganancia-mes', data.ganancia_mes);
-    animateValue('productos-reponer', data.productos_reponer_count);
+    const metricas = {
+        'ventas-hoy': data.ventas_hoy,
+        'ventas-mes': data.ventas_mes,
+        'ganancia-mes': data.ganancia_mes,
+        'productos-reponer': data.productos_reponer_count,
+    };
+    Object.entries(metricas).forEach(([elementClass, value]) => {
+        if (value !== undefined) animateValue(elementClass, value);
+    });
 }
 
 // Animar cambio de valores
@@ -137,7 +208,7 @@ function updateProductosReponer(productos, count) {
     
     if (productos.length === 0) {
         tbody.innerHTML = `
-            <tr><td colspan="3" class="text-center text-muted">Todo en orden ✓</td></tr>
+            <tr><td colspan="4" class="text-center text-muted">Todo en orden ✓</td></tr>
         `;
         return;
     }
@@ -151,7 +222,8 @@ function updateProductosReponer(productos, count) {
             <td class="text-end">
                 <span class="badge-alert">${prod.stock_actual}</span>
             </td>
-            <td class="text-end d-none d-sm-table-cell">${prod.stock_minimo}</td>
+            <td class="text-end d-none d-sm-table-cell">${prod.punto_reorden}</td>
+            <td class="text-end">${prod.cantidad_sugerida}</td>
         `;
         row.style.animation = 'fadeInUp 0.3s ease-out';
         tbody.appendChild(row);
@@ -160,10 +232,11 @@ function updateProductosReponer(productos, count) {
 
 // Actualizar gráfico
 function updateChart(labels, data) {
-    if (chartInstance) {
-        chartInstance.data.labels = labels;
-        chartInstance.data.datasets[0].data = data;
-        chartInstance.update('none'); // Sin animación para actualizaciones
+    const chart = window.chartInstance;
+    if (chart) {
+        if (labels) chart.data.labels = labels;
+        if (data) chart.data.datasets[0].data = data;
+        chart.update('none'); // Sin animación para actualizaciones
     }
 }
 
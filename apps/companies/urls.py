@@ -6,4 +6,5 @@ app_name = 'companies'
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),  # <-- Cadena vacía aquí
     path('api/dashboard-data/', views.dashboard_data, name='dashboard_data'),  # Nueva ruta
+    path('api/dashboard-stream/', views.dashboard_stream, name='dashboard_stream'),
 ]
\ No newline at end of file
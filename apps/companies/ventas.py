@@ -0,0 +1,273 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .cache_dashboard import invalidar_dashboard
+from .models import ItemVenta, Producto, Venta, VentaDiaria
+
+
+class StockInsuficiente(Exception):
+    """No hay unidades suficientes de un producto para la venta"""
+
+    def __init__(self, producto, disponible, solicitado):
+        self.producto = producto
+        self.disponible = disponible
+        self.solicitado = solicitado
+        super().__init__(
+            f"Stock insuficiente de {producto.nombre}: "
+            f"disponible {disponible}, solicitado {solicitado}"
+        )
+
+
+def _agrupar(lineas):
+    """[(producto, cantidad)] → {pk: [producto, cantidad]} sumando repetidos"""
+    agrupadas = {}
+    for producto, cantidad in lineas:
+        if producto.pk in agrupadas:
+            agrupadas[producto.pk][1] += cantidad
+        else:
+            agrupadas[producto.pk] = [producto, cantidad]
+    return agrupadas
+
+
+def _por_producto(agrupadas, valor, campo, modelo=Producto, clave='pk'):
+    """CASE clave WHEN pk THEN campo + valor(producto, cantidad) ..."""
+    return Case(
+        *(When(**{clave: pk}, then=F(campo) + valor(producto, cantidad))
+          for pk, (producto, cantidad) in agrupadas.items()),
+        default=F(campo),
+        output_field=modelo._meta.get_field(campo),
+    )
+
+
+def _dia(fecha):
+    """Día de la venta en la zona horaria actual (la misma que usa fecha__date)"""
+    return fecha.date() if timezone.is_naive(fecha) else timezone.localdate(fecha)
+
+
+def _descontar_stock(agrupadas, fecha):
+    """
+    Descuenta el stock de todos los productos con un único UPDATE
+    condicional: solo se actualizan las filas con stock >= cantidad.
+    Retorna True si se actualizaron todas. La comprobación y el descuento
+    ocurren en la misma sentencia, así dos ventas simultáneas no pueden
+    vender la misma unidad. La misma sentencia acumula los contadores de
+    ventas del producto.
+    """
+    condicion = Q()
+    for pk, (_, cantidad) in agrupadas.items():
+        condicion |= Q(pk=pk, stock_actual__gte=cantidad)
+
+    actualizadas = Producto.objects.filter(condicion).update(
+        stock_actual=_por_producto(agrupadas, lambda p, c: -c, 'stock_actual'),
+        unidades_vendidas=_por_producto(agrupadas, lambda p, c: c, 'unidades_vendidas'),
+        ingresos_totales=_por_producto(
+            agrupadas, lambda p, c: Value(p.precio_venta * c), 'ingresos_totales'
+        ),
+        fecha_ultima_venta=Greatest(Coalesce(F('fecha_ultima_venta'), Value(fecha)), Value(fecha)),
+        fecha_actualizacion=timezone.now(),
+    )
+    return actualizadas == len(agrupadas)
+
+
+def _acumular_ventas_diarias(agrupadas, fecha):
+    """
+    Suma la venta al resumen diario: INSERT de las filas (día, producto)
+    que falten, ignorando las existentes, y un único UPDATE que incrementa
+    todas. Como el incremento lo hace la base de datos, dos ventas del
+    mismo día no se pisan.
+    """
+    dia = _dia(fecha)
+    VentaDiaria.objects.bulk_create(
+        [VentaDiaria(fecha=dia, producto_id=pk) for pk in agrupadas],
+        ignore_conflicts=True,
+    )
+
+    def acumulado(valor, campo):
+        return _por_producto(agrupadas, valor, campo, modelo=VentaDiaria, clave='producto_id')
+
+    VentaDiaria.objects.filter(fecha=dia, producto_id__in=agrupadas).update(
+        unidades=acumulado(lambda p, c: c, 'unidades'),
+        ingresos=acumulado(lambda p, c: Value(p.precio_venta * c), 'ingresos'),
+        costo=acumulado(lambda p, c: Value(p.precio_compra * c), 'costo'),
+    )
+
+
+_CAMPOS_REFRESCADOS = ('stock_actual', 'unidades_vendidas', 'ingresos_totales', 'fecha_ultima_venta')
+
+
+def _refrescar_stock(agrupadas):
+    filas = Producto.objects.filter(pk__in=agrupadas).values_list('pk', *_CAMPOS_REFRESCADOS)
+    valores = {pk: resto for pk, *resto in filas}
+    for pk, (producto, _) in agrupadas.items():
+        if pk in valores:
+            for campo, valor in zip(_CAMPOS_REFRESCADOS, valores[pk]):
+                setattr(producto, campo, valor)
+        else:
+            producto.stock_actual = 0
+
+
+def registrar_venta(lineas, **campos_venta):
+    """
+    Registra una venta con todos sus items en una sola transacción.
+
+    lineas: [(producto, cantidad)] con los productos ya cargados.
+    Un número constante de consultas sin importar el tamaño del carrito:
+    UPDATE condicional del stock de todos los productos, INSERT de la
+    venta con el total ya calculado, INSERT masivo de los items, el
+    resumen diario (INSERT + UPDATE) y la lectura del stock resultante.
+    Si algún producto no alcanza se lanza StockInsuficiente y no se
+    guarda nada.
+    Actualiza stock_actual de las instancias recibidas.
+    """
+    agrupadas = _agrupar(lineas)
+    if not agrupadas:
+        raise ValueError("La venta no tiene items")
+
+    total = sum(producto.precio_venta * cantidad for producto, cantidad in agrupadas.values())
+
+    campos_venta.setdefault('fecha', timezone.now())
+
+    with transaction.atomic():
+        completa = _descontar_stock(agrupadas, campos_venta['fecha'])
+        if completa:
+            venta = Venta.objects.create(total=total, **campos_venta)
+
+            # bulk_create no llama a ItemVenta.save(): el subtotal va explícito
+            ItemVenta.objects.bulk_create([
+                ItemVenta(
+                    venta=venta,
+                    producto=producto,
+                    cantidad=cantidad,
+                    precio_unitario=producto.precio_venta,
+                    costo_unitario=producto.precio_compra,
+                    subtotal=producto.precio_venta * cantidad,
+                )
+                for producto, cantidad in agrupadas.values()
+            ])
+            _acumular_ventas_diarias(agrupadas, campos_venta['fecha'])
+
+            # Stock resultante (las filas siguen bloqueadas por el UPDATE)
+            _refrescar_stock(agrupadas)
+        else:
+            # Revierte el descuento de los productos que sí alcanzaban
+            transaction.set_rollback(True)
+
+    if not completa:
+        _refrescar_stock(agrupadas)
+        for producto, cantidad in agrupadas.values():
+            if producto.stock_actual < cantidad:
+                raise StockInsuficiente(producto, producto.stock_actual, cantidad)
+        # Otra venta repuso stock entre ambas consultas: se informa el primero
+        producto, cantidad = next(iter(agrupadas.values()))
+        raise StockInsuficiente(producto, producto.stock_actual, cantidad)
+
+    return venta
+
+
+def reconciliar_contadores(dry_run=False):
+    """
+    Recalcula unidades_vendidas, ingresos_totales y fecha_ultima_venta de
+    todos los productos a partir de ItemVenta (una consulta agregada) y
+    corrige los que difieren. Retorna la lista de productos corregidos.
+    """
+    totales = {
+        fila['producto']: fila
+        for fila in ItemVenta.objects.values('producto').annotate(
+            unidades=Sum('cantidad'),
+            ingresos=Sum('subtotal'),
+            ultima=Max('venta__fecha'),
+        )
+    }
+
+    corregidos = []
+    campos = ('unidades_vendidas', 'ingresos_totales', 'fecha_ultima_venta')
+    for producto in Producto.objects.only('pk', 'nombre', *campos).iterator(chunk_size=2000):
+        fila = totales.get(producto.pk, {})
+        esperado = (
+            fila.get('unidades') or 0,
+            fila.get('ingresos') or Decimal('0'),
+            fila.get('ultima'),
+        )
+        actual = tuple(getattr(producto, campo) for campo in campos)
+        if actual != esperado:
+            for campo, valor in zip(campos, esperado):
+                setattr(producto, campo, valor)
+            corregidos.append(producto)
+
+    if corregidos and not dry_run:
+        with transaction.atomic():
+            Producto.objects.bulk_update(corregidos, campos, batch_size=1000)
+            invalidar_dashboard()
+    return corregidos
+
+
+def reconstruir_ventas_diarias(desde=None, hasta=None, producto_id=None):
+    """
+    Rehace el resumen diario a partir de ItemVenta, para todo el
+    historial o solo entre las fechas desde/hasta (inclusive) y,
+    opcionalmente, de un único producto.
+    Retorna el número de filas (día, producto) generadas.
+    """
+    items = ItemVenta.objects.all()
+    resumen = VentaDiaria.objects.all()
+    if producto_id is not None:
+        items = items.filter(producto_id=producto_id)
+        resumen = resumen.filter(producto_id=producto_id)
+    if desde:
+        items = items.filter(venta__fecha__date__gte=desde)
+        resumen = resumen.filter(fecha__gte=desde)
+    if hasta:
+        items = items.filter(venta__fecha__date__lte=hasta)
+        resumen = resumen.filter(fecha__lte=hasta)
+
+    filas = (
+        items
+        .annotate(dia=TruncDate('venta__fecha'))
+        .values('dia', 'producto')
+        .annotate(
+            unidades=Sum('cantidad'),
+            ingresos=Sum('subtotal'),
+            costo=Sum(F('costo_unitario') * F('cantidad')),
+        )
+        .order_by()
+    )
+
+    with transaction.atomic():
+        resumen.delete()
+        creadas = VentaDiaria.objects.bulk_create(
+            [
+                VentaDiaria(
+                    fecha=fila['dia'],
+                    producto_id=fila['producto'],
+                    unidades=fila['unidades'],
+                    ingresos=fila['ingresos'],
+                    costo=fila['costo'],
+                )
+                for fila in filas.iterator(chunk_size=2000)
+            ],
+            batch_size=1000,
+        )
+        invalidar_dashboard()
+    return len(creadas)
+
+
+def _item_modificado(sender, instance, **kwargs):
+    """
+    Un ItemVenta guardado o borrado fuera de registrar_venta (admin,
+    shell, borrado en cascada de la venta): rehace su fila (día, producto)
+    """
+    fecha = Venta.objects.filter(pk=instance.venta_id).values_list('fecha', flat=True).first()
+    if fecha is not None:
+        dia = _dia(fecha)
+        reconstruir_ventas_diarias(desde=dia, hasta=dia, producto_id=instance.producto_id)
+
+
+def conectar_resumen_diario():
+    # registrar_venta usa bulk_create, que no emite señales: no se cuenta dos veces
+    post_save.connect(_item_modificado, sender=ItemVenta, dispatch_uid='ventas_diarias_item_save')
+    post_delete.connect(_item_modificado, sender=ItemVenta, dispatch_uid='ventas_diarias_item_delete')
@@ -1,116 +1,100 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.shortcuts import render
-from django.db.models import Sum, Count, F
-from django.utils import timezone
-from datetime import timedelta
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition, require_GET
+from asgiref.sync import sync_to_async
+import asyncio
 import json
-from .models import Producto, Venta, ItemVenta
-from django.http import JsonResponse
+from .cache_dashboard import datos_dashboard, etag_dashboard, ultima_modificacion
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 
 def dashboard(request):
-    hoy = timezone.now()
-    inicio_mes = hoy.replace(day=1)
-    hace_30_dias = hoy - timedelta(days=30)
-    
-    # Ventas
-    ventas_hoy = Venta.objects.filter(fecha__date=hoy.date()).aggregate(total=Sum('total'))['total'] or 0
-    ventas_mes = Venta.objects.filter(fecha__gte=inicio_mes).aggregate(total=Sum('total'))['total'] or 0
-    
-    # Ganancia del mes
-    items_mes = ItemVenta.objects.filter(venta__fecha__gte=inicio_mes)
-    ganancia_mes = sum((item.precio_unitario - item.costo_unitario) * item.cantidad for item in items_mes)
-    
-    # Top 10 productos más vendidos
-    productos_top = ItemVenta.objects.filter(
-        venta__fecha__gte=hace_30_dias
-    ).values('producto__nombre').annotate(
-        total=Sum('cantidad'),
-        ingresos=Sum('subtotal')
-    ).order_by('-total')[:10]
-    
-    # Productos con mejor margen
-    productos_margen = Producto.objects.filter(activo=True).extra(
-        select={'margen': 'precio_venta - precio_compra'}
-    ).order_by('-margen')[:10]
-    
-    # Productos a reponer
-    productos_reponer = Producto.objects.filter(
-        stock_actual__lte=F('stock_minimo'),
-        activo=True
-    ).order_by('stock_actual')
-    
-    # Ventas últimos 7 días
-    ventas_semana = []
-    labels_semana = []
-    datos_semana = []
-    
-    for i in range(6, -1, -1):
-        dia = hoy - timedelta(days=i)
-        total = Venta.objects.filter(fecha__date=dia.date()).aggregate(t=Sum('total'))['t'] or 0
-        
-        labels_semana.append(dia.strftime('%d/%m'))
-        datos_semana.append(float(total))
-        ventas_semana.append({'fecha': dia.strftime('%d/%m'), 'total': float(total)})
-    
-    context = {
-        'ventas_hoy': ventas_hoy,
-        'ventas_mes': ventas_mes,
-        'ganancia_mes': ganancia_mes,
-        'productos_top': productos_top,
-        'productos_margen': productos_margen,
-        'productos_reponer': productos_reponer,
-        'ventas_semana': ventas_semana,
-        'labels_semana': json.dumps(labels_semana),
-        'datos_semana': json.dumps(datos_semana),
-    }
+    context = dict(datos_dashboard())
+    context['labels_semana'] = json.dumps(context['labels_semana'])
+    context['datos_semana'] = json.dumps(context['datos_semana'])
     return render(request, 'companies/dashboard.html', context)
 
+def _datos_json(metricas):
+    """Datos del dashboard tal como los consume dashboard.js"""
+    return {
+        'ventas_hoy': float(metricas['ventas_hoy']),
+        'ventas_mes': float(metricas['ventas_mes']),
+        'ganancia_mes': float(metricas['ganancia_mes']),
+        'productos_reponer_count': len(metricas['productos_reponer']),
+        'productos_top': metricas['productos_top'],
+        'productos_reponer': metricas['productos_reponer'],
+        'labels_semana': metricas['labels_semana'],
+        'datos_semana': metricas['datos_semana'],
+    }
+
+# ETag/Last-Modified salen de la versión de datos en caché: si el cliente
+# ya tiene la versión actual se responde 304 sin consultar la base de datos
+@condition(etag_func=etag_dashboard, last_modified_func=ultima_modificacion)
 def dashboard_data(request):
     """API endpoint que devuelve los datos del dashboard en JSON"""
-    hoy = timezone.now()
-    inicio_mes = hoy.replace(day=1)
-    hace_30_dias = hoy - timedelta(days=30)
-    
-    # Ventas
-    ventas_hoy = Venta.objects.filter(fecha__date=hoy.date()).aggregate(total=Sum('total'))['total'] or 0
-    ventas_mes = Venta.objects.filter(fecha__gte=inicio_mes).aggregate(total=Sum('total'))['total'] or 0
-    
-    # Ganancia del mes
-    items_mes = ItemVenta.objects.filter(venta__fecha__gte=inicio_mes)
-    ganancia_mes = sum((item.precio_unitario - item.costo_unitario) * item.cantidad for item in items_mes)
-    
-    # Top 10 productos más vendidos
-    productos_top = list(ItemVenta.objects.filter(
-        venta__fecha__gte=hace_30_dias
-    ).values('producto__nombre').annotate(
-        total=Sum('cantidad'),
-        ingresos=Sum('subtotal')
-    ).order_by('-total')[:10])
-    
-    # Productos a reponer
-    productos_reponer = list(Producto.objects.filter(
-        stock_actual__lte=F('stock_minimo'),
-        activo=True
-    ).values('nombre', 'stock_actual', 'stock_minimo').order_by('stock_actual'))
-    
-    # Ventas últimos 7 días
-    labels_semana = []
-    datos_semana = []
-    
-    for i in range(6, -1, -1):
-        dia = hoy - timedelta(days=i)
-        total = Venta.objects.filter(fecha__date=dia.date()).aggregate(t=Sum('total'))['t'] or 0
-        labels_semana.append(dia.strftime('%d/%m'))
-        datos_semana.append(float(total))
-    
-    data = {
-        'ventas_hoy': float(ventas_hoy),
-        'ventas_mes': float(ventas_mes),
-        'ganancia_mes': float(ganancia_mes),
-        'productos_reponer_count': len(productos_reponer),
-        'productos_top': productos_top,
-        'productos_reponer': productos_reponer,
-        'labels_semana': labels_semana,
-        'datos_semana': datos_semana,
-    }
-    
-    return JsonResponse(data)
\ No newline at end of file
+    response = JsonResponse(_datos_json(datos_dashboard()))
+    # El navegador siempre revalida (petición condicional) antes de reutilizarla
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def _evento_sse(evento, datos):
+    return f"event: {evento}\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n"
+
+@require_GET
+async def dashboard_stream(request):
+    """
+    Server-Sent Events del dashboard: envía los datos completos al
+    conectar ("datos") y después solo las claves que cambian ("cambios").
+
+    Cada conexión vigila la versión de datos en caché (sin consultas a la
+    base de datos). Al detectar un cambio espera DASHBOARD_SSE_VENTANA
+    segundos para agrupar ráfagas de ventas en un solo evento. La conexión
+    se cierra tras DASHBOARD_SSE_DURACION y EventSource se reconecta solo.
+
+    Solo bajo ASGI: con WSGI (runserver, gunicorn sync) Django junta todo
+    el iterador async antes de enviar nada, así que se responde 204 y
+    EventSource cierra el canal; dashboard.js pasa entonces a sondeo.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+
+    intervalo = getattr(settings, 'DASHBOARD_SSE_INTERVALO', 1.0)
+    ventana = getattr(settings, 'DASHBOARD_SSE_VENTANA', 2.0)
+    duracion = getattr(settings, 'DASHBOARD_SSE_DURACION', 300)
+    latido = 15.0
+
+    async def eventos():
+        loop = asyncio.get_running_loop()
+        fin = loop.time() + duracion
+        ultimo_envio = loop.time()
+
+        version = await sync_to_async(etag_dashboard)()
+        enviados = _datos_json(await sync_to_async(datos_dashboard)())
+        yield "retry: 5000\n\n"
+        yield _evento_sse("datos", enviados)
+
+        while loop.time() < fin:
+            await asyncio.sleep(intervalo)
+            if await sync_to_async(etag_dashboard)() == version:
+                if loop.time() - ultimo_envio >= latido:
+                    # Comentario SSE: mantiene viva la conexión en proxies
+                    ultimo_envio = loop.time()
+                    yield ": ping\n\n"
+                continue
+
+            # Agrupar las escrituras que lleguen dentro de la ventana
+            await asyncio.sleep(ventana)
+            version = await sync_to_async(etag_dashboard)()
+            datos = _datos_json(await sync_to_async(datos_dashboard)())
+            cambios = {clave: valor for clave, valor in datos.items() if enviados.get(clave) != valor}
+            enviados = datos
+            if cambios:
+                ultimo_envio = loop.time()
+                yield _evento_sse("cambios", cambios)
+
+    response = StreamingHttpResponse(eventos(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # sin buffer en nginx
+    return response
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'apps.core'
+
+    def ready(self):
+        from django.conf import settings
+
+        # Sin muestreo ninguna petición desglosa SQL: no se envuelven las consultas
+        if settings.METRICAS_ACTIVAS and settings.METRICAS_MUESTREO > 0:
+            from .instrumentacion import instrumentar_conexiones
+            instrumentar_conexiones()
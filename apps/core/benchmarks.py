@@ -0,0 +1,367 @@
+"""
+Micro-benchmarks de los caminos críticos (comando benchmark_rendimiento).
+
+Cada caso mide una función del proyecto sobre un conjunto de datos
+generado con companies.datos_ejemplo (tamaños en TAMANOS), sin red:
+
+- buscar_producto.<backend>.<capa>: buscar_producto_inteligente con el
+  índice en memoria y con la base de datos (CATALOGO_BUSQUEDA)
+- ejecutar_accion.<acción>: cada rama de ejecutar_accion
+- dashboard_data.<estado>: la vista JSON sin caché, con caché y con 304
+- detect_barcodes.<frame>: decodificación de frames sintéticos
+- save_barcode_record.<n>: guardar un registro con n registros previos
+
+Por caso se guarda la mediana, media, p95 y mínimo en ms, y las consultas
+SQL (cantidad y tiempo) de una ejecución. comparar() marca regresiones
+contra un resultado anterior guardado como JSON.
+"""
+import json
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+import django
+import numpy as np
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+
+TAMANOS = {
+    'pequeno': dict(productos=200, ventas=2000, dias=60),
+    'mediano': dict(productos=5000, ventas=50000, dias=180),
+    'grande': dict(productos=50000, ventas=500000, dias=365),
+}
+
+# Diferencias menores que esto (ms) se consideran ruido al comparar
+MINIMO_REGRESION_MS = 0.05
+
+CASOS = {}
+
+
+def caso(nombre, **ajustes):
+    """
+    Registra una fábrica de casos: recibe el contexto y retorna la función
+    a medir, o (función, preparar) si hace falta preparar cada repetición
+    fuera del tiempo medido. `ajustes` son settings aplicados durante el
+    caso (fuera del tiempo medido).
+    """
+    def registrar(fabrica):
+        CASOS[nombre] = (fabrica, ajustes)
+        return fabrica
+    return registrar
+
+
+# ----------------------------------------------------------------------
+# Datos de muestra
+# ----------------------------------------------------------------------
+
+_EAN_L = ['0001101', '0011001', '0010011', '0111101', '0100011',
+          '0110001', '0101111', '0111011', '0110111', '0001011']
+_EAN_PARIDAD = ['LLLLLL', 'LLGLGG', 'LLGGLG', 'LLGGGL', 'LGLLGG',
+                'LGGLLG', 'LGGGLL', 'LGLGLG', 'LGLGGL', 'LGGLGL']
+
+
+def _ean13(digitos):
+    """Módulos (0/1) de un EAN-13 a partir de 12 dígitos (agrega el verificador)"""
+    suma = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digitos))
+    digitos += str((10 - suma % 10) % 10)
+    derecha = [''.join('1' if bit == '0' else '0' for bit in codigo) for codigo in _EAN_L]
+    modulos = '101'
+    for digito, paridad in zip(digitos[1:7], _EAN_PARIDAD[int(digitos[0])]):
+        modulos += _EAN_L[int(digito)] if paridad == 'L' else derecha[int(digito)][::-1]
+    modulos += '01010' + ''.join(derecha[int(d)] for d in digitos[7:]) + '101'
+    return digitos, np.array([int(bit) for bit in modulos], dtype=bool)
+
+
+def frame_ean13(ancho, alto, digitos='786123456789'):
+    """
+    Frame BGR con una etiqueta EAN-13 centrada, reflejado como el de una
+    webcam (detect_barcodes lo vuelve a reflejar)
+    """
+    _, modulos = _ean13(digitos)
+    frame = np.full((alto, ancho, 3), 120, dtype=np.uint8)
+    modulo = max(1, ancho // 2 // len(modulos))
+    barras = np.repeat(modulos, modulo)
+    margen = 11 * modulo  # zona de silencio
+    x, y, alto_barras = (ancho - len(barras)) // 2, alto // 3, alto // 3
+    frame[y - margen:y + alto_barras + margen, x - margen:x + len(barras) + margen] = 255
+    frame[y:y + alto_barras, x:x + len(barras)][:, barras] = 0
+    return np.ascontiguousarray(frame[:, ::-1])
+
+
+class Contexto:
+    """Nombres de productos de muestra y utilidades comunes a los casos"""
+
+    def __init__(self):
+        from apps.companies.models import Producto
+
+        productos = Producto.objects.filter(activo=True)
+        self.mas_vendido = productos.order_by('-unidades_vendidas').first()
+        self.con_stock = productos.order_by('-stock_actual').first()
+        self.nombre = self.mas_vendido.nombre
+        palabras = self.nombre.split()
+        self.prefijo = ' '.join(palabras[:2])[:-1] if len(palabras) > 1 else self.nombre[:-2]
+        # Dos letras intercambiadas: solo la capa fuzzy lo encuentra
+        self.con_error = self.nombre[:3] + self.nombre[4] + self.nombre[3] + self.nombre[5:]
+        self.inexistente = 'telescopio espacial'
+        self.factory = RequestFactory()
+
+    def en_rollback(self, funcion):
+        """Ejecuta funcion() y deshace sus escrituras (el dataset no cambia)"""
+        def medida():
+            with transaction.atomic():
+                funcion()
+                transaction.set_rollback(True)
+        return medida
+
+
+# ----------------------------------------------------------------------
+# Casos
+# ----------------------------------------------------------------------
+
+def _busqueda(texto):
+    def fabrica(contexto):
+        from apps.chatbot.services.negocio_service import buscar_producto_inteligente
+
+        termino = getattr(contexto, texto)
+        return lambda: buscar_producto_inteligente(termino)
+    return fabrica
+
+
+for _backend in ('memoria', 'db'):
+    for _capa, _texto in (('exacta', 'nombre'), ('prefijo', 'prefijo'),
+                          ('fuzzy', 'con_error'), ('sin_resultado', 'inexistente')):
+        caso(f'buscar_producto.{_backend}.{_capa}', CATALOGO_BUSQUEDA=_backend)(_busqueda(_texto))
+
+
+def _accion(data, escribe=False):
+    def fabrica(contexto):
+        from apps.chatbot.services.negocio_service import ejecutar_accion
+
+        datos = data(contexto) if callable(data) else data
+        medida = lambda: ejecutar_accion(datos)
+        return contexto.en_rollback(medida) if escribe else medida
+    return fabrica
+
+
+caso('ejecutar_accion.iniciar_registro_venta')(_accion({'accion': 'iniciar_registro_venta'}))
+caso('ejecutar_accion.registrar_venta')(_accion(
+    lambda c: {'accion': 'registrar_venta', 'items': [
+        {'producto': c.con_stock.nombre, 'cantidad': 1},
+        {'producto': c.nombre, 'cantidad': 1},
+    ]},
+    escribe=True,
+))
+caso('ejecutar_accion.consultar_producto')(_accion(
+    lambda c: {'accion': 'consultar_producto', 'producto': c.nombre}
+))
+caso('ejecutar_accion.productos_mas_vendidos')(_accion({'accion': 'productos_mas_vendidos'}))
+caso('ejecutar_accion.listar_productos')(_accion({'accion': 'listar_productos'}))
+caso('ejecutar_accion.pedir_aclaracion')(_accion({'accion': 'pedir_aclaracion'}))
+
+
+def _dashboard(estado):
+    def fabrica(contexto):
+        from apps.companies.cache_dashboard import CLAVE_VERSION, etag_dashboard
+        from apps.companies.views import dashboard_data
+
+        cabeceras = {'HTTP_IF_NONE_MATCH': etag_dashboard()} if estado == 'no_modificado' else {}
+        esperado = 304 if estado == 'no_modificado' else 200
+
+        def medida():
+            respuesta = dashboard_data(contexto.factory.get('/companies/api/dashboard-data/', **cabeceras))
+            assert respuesta.status_code == esperado, respuesta.status_code
+
+        if estado == 'sin_cache':
+            # Nueva versión de datos: las métricas se recalculan
+            return medida, lambda: cache.delete(CLAVE_VERSION)
+        return medida
+    return fabrica
+
+
+for _estado in ('sin_cache', 'con_cache', 'no_modificado'):
+    caso(f'dashboard_data.{_estado}')(_dashboard(_estado))
+
+
+def _deteccion(ancho, alto, con_codigo):
+    def fabrica(contexto):
+        from apps.barcode_engine.services.detector import detect_barcodes
+
+        if con_codigo:
+            frame = frame_ean13(ancho, alto)
+        else:
+            frame = np.full((alto, ancho, 3), 200, dtype=np.uint8)
+        return lambda: detect_barcodes(frame)
+    return fabrica
+
+
+caso('detect_barcodes.vacio_640x480')(_deteccion(640, 480, False))
+caso('detect_barcodes.ean13_640x480')(_deteccion(640, 480, True))
+caso('detect_barcodes.ean13_1280x720')(_deteccion(1280, 720, True))
+
+
+def _guardado(previos):
+    def fabrica(contexto):
+        from apps.barcode_engine.storage import firebase_store
+
+        ruta = firebase_store.FILE_PATH
+        contenido = json.dumps([
+            {'code': f'{i:013d}', 'type': 'EAN13', 'timestamp': '2026-01-01T00:00:00'}
+            for i in range(previos)
+        ])
+
+        def preparar():
+            ruta.write_text(contenido, encoding='utf-8')
+
+        def medida():
+            firebase_store.save_barcode_record(
+                {'code': '7861234567895', 'type': 'EAN13', 'timestamp': '2026-01-01T00:00:00'}
+            )
+        return medida, preparar
+    return fabrica
+
+
+for _previos in (0, 1000, 10000):
+    caso(f'save_barcode_record.{_previos}')(_guardado(_previos))
+
+
+# ----------------------------------------------------------------------
+# Ejecución y comparación
+# ----------------------------------------------------------------------
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir(medida, preparar=None, repeticiones=20, calentamiento=2):
+    """Estadísticas en ms de `repeticiones` llamadas y consultas SQL de una"""
+    preparar = preparar or (lambda: None)
+    for _ in range(calentamiento):
+        preparar()
+        medida()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        preparar()
+        inicio = time.perf_counter()
+        medida()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    preparar()
+    with CaptureQueriesContext(connection) as consultas:
+        medida()
+
+    return {
+        'repeticiones': repeticiones,
+        'mediana_ms': round(statistics.median(tiempos), 4),
+        'media_ms': round(statistics.fmean(tiempos), 4),
+        'p95_ms': round(percentil(tiempos, 95), 4),
+        'min_ms': round(min(tiempos), 4),
+        'consultas': len(consultas),
+        'tiempo_sql_ms': round(sum(float(q['time']) for q in consultas.captured_queries) * 1000, 4),
+    }
+
+
+def seleccionar_casos(filtros=None):
+    """Casos cuyo nombre empieza con alguno de los filtros (todos si no hay)"""
+    return [nombre for nombre in CASOS if not filtros or any(nombre.startswith(f) for f in filtros)]
+
+
+def entorno():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'base_de_datos': connection.vendor,
+        'plataforma': platform.platform(),
+    }
+
+
+def cache_aislada(nombre):
+    """CACHES con una LocMemCache propia: no toca la caché configurada"""
+    return {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': nombre}}
+
+
+def preparar_datos(tamano, semilla=42):
+    """
+    Reemplaza los datos por el conjunto `tamano` de TAMANOS, con
+    pronósticos y puntos de reorden calculados
+    """
+    from apps.chatbot.services.indice_productos import indice_productos
+    from apps.companies.datos_ejemplo import generar_datos
+    from apps.companies.pronostico import calcular_pronosticos, guardar_pronosticos, matriz_demanda
+    from apps.companies.reposicion import calcular_reposicion
+
+    generar_datos(semilla=semilla, **TAMANOS[tamano])
+    productos, _, matriz = matriz_demanda()
+    guardar_pronosticos(productos, *calcular_pronosticos(matriz), horizonte=7, dias=matriz.shape[1])
+    calcular_reposicion()
+    # bulk_create no dispara las señales que mantienen el índice
+    indice_productos.invalidar()
+    cache.clear()
+
+
+def ejecutar_suite(tamanos, casos, repeticiones=20, semilla=42, progreso=None):
+    """
+    Genera cada conjunto de datos y mide los casos sobre él. Reemplaza los
+    datos de la base de datos actual: usar una base de pruebas.
+    """
+    from apps.barcode_engine.storage import firebase_store
+
+    progreso = progreso or (lambda mensaje: None)
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': entorno(),
+        'semilla': semilla,
+        'tamanos': {nombre: TAMANOS[nombre] for nombre in tamanos},
+        'resultados': {},
+    }
+
+    with override_settings(CACHES=cache_aislada('benchmark_rendimiento'), LLM_BACKEND='local'), \
+            tempfile.TemporaryDirectory() as directorio, \
+            mock.patch.object(firebase_store, 'FILE_PATH', Path(directorio) / 'barcodes.json'):
+        # Los registros de save_barcode_record van al directorio temporal, no a barcode_data/
+        for tamano in tamanos:
+            progreso(f"Generando datos '{tamano}' ({TAMANOS[tamano]})...")
+            preparar_datos(tamano, semilla)
+
+            contexto = Contexto()
+            resultados = resultado['resultados'][tamano] = {}
+            for nombre in casos:
+                fabrica, ajustes = CASOS[nombre]
+                with override_settings(**ajustes):
+                    medida = fabrica(contexto)
+                    medida, preparar = medida if isinstance(medida, tuple) else (medida, None)
+                    resultados[nombre] = medir(medida, preparar, repeticiones=repeticiones)
+                progreso(
+                    f"  {nombre:<44}{resultados[nombre]['mediana_ms']:>10.3f} ms"
+                    f"{resultados[nombre]['consultas']:>5} consultas"
+                )
+    return resultado
+
+
+def comparar(actual, base, tolerancia=0.25):
+    """
+    [(tamaño, caso, fila de base, fila actual, cambio relativo, es_regresión)]
+    para los casos presentes en ambos. Es regresión si la mediana crece más
+    que la tolerancia (y más de MINIMO_REGRESION_MS) o si hay más consultas.
+    """
+    filas = []
+    for tamano, casos in actual['resultados'].items():
+        for nombre, fila in casos.items():
+            anterior = base.get('resultados', {}).get(tamano, {}).get(nombre)
+            if anterior is None:
+                continue
+            diferencia = fila['mediana_ms'] - anterior['mediana_ms']
+            cambio = diferencia / anterior['mediana_ms'] if anterior['mediana_ms'] else 0.0
+            regresion = (
+                (cambio > tolerancia and diferencia > MINIMO_REGRESION_MS)
+                or fila['consultas'] > anterior['consultas']
+            )
+            filas.append((tamano, nombre, anterior, fila, cambio, regresion))
+    return filas
@@ -0,0 +1,222 @@
+"""
+Prueba de carga de punta a punta (comando prueba_carga).
+
+Levanta la aplicación con un servidor WSGI de hilos en un proceso hijo
+(las vistas async corren igual que con runserver) y simula usuarios
+concurrentes, cada uno en un hilo con su propia conexión HTTP, que mezclan:
+
+- chat: POST /chatbot/chat/api/ con mensajes del corpus del chatbot; los
+  que no resuelve el intérprete local van al LLM stub (llm_stub)
+- dashboard: GET /companies/api/dashboard-data/ con If-None-Match, como
+  el sondeo del navegador
+- barcode: POST /barcode/detect/ con un frame JPEG
+
+Cada usuario espera un tiempo exponencial (pausa media) entre peticiones.
+El resultado son peticiones por segundo y percentiles de latencia por
+endpoint, sin contar el calentamiento.
+"""
+import base64
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+
+import httpx
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.db import connections
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .benchmarks import frame_ean13, percentil
+
+ENDPOINTS = {
+    'chat': 'chatbot:chatbot_api',
+    'dashboard': 'companies:dashboard_data',
+    'barcode': 'barcode_engine:barcode_detect',
+}
+MEZCLA = {'chat': 6, 'dashboard': 3, 'barcode': 1}
+
+
+class _Manejador(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _Servidor(ThreadedWSGIServer):
+    # El backlog por defecto (5) descarta conexiones bajo carga concurrente
+    request_queue_size = 1024
+
+
+class ServidorApp:
+    """
+    La aplicación Django servida por HTTP. Con fork disponible atiende en
+    un proceso hijo (no compite por el GIL con los usuarios simulados) que
+    hereda la configuración del proceso actual; si no, en un hilo.
+    """
+
+    def __init__(self, host='127.0.0.1', puerto=0):
+        self._httpd = _Servidor((host, puerto), _Manejador, allow_reuse_address=False)
+        self._httpd.set_app(WSGIHandler())
+        self._proceso = None
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self._httpd.server_address[:2]
+        return f'http://{host}:{puerto}'
+
+    @property
+    def en_proceso_hijo(self):
+        return self._proceso is not None
+
+    def iniciar(self):
+        if 'fork' in multiprocessing.get_all_start_methods():
+            # Las conexiones a la base de datos no pueden compartirse con el hijo
+            connections.close_all()
+            self._proceso = multiprocessing.get_context('fork').Process(
+                target=self._httpd.serve_forever, daemon=True
+            )
+            self._proceso.start()
+        else:
+            self._hilo = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self):
+        if self._proceso is not None:
+            self._proceso.terminate()
+            self._proceso.join()
+        else:
+            self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+
+class Registro:
+    """Latencias y estados por endpoint, compartido entre los usuarios"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.estados = defaultdict(Counter)
+
+    def agregar(self, endpoint, segundos, estado):
+        with self._lock:
+            self.latencias[endpoint].append(segundos)
+            self.estados[endpoint][estado] += 1
+
+    def resumen(self, duracion):
+        """{endpoint: estadísticas} más 'total', con latencias en ms"""
+        def estadisticas(latencias, estados):
+            errores = sum(n for estado, n in estados.items() if not isinstance(estado, int) or estado >= 400)
+            ms = [segundos * 1000 for segundos in latencias]
+            return {
+                'peticiones': len(ms),
+                'errores': errores,
+                'rps': round(len(ms) / duracion, 2),
+                'p50_ms': round(percentil(ms, 50), 2),
+                'p95_ms': round(percentil(ms, 95), 2),
+                'p99_ms': round(percentil(ms, 99), 2),
+                'max_ms': round(max(ms), 2),
+                'estados': {str(estado): n for estado, n in sorted(estados.items(), key=str)},
+            }
+
+        with self._lock:
+            resumen = {
+                endpoint: estadisticas(latencias, self.estados[endpoint])
+                for endpoint, latencias in sorted(self.latencias.items())
+            }
+            todas = [segundos for latencias in self.latencias.values() for segundos in latencias]
+            if todas:
+                resumen['total'] = estadisticas(todas, sum(self.estados.values(), Counter()))
+        return resumen
+
+
+def imagen_de_prueba(ancho=640, alto=480):
+    """Frame con un EAN-13 como data URL JPEG, igual que lo envía la cámara"""
+    import cv2
+
+    _, jpeg = cv2.imencode('.jpg', frame_ean13(ancho, alto))
+    return 'data:image/jpeg;base64,' + base64.b64encode(jpeg.tobytes()).decode('ascii')
+
+
+def _cliente(url):
+    """Cliente HTTP con un token CSRF propio (la cookie y la cabecera coinciden)"""
+    token = get_random_string(32)
+    return httpx.Client(base_url=url, timeout=60, cookies={'csrftoken': token}, headers={'X-CSRFToken': token})
+
+
+def _usuario(numero, url, conversacion_id, mensajes, imagen, mezcla, pausa,
+             inicio_medicion, fin, registro, semilla):
+    rng = random.Random(semilla * 1000 + numero)
+    rutas = {endpoint: reverse(nombre) for endpoint, nombre in ENDPOINTS.items()}
+    endpoints, pesos = zip(*mezcla.items())
+    etag = None
+
+    with _cliente(url) as cliente:
+        while time.monotonic() < fin:
+            endpoint = rng.choices(endpoints, pesos)[0]
+            comienzo = time.monotonic()
+            try:
+                if endpoint == 'chat':
+                    respuesta = cliente.post(rutas['chat'], json={
+                        'mensaje': rng.choice(mensajes), 'conversacion_id': conversacion_id,
+                    })
+                elif endpoint == 'dashboard':
+                    respuesta = cliente.get(rutas['dashboard'], headers={'If-None-Match': etag} if etag else {})
+                    etag = respuesta.headers.get('ETag', etag)
+                else:
+                    respuesta = cliente.post(rutas['barcode'], data={'image': imagen})
+                estado = respuesta.status_code
+            except httpx.HTTPError as e:
+                estado = type(e).__name__
+            if comienzo >= inicio_medicion:
+                registro.agregar(endpoint, time.monotonic() - comienzo, estado)
+            if pausa:
+                time.sleep(rng.expovariate(1 / pausa))
+
+
+def crear_conversaciones(url, cantidad):
+    """Ids de `cantidad` conversaciones nuevas, creadas por la API del chat"""
+    with _cliente(url) as cliente:
+        ids = []
+        for _ in range(cantidad):
+            respuesta = cliente.post(reverse('chatbot:nueva_conversacion'))
+            respuesta.raise_for_status()
+            ids.append(respuesta.json()['conversacion_id'])
+    return ids
+
+
+def ejecutar_carga(url, conversaciones, mensajes, mezcla=None, duracion=30, calentamiento=3,
+                   pausa=0.5, semilla=42):
+    """
+    Un usuario simulado por conversación durante calentamiento + duración
+    segundos. Retorna el resumen de Registro para el tramo medido.
+    """
+    mezcla = {endpoint: peso for endpoint, peso in (mezcla or MEZCLA).items() if peso > 0}
+    registro = Registro()
+    inicio_medicion = time.monotonic() + calentamiento
+    fin = inicio_medicion + duracion
+    imagen = imagen_de_prueba()
+
+    hilos = [
+        threading.Thread(
+            target=_usuario,
+            args=(numero, url, conversacion_id, mensajes, imagen, mezcla, pausa,
+                  inicio_medicion, fin, registro, semilla),
+            daemon=True,
+        )
+        for numero, conversacion_id in enumerate(conversaciones)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return registro.resumen(duracion)
@@ -0,0 +1,271 @@
+"""
+Instrumentación por petición (MetricasMiddleware y la vista /metrics).
+
+Cada petición registra su duración total en un histograma por nombre de
+URL (p. ej. "chatbot:chatbot_api"). Las peticiones muestreadas
+(METRICAS_MUESTREO) además desglosan el tiempo en segmentos:
+
+- sql: consultas a la base de datos (cantidad y tiempo), con un
+  execute_wrapper instalado en cada conexión al crearse
+- llm: llamadas al LLM del chatbot
+- barcode: decodificación de códigos de barras
+
+y lo devuelven en la cabecera Server-Timing a usuarios staff (o con
+DEBUG). La medición en curso viaja en una ContextVar, así funciona igual
+en vistas sync, async y dentro de sync_to_async. Si la petición no se
+muestrea el costo es una ContextVar vacía por consulta; con
+METRICAS_MUESTREO=0 el execute_wrapper ni se instala.
+
+Los histogramas son por proceso, como metricas_llm.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# Límites superiores (le) de los histogramas
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# Vista de las peticiones que no resuelven a ninguna URL (404)
+SIN_RUTA = 'sin_ruta'
+
+_medicion = ContextVar('medicion', default=None)
+
+
+class Medicion:
+    """Tiempo acumulado por segmento en una petición: {segmento: [cantidad, segundos]}"""
+
+    __slots__ = ('segmentos',)
+
+    def __init__(self):
+        self.segmentos = {}
+
+    def agregar(self, segmento, segundos):
+        datos = self.segmentos.get(segmento)
+        if datos is None:
+            datos = self.segmentos[segmento] = [0, 0.0]
+        datos[0] += 1
+        datos[1] += segundos
+
+    def server_timing(self, total):
+        """Valor de la cabecera Server-Timing (duraciones en ms)"""
+        partes = []
+        for segmento, (cantidad, segundos) in self.segmentos.items():
+            parte = f'{segmento};dur={segundos * 1000:.1f}'
+            if segmento == 'sql':
+                parte += f';desc="{cantidad} consultas"'
+            partes.append(parte)
+        partes.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(partes)
+
+
+def iniciar_medicion():
+    """Activa una Medicion en el contexto actual; retorna (medicion, token para reset)"""
+    medicion = Medicion()
+    return medicion, _medicion.set(medicion)
+
+
+def terminar_medicion(token):
+    _medicion.reset(token)
+
+
+def registrar(segmento, segundos):
+    """Suma un tiempo ya medido a la petición en curso, si se está midiendo"""
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.agregar(segmento, segundos)
+
+
+@contextmanager
+def medir(segmento):
+    """Mide el bloque como `segmento` de la petición en curso (no-op sin medición)"""
+    medicion = _medicion.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.agregar(segmento, time.perf_counter() - inicio)
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.agregar('sql', time.perf_counter() - inicio)
+
+
+def _instrumentar(connection, **kwargs):
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+def instrumentar_conexiones():
+    """Mide las consultas de toda conexión nueva y de las ya abiertas en este hilo"""
+    connection_created.connect(_instrumentar, dispatch_uid='core.instrumentacion')
+    for connection in connections.all(initialized_only=True):
+        _instrumentar(connection)
+
+
+class Histograma:
+    __slots__ = ('limites', 'cuentas', 'suma', 'cantidad')
+
+    def __init__(self, limites):
+        self.limites = limites
+        # Una cuenta por límite más la de +Inf; se acumulan al exportar
+        self.cuentas = [0] * (len(limites) + 1)
+        self.suma = 0.0
+        self.cantidad = 0
+
+    def observar(self, valor):
+        self.cuentas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cantidad += 1
+
+
+def _etiquetas(**etiquetas):
+    def escapar(valor):
+        return str(valor).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+    return ','.join(f'{clave}="{escapar(valor)}"' for clave, valor in etiquetas.items())
+
+
+def _numero(valor):
+    return f'{valor:g}' if isinstance(valor, float) else str(valor)
+
+
+class MetricasPeticiones:
+    """Histogramas por vista de la duración total, los segmentos y las consultas SQL"""
+
+    DURACION = 'predicta_peticion_duracion_segundos'
+    CONSULTAS = 'predicta_peticion_consultas_sql'
+    PETICIONES = 'predicta_peticiones_total'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._duracion = {}
+        self._consultas = {}
+        self._peticiones = {}
+
+    def registrar(self, vista, estado, total, medicion=None):
+        with self._lock:
+            clave = (vista, estado)
+            self._peticiones[clave] = self._peticiones.get(clave, 0) + 1
+            self._observar(self._duracion, (vista, 'total'), total, LIMITES_SEGUNDOS)
+            if medicion is None:
+                return
+            for segmento, (cantidad, segundos) in medicion.segmentos.items():
+                self._observar(self._duracion, (vista, segmento), segundos, LIMITES_SEGUNDOS)
+            consultas = medicion.segmentos.get('sql', (0, 0.0))[0]
+            self._observar(self._consultas, vista, consultas, LIMITES_CONSULTAS)
+
+    @staticmethod
+    def _observar(histogramas, clave, valor, limites):
+        histograma = histogramas.get(clave)
+        if histograma is None:
+            histograma = histogramas[clave] = Histograma(limites)
+        histograma.observar(valor)
+
+    def exportar(self):
+        """Formato de texto de Prometheus (versión 0.0.4)"""
+        lineas = []
+        with self._lock:
+            lineas += [
+                f'# HELP {self.PETICIONES} Peticiones atendidas por vista y estado HTTP',
+                f'# TYPE {self.PETICIONES} counter',
+            ]
+            for (vista, estado), cantidad in sorted(self._peticiones.items()):
+                lineas.append(f'{self.PETICIONES}{{{_etiquetas(vista=vista, estado=estado)}}} {cantidad}')
+
+            lineas += [
+                f'# HELP {self.DURACION} Duración de las peticiones por vista y segmento (total, sql, llm, barcode)',
+                f'# TYPE {self.DURACION} histogram',
+            ]
+            for (vista, segmento), histograma in sorted(self._duracion.items()):
+                lineas += self._histograma(self.DURACION, histograma, vista=vista, segmento=segmento)
+
+            lineas += [
+                f'# HELP {self.CONSULTAS} Consultas SQL por petición muestreada',
+                f'# TYPE {self.CONSULTAS} histogram',
+            ]
+            for vista, histograma in sorted(self._consultas.items()):
+                lineas += self._histograma(self.CONSULTAS, histograma, vista=vista)
+        return '\n'.join(lineas) + '\n'
+
+    @staticmethod
+    def _histograma(nombre, histograma, **etiquetas):
+        lineas = []
+        acumulado = 0
+        for limite, cuenta in zip(histograma.limites + ('+Inf',), histograma.cuentas):
+            acumulado += cuenta
+            le = limite if isinstance(limite, str) else _numero(float(limite))
+            lineas.append(f'{nombre}_bucket{{{_etiquetas(**etiquetas, le=le)}}} {acumulado}')
+        lineas.append(f'{nombre}_sum{{{_etiquetas(**etiquetas)}}} {_numero(float(histograma.suma))}')
+        lineas.append(f'{nombre}_count{{{_etiquetas(**etiquetas)}}} {histograma.cantidad}')
+        return lineas
+
+    def limpiar(self):
+        with self._lock:
+            self._duracion.clear()
+            self._consultas.clear()
+            self._peticiones.clear()
+
+
+metricas_peticiones = MetricasPeticiones()
+
+
+def exportar_metricas_llm():
+    """Llamadas y tokens del LLM por acción (metricas_llm) en formato Prometheus"""
+    from apps.chatbot.services.metricas_llm import metricas_llm
+
+    llamadas = 'predicta_llm_llamadas_total'
+    tokens = 'predicta_llm_tokens_total'
+    lineas = [
+        f'# HELP {llamadas} Llamadas al LLM por acción interpretada',
+        f'# TYPE {llamadas} counter',
+    ]
+    resumen = sorted(metricas_llm.resumen().items())
+    for accion, datos in resumen:
+        lineas.append(f'{llamadas}{{{_etiquetas(accion=accion)}}} {datos["llamadas"]}')
+    lineas += [
+        f'# HELP {tokens} Tokens del LLM por acción y tipo (prompt, cache, respuesta)',
+        f'# TYPE {tokens} counter',
+    ]
+    for accion, datos in resumen:
+        for tipo in ('prompt', 'cache', 'respuesta'):
+            lineas.append(f'{tokens}{{{_etiquetas(accion=accion, tipo=tipo)}}} {datos[f"tokens_{tipo}"]}')
+    return '\n'.join(lineas) + '\n'
+
+
+def exportar_metricas_cache_intenciones():
+    """Aciertos, fallos y tamaño de la caché de intenciones del chatbot en formato Prometheus"""
+    from apps.chatbot.services.cache_intenciones import cache_intenciones
+
+    consultas = 'predicta_intenciones_cache_consultas_total'
+    entradas = 'predicta_intenciones_cache_entradas'
+    capacidad = 'predicta_intenciones_cache_capacidad'
+    estadisticas = cache_intenciones.estadisticas()
+    lineas = [
+        f'# HELP {consultas} Consultas a la caché de intenciones por resultado (memoria, db, fallo)',
+        f'# TYPE {consultas} counter',
+        f'{consultas}{{{_etiquetas(resultado="memoria")}}} {estadisticas["aciertos"]}',
+        f'{consultas}{{{_etiquetas(resultado="db")}}} {estadisticas["aciertos_db"]}',
+        f'{consultas}{{{_etiquetas(resultado="fallo")}}} {estadisticas["fallos"]}',
+        f'# HELP {entradas} Intenciones guardadas en memoria',
+        f'# TYPE {entradas} gauge',
+        f'{entradas} {estadisticas["tamano"]}',
+        f'# HELP {capacidad} Máximo de intenciones en memoria (INTENCIONES_CACHE_TAMANO)',
+        f'# TYPE {capacidad} gauge',
+        f'{capacidad} {estadisticas["maximo"]}',
+    ]
+    return '\n'.join(lineas) + '\n'
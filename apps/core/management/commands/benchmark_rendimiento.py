@@ -0,0 +1,86 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.core.benchmarks import CASOS, TAMANOS, comparar, ejecutar_suite, seleccionar_casos
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide los caminos críticos (búsqueda, acciones del chat, dashboard, códigos de barras) '
+        'sobre datos generados en una base de pruebas; guarda JSON y compara contra una base anterior'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', nargs='+', choices=list(TAMANOS), default=['pequeno', 'mediano'],
+                            help='Conjuntos de datos a generar (por defecto pequeno y mediano)')
+        parser.add_argument('--casos', nargs='+',
+                            help='Solo los casos que empiezan con estos prefijos (ej. dashboard_data)')
+        parser.add_argument('--repeticiones', type=int, default=20,
+                            help='Repeticiones medidas por caso (por defecto 20)')
+        parser.add_argument('--semilla', type=int, default=42,
+                            help='Semilla de los datos generados (por defecto 42)')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+        parser.add_argument('--comparar', metavar='BASE',
+                            help='Resultados anteriores (JSON) contra los que buscar regresiones')
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help='Aumento relativo de la mediana tolerado al comparar (por defecto 0.25)')
+        parser.add_argument('--listar', action='store_true', help='Lista los casos y termina')
+
+    def handle(self, *args, **options):
+        if options['listar']:
+            for nombre in CASOS:
+                self.stdout.write(nombre)
+            return
+
+        casos = seleccionar_casos(options['casos'])
+        if not casos:
+            raise CommandError("Ningún caso coincide con --casos (ver --listar)")
+        if options['repeticiones'] < 1:
+            raise CommandError("--repeticiones debe ser al menos 1")
+
+        base = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    base = json.load(archivo)
+            except (OSError, json.JSONDecodeError) as e:
+                raise CommandError(f"No se pudo leer {options['comparar']}: {e}")
+
+        # Los datos se generan en una base de pruebas, como en `manage.py test`
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            resultado = ejecutar_suite(
+                options['tamanos'], casos,
+                repeticiones=options['repeticiones'],
+                semilla=options['semilla'],
+                progreso=self.stdout.write,
+            )
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+        if base is not None:
+            self._comparar(resultado, base, options['tolerancia'])
+
+    def _comparar(self, resultado, base, tolerancia):
+        filas = comparar(resultado, base, tolerancia)
+        self.stdout.write(f"\nComparación con la base del {base.get('fecha', '?')} (tolerancia {tolerancia:.0%})")
+        self.stdout.write(f"  {'tamaño':<9}{'caso':<44}{'base ms':>10}{'ahora ms':>10}{'cambio':>9}{'consultas':>11}")
+        for tamano, nombre, anterior, actual, cambio, regresion in filas:
+            linea = (
+                f"  {tamano:<9}{nombre:<44}{anterior['mediana_ms']:>10.3f}{actual['mediana_ms']:>10.3f}"
+                f"{cambio:>+9.0%}{anterior['consultas']:>5} → {actual['consultas']:<3}"
+            )
+            self.stdout.write(self.style.ERROR(linea) if regresion else linea)
+
+        regresiones = sum(1 for *_, regresion in filas if regresion)
+        if regresiones:
+            raise CommandError(f"{regresiones} regresiones de rendimiento respecto de la base")
+        self.stdout.write(self.style.SUCCESS(f"Sin regresiones en {len(filas)} casos comparados"))
@@ -0,0 +1,156 @@
+import json
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.urls import reverse
+
+from apps.barcode_engine.storage import firebase_store
+from apps.chatbot.management.commands.benchmark_interprete import CORPUS_DEFAULT, cargar_corpus
+from apps.chatbot.services.llm_stub import ServidorLLMStub
+from apps.core.benchmarks import TAMANOS, cache_aislada, entorno, preparar_datos
+from apps.core.carga import ENDPOINTS, MEZCLA, ServidorApp, crear_conversaciones, ejecutar_carga
+
+
+def _mezcla(valores):
+    mezcla = dict.fromkeys(MEZCLA, 0)
+    for valor in valores:
+        endpoint, _, peso = valor.partition('=')
+        if endpoint not in mezcla:
+            raise CommandError(f"Endpoint desconocido en --mezcla: {endpoint} (opciones: {', '.join(MEZCLA)})")
+        try:
+            mezcla[endpoint] = float(peso)
+        except ValueError:
+            raise CommandError(f"Peso inválido en --mezcla: {valor} (formato endpoint=peso)")
+    if not any(peso > 0 for peso in mezcla.values()):
+        raise CommandError("--mezcla debe tener al menos un endpoint con peso positivo")
+    return mezcla
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga: levanta la aplicación sobre datos generados y un LLM stub compatible '
+        'con OpenAI, simula usuarios concurrentes y reporta req/s y p50/p95/p99 por endpoint'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=20,
+                            help='Usuarios simulados concurrentes (por defecto 20)')
+        parser.add_argument('--duracion', type=float, default=30,
+                            help='Segundos medidos (por defecto 30)')
+        parser.add_argument('--calentamiento', type=float, default=3,
+                            help='Segundos iniciales que no se miden (por defecto 3)')
+        parser.add_argument('--pausa', type=float, default=0.5,
+                            help='Pausa media de cada usuario entre peticiones, en segundos (por defecto 0.5)')
+        parser.add_argument('--mezcla', nargs='+', metavar='ENDPOINT=PESO',
+                            help='Proporción de peticiones (por defecto chat=6 dashboard=3 barcode=1)')
+        parser.add_argument('--latencia-llm', type=float, default=0.3,
+                            help='Latencia del LLM stub en segundos (por defecto 0.3)')
+        parser.add_argument('--tamano', choices=list(TAMANOS), default='pequeno',
+                            help='Conjunto de datos generado (por defecto pequeno)')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--url',
+                            help='Probar un servidor ya en marcha (sin generar datos); debe usar '
+                                 'LLM_BACKEND=openai y LLM_BASE_URL con la URL del stub que se muestra')
+        parser.add_argument('--salida', help='Archivo JSON donde guardar los resultados')
+
+    def handle(self, *args, **options):
+        if options['usuarios'] < 1 or options['duracion'] <= 0:
+            raise CommandError("--usuarios debe ser al menos 1 y --duracion mayor a 0")
+        mezcla = _mezcla(options['mezcla']) if options['mezcla'] else MEZCLA
+        mensajes = [mensaje for mensaje, _ in cargar_corpus(CORPUS_DEFAULT)]
+
+        stub = ServidorLLMStub(latencia=options['latencia_llm'])
+        try:
+            if options['url']:
+                stub.iniciar()
+                self.stdout.write(f"LLM stub en {stub.url}")
+                resumen = self._cargar(options['url'], mensajes, mezcla, options)
+            else:
+                resumen = self._cargar_local(stub, mensajes, mezcla, options)
+        finally:
+            stub.detener()
+
+        self._mostrar(resumen, stub)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'fecha': datetime.now().isoformat(timespec='seconds'),
+                    'entorno': entorno(),
+                    'configuracion': {
+                        clave: options[clave]
+                        for clave in ('usuarios', 'duracion', 'calentamiento', 'pausa', 'latencia_llm',
+                                      'tamano', 'semilla', 'url')
+                    } | {'mezcla': mezcla},
+                    'llm_stub': {'peticiones': stub.peticiones, 'max_en_curso': stub.max_en_curso},
+                    'resultados': resumen,
+                }, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+
+    def _cargar_local(self, stub, mensajes, mezcla, options):
+        """Base de pruebas con datos generados y la aplicación en un proceso hijo"""
+        with tempfile.TemporaryDirectory() as directorio:
+            prueba = connection.settings_dict['TEST']
+            nombre_prueba = prueba.get('NAME')
+            if connection.vendor == 'sqlite' and not nombre_prueba:
+                # Una base SQLite en memoria no se comparte con el proceso del servidor
+                prueba['NAME'] = str(Path(directorio) / 'prueba_carga.sqlite3')
+            nombre_original = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(
+                    DEBUG=False,
+                    ALLOWED_HOSTS=['127.0.0.1'],
+                    CACHES=cache_aislada('prueba_carga'),
+                    LLM_BACKEND='openai',
+                    LLM_BASE_URL=stub.url,
+                    OPENAI_API_KEY='stub',
+                ), mock.patch.object(firebase_store, 'FILE_PATH', Path(directorio) / 'barcodes.json'):
+                    self.stdout.write(f"Generando datos '{options['tamano']}' ({TAMANOS[options['tamano']]})...")
+                    preparar_datos(options['tamano'], options['semilla'])
+                    # El servidor se inicia antes que el hilo del stub (fork sin hilos)
+                    with ServidorApp() as servidor:
+                        stub.iniciar()
+                        modo = 'proceso hijo' if servidor.en_proceso_hijo else 'hilo'
+                        self.stdout.write(f"Aplicación en {servidor.url} ({modo}), LLM stub en {stub.url}")
+                        return self._cargar(servidor.url, mensajes, mezcla, options)
+            finally:
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+                prueba['NAME'] = nombre_prueba
+
+    def _cargar(self, url, mensajes, mezcla, options):
+        conversaciones = crear_conversaciones(url, options['usuarios'])
+        self.stdout.write(
+            f"{options['usuarios']} usuarios durante {options['duracion']:g}s "
+            f"(+{options['calentamiento']:g}s de calentamiento), pausa media {options['pausa']:g}s..."
+        )
+        return ejecutar_carga(
+            url, conversaciones, mensajes,
+            mezcla=mezcla,
+            duracion=options['duracion'],
+            calentamiento=options['calentamiento'],
+            pausa=options['pausa'],
+            semilla=options['semilla'],
+        )
+
+    def _mostrar(self, resumen, stub):
+        self.stdout.write(
+            f"\n  {'endpoint':<11}{'peticiones':>11}{'errores':>9}{'req/s':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'máx ms':>9}  estados"
+        )
+        for endpoint, datos in resumen.items():
+            linea = (
+                f"  {endpoint:<11}{datos['peticiones']:>11}{datos['errores']:>9}{datos['rps']:>9.1f}"
+                f"{datos['p50_ms']:>9.1f}{datos['p95_ms']:>9.1f}{datos['p99_ms']:>9.1f}{datos['max_ms']:>9.1f}"
+                f"  {', '.join(f'{estado}: {n}' for estado, n in datos['estados'].items())}"
+            )
+            self.stdout.write(self.style.ERROR(linea) if datos['errores'] else linea)
+        self.stdout.write(
+            f"\nLLM stub: {stub.peticiones} llamadas, máximo {stub.max_en_curso} simultáneas"
+        )
+        rutas = ', '.join(f'{endpoint} = {reverse(nombre)}' for endpoint, nombre in ENDPOINTS.items())
+        self.stdout.write(f"({rutas})")
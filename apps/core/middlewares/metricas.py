@@ -0,0 +1,83 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from apps.core.instrumentacion import SIN_RUTA, iniciar_medicion, metricas_peticiones, terminar_medicion
+
+
+class MetricasMiddleware:
+    """
+    Registra la duración de cada petición por nombre de URL. Una fracción
+    METRICAS_MUESTREO de las peticiones desglosa SQL, LLM y códigos de
+    barras; Server-Timing solo lo reciben usuarios staff o con DEBUG. Va
+    primero en MIDDLEWARE para que el total incluya al resto de los
+    middlewares.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICAS_ACTIVAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        medicion, token = self._iniciar()
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                terminar_medicion(token)
+        total = time.perf_counter() - inicio
+        return self._terminar(request, response, medicion, total, self._server_timing(request, medicion))
+
+    async def __acall__(self, request):
+        medicion, token = self._iniciar()
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                terminar_medicion(token)
+        total = time.perf_counter() - inicio
+        return self._terminar(request, response, medicion, total, await self._aserver_timing(request, medicion))
+
+    def _iniciar(self):
+        muestreo = settings.METRICAS_MUESTREO
+        if muestreo >= 1 or (muestreo > 0 and random.random() < muestreo):
+            return iniciar_medicion()
+        return None, None
+
+    @staticmethod
+    def _server_timing(request, medicion):
+        if medicion is None or not settings.METRICAS_SERVER_TIMING:
+            return False
+        # request.user lo agrega AuthenticationMiddleware, que corre después
+        usuario = getattr(request, 'user', None)
+        return settings.DEBUG or (usuario is not None and usuario.is_staff)
+
+    @staticmethod
+    async def _aserver_timing(request, medicion):
+        if medicion is None or not settings.METRICAS_SERVER_TIMING:
+            return False
+        if settings.DEBUG:
+            return True
+        return hasattr(request, 'auser') and (await request.auser()).is_staff
+
+    def _terminar(self, request, response, medicion, total, server_timing):
+        match = request.resolver_match
+        vista = match.view_name if match else SIN_RUTA
+        metricas_peticiones.registrar(vista, response.status_code, total, medicion)
+        if server_timing:
+            response.headers['Server-Timing'] = medicion.server_timing(total)
+        return response
@@ -0,0 +1,78 @@
+import asyncio
+import random
+import sys
+import threading
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from apps.core.instrumentacion import SIN_RUTA
+from apps.core.perfilador import Captura, pila_async, pila_sync
+
+CABECERA = 'X-Perfilar'
+PARAMETRO = 'perfilar'
+
+
+class PerfiladorMiddleware:
+    """
+    Perfila por muestreo las peticiones de usuarios staff que lo piden con
+    la cabecera X-Perfilar o ?perfilar=1, y una de cada PERFILADOR_CADA_N
+    peticiones al azar. El nombre del perfil guardado vuelve en la cabecera
+    X-Perfil. Va después de AuthenticationMiddleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERFILADOR_ACTIVO:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not (self._al_azar() or (self._pedido(request) and request.user.is_staff)):
+            return self.get_response(request)
+
+        captura = Captura(pila_sync(threading.get_ident(), sys._getframe())).iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            captura.detener()
+        return self._guardar(request, response, captura)
+
+    async def __acall__(self, request):
+        if not (self._al_azar() or (self._pedido(request) and (await request.auser()).is_staff)):
+            return await self.get_response(request)
+
+        # Hilo donde corre el código sync de esta petición (sync_to_async thread sensitive)
+        hilo_sync = await sync_to_async(threading.get_ident)()
+        captura = Captura(pila_async(
+            asyncio.current_task(), sys._getframe(), threading.get_ident(), hilo_sync
+        )).iniciar()
+        try:
+            response = await self.get_response(request)
+        finally:
+            captura.detener()
+        return await sync_to_async(self._guardar, thread_sensitive=False)(request, response, captura)
+
+    @staticmethod
+    def _al_azar():
+        cada_n = settings.PERFILADOR_CADA_N
+        return cada_n > 0 and random.randrange(cada_n) == 0
+
+    @staticmethod
+    def _pedido(request):
+        valor = request.headers.get(CABECERA) or request.GET.get(PARAMETRO)
+        return valor not in (None, '', '0')
+
+    @staticmethod
+    def _guardar(request, response, captura):
+        match = request.resolver_match
+        response.headers['X-Perfil'] = captura.guardar(match.view_name if match else SIN_RUTA)
+        return response
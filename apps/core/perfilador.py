@@ -0,0 +1,270 @@
+"""
+Perfilado por muestreo de peticiones individuales (PerfiladorMiddleware).
+
+Mientras dura la petición, un hilo toma cada PERFILADOR_INTERVALO
+segundos la pila de llamadas de quien la atiende (sys._current_frames) y
+al terminar la guarda en PERFILADOR_DIR, en formato speedscope
+(https://www.speedscope.app) o de pilas colapsadas (flamegraph.pl,
+inferno, speedscope). Es tiempo de reloj: las esperas al LLM o a la base
+de datos aparecen con su duración.
+
+- sync (WSGI o middleware sync): la pila del hilo de la petición
+- async (ASGI): la cadena de awaits de la tarea de la petición; si la
+  tarea está corriendo en el loop, además las funciones que llama; si
+  espera a sync_to_async, la pila del hilo que ejecuta el código sync.
+  El handler ASGI de Django corre todo el código sync de una petición
+  en un mismo hilo, que el middleware identifica al empezar.
+
+Con WSGI (runserver) una vista async corre en el loop de otro hilo
+(async_to_sync) y el perfil solo muestra la espera: para ver su interior
+hay que perfilarla bajo ASGI.
+"""
+import json
+import re
+import sys
+import sysconfig
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+
+FORMATOS = {
+    'speedscope': '.speedscope.json',
+    'colapsado': '.txt',
+}
+
+# Tope de muestras por captura (a 5 ms, más de 8 minutos)
+MAXIMO_MUESTRAS = 100_000
+
+_NOMBRE_PERFIL = re.compile(
+    r'^(?P<fecha>\d{8}-\d{6}-\d{6})_(?P<vista>[\w.-]+)_(?P<ms>\d+)ms(?P<extension>\.speedscope\.json|\.txt)$'
+)
+
+
+_STDLIB = sysconfig.get_paths()['stdlib']
+
+
+@lru_cache(maxsize=4096)
+def _marco(code):
+    """(función, archivo, línea) de un code object, con rutas cortas"""
+    ruta = code.co_filename
+    base = str(settings.BASE_DIR)
+    if ruta.startswith(base):
+        ruta = ruta[len(base):].lstrip('/\\')
+    elif 'site-packages' in ruta:
+        ruta = ruta.split('site-packages', 1)[1].lstrip('/\\')
+    elif ruta.startswith(_STDLIB):
+        ruta = ruta[len(_STDLIB):].lstrip('/\\')
+    return code.co_qualname, ruta, code.co_firstlineno
+
+
+def _desde_raiz(frame):
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _indice(frames, marca):
+    for i, frame in enumerate(frames):
+        if frame is marca:
+            return i
+    return None
+
+
+def _despues_de(frames, marca):
+    """Los frames posteriores a `marca` (todos si no aparece)"""
+    i = _indice(frames, marca)
+    return frames if i is None else frames[i + 1:]
+
+
+def _cadena_await(coro):
+    """Frames de la cadena de awaits, del coroutine raíz al más interno"""
+    frames = []
+    while coro is not None:
+        frame = getattr(coro, 'cr_frame', None) or getattr(coro, 'gi_frame', None)
+        if frame is None:
+            break
+        frames.append(frame)
+        coro = getattr(coro, 'cr_await', None) or getattr(coro, 'gi_yieldfrom', None)
+    return frames
+
+
+def _trabajo_en_hilo(frame):
+    """Pila del código sync que corre un hilo de ThreadPoolExecutor (None si está libre)"""
+    frames = _desde_raiz(frame)
+    inicio = None
+    for i, actual in enumerate(frames):
+        codigo = actual.f_code
+        if codigo.co_name == 'run' and codigo.co_filename.endswith(('concurrent/futures/thread.py',
+                                                                      'concurrent\\futures\\thread.py')):
+            inicio = i + 1
+    if inicio is None:
+        return None
+    return [actual for actual in frames[inicio:] if 'asgiref' not in actual.f_code.co_filename]
+
+
+def pila_sync(hilo, marca):
+    """Función de pila para una petición atendida por el hilo `hilo`, desde el frame `marca`"""
+    def pila(frames):
+        frame = frames.get(hilo)
+        return _despues_de(_desde_raiz(frame), marca) if frame is not None else None
+    return pila
+
+
+def pila_async(tarea, marca, hilo_loop, hilo_sync):
+    """Función de pila para una petición atendida por la tarea `tarea` del loop en `hilo_loop`"""
+    def pila(frames):
+        cadena = _despues_de(_cadena_await(tarea.get_coro()), marca)
+        if not cadena:
+            return None
+        en_loop = _desde_raiz(frames.get(hilo_loop))
+        i = _indice(en_loop, cadena[-1])
+        if i is not None:
+            # La tarea está corriendo: lo que llama el coroutine más interno
+            return cadena + en_loop[i + 1:]
+        frame_sync = frames.get(hilo_sync) if hilo_sync is not None else None
+        if frame_sync is not None:
+            trabajo = _trabajo_en_hilo(frame_sync)
+            if trabajo:
+                return cadena + trabajo
+        return cadena
+    return pila
+
+
+class Captura:
+    """Muestras (pila, segundos) de una petición, tomadas por un hilo aparte"""
+
+    def __init__(self, pila, intervalo=None):
+        self._pila = pila
+        self.intervalo = intervalo or settings.PERFILADOR_INTERVALO
+        self.muestras = []
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, name='perfilador', daemon=True)
+        self.inicio = None
+        self.duracion = 0.0
+
+    def iniciar(self):
+        self.inicio = time.perf_counter()
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self._hilo.join()
+        self.duracion = time.perf_counter() - self.inicio
+
+    def _muestrear(self):
+        anterior = self.inicio
+        while not self._detener.wait(self.intervalo) and len(self.muestras) < MAXIMO_MUESTRAS:
+            frames = sys._current_frames()
+            ahora = time.perf_counter()
+            try:
+                pila = self._pila(frames)
+            except (AttributeError, ValueError):
+                # La pila cambió mientras se recorría: se descarta la muestra
+                pila = None
+            if pila:
+                self.muestras.append((tuple(_marco(frame.f_code) for frame in pila), ahora - anterior))
+            anterior = ahora
+            del frames, pila
+
+    def colapsado(self):
+        """Una línea "f1;f2;f3 muestras" por pila distinta"""
+        cuentas = Counter(pila for pila, _ in self.muestras)
+        return ''.join(
+            ';'.join(f'{funcion} ({archivo}:{linea})' for funcion, archivo, linea in pila) + f' {n}\n'
+            for pila, n in cuentas.most_common()
+        )
+
+    def speedscope(self, nombre):
+        """Perfil "sampled" de speedscope, con el peso de cada muestra en ms"""
+        indices = {}
+        marcos = []
+        muestras = []
+        for pila, _ in self.muestras:
+            fila = []
+            for marco in pila:
+                if marco not in indices:
+                    indices[marco] = len(marcos)
+                    funcion, archivo, linea = marco
+                    marcos.append({'name': funcion, 'file': archivo, 'line': linea})
+                fila.append(indices[marco])
+            muestras.append(fila)
+        pesos = [round(segundos * 1000, 3) for _, segundos in self.muestras]
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': nombre,
+            'exporter': 'PredictaAI',
+            'shared': {'frames': marcos},
+            'profiles': [{
+                'type': 'sampled',
+                'name': nombre,
+                'unit': 'milliseconds',
+                'startValue': 0,
+                'endValue': round(sum(pesos), 3),
+                'samples': muestras,
+                'weights': pesos,
+            }],
+        }
+
+    def guardar(self, vista, directorio=None, formato=None):
+        """Escribe el perfil en PERFILADOR_DIR; retorna el nombre del archivo"""
+        directorio = Path(directorio or settings.PERFILADOR_DIR)
+        formato = formato or settings.PERFILADOR_FORMATO
+        directorio.mkdir(parents=True, exist_ok=True)
+        vista = re.sub(r'[^\w.-]', '.', vista.replace(':', '.'))
+        nombre = (
+            f'{datetime.now():%Y%m%d-%H%M%S-%f}_{vista}_{self.duracion * 1000:.0f}ms{FORMATOS[formato]}'
+        )
+        if formato == 'speedscope':
+            contenido = json.dumps(self.speedscope(nombre), separators=(',', ':'))
+        else:
+            contenido = self.colapsado()
+        (directorio / nombre).write_text(contenido, encoding='utf-8')
+        _podar(directorio, settings.PERFILADOR_MAXIMO)
+        return nombre
+
+
+def _podar(directorio, maximo):
+    """Borra los perfiles más antiguos por encima de `maximo`"""
+    nombres = sorted(
+        (entrada.name for entrada in directorio.iterdir() if _NOMBRE_PERFIL.match(entrada.name)),
+        reverse=True,
+    )
+    for nombre in nombres[maximo:]:
+        (directorio / nombre).unlink(missing_ok=True)
+
+
+def listar_perfiles(directorio=None):
+    """Perfiles guardados, del más reciente al más antiguo"""
+    directorio = Path(directorio or settings.PERFILADOR_DIR)
+    if not directorio.is_dir():
+        return []
+    perfiles = []
+    for entrada in directorio.iterdir():
+        match = _NOMBRE_PERFIL.match(entrada.name)
+        if match:
+            perfiles.append({
+                'nombre': entrada.name,
+                'fecha': datetime.strptime(match['fecha'], '%Y%m%d-%H%M%S-%f'),
+                'vista': match['vista'],
+                'duracion_ms': int(match['ms']),
+                'formato': 'speedscope' if match['extension'] == '.speedscope.json' else 'colapsado',
+                'tamano': entrada.stat().st_size,
+            })
+    return sorted(perfiles, key=lambda perfil: perfil['nombre'], reverse=True)
+
+
+def ruta_perfil(nombre, directorio=None):
+    """Ruta de un perfil guardado, o None si el nombre no es válido o no existe"""
+    if not _NOMBRE_PERFIL.match(nombre):
+        return None
+    ruta = Path(directorio or settings.PERFILADOR_DIR) / nombre
+    return ruta if ruta.is_file() else None
@@ -1,3 +1,231 @@
-from django.test import TestCase
+import shutil
+import sys
+import tempfile
+import threading
+import time
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import instrumentacion
+from .benchmarks import _ean13, comparar, medir
+from .carga import Registro
+from .instrumentacion import Medicion, metricas_peticiones
+from .perfilador import Captura, listar_perfiles, pila_sync, ruta_perfil
+
+
+class BenchmarksTests(TestCase):
+    def test_ean13_agrega_digito_verificador(self):
+        digitos, modulos = _ean13('786123456789')
+        self.assertEqual(digitos, '7861234567898')
+        self.assertEqual(len(modulos), 95)
+
+    def test_medir_cuenta_consultas(self):
+        resultado = medir(lambda: list(get_user_model().objects.all()), repeticiones=3)
+        self.assertEqual(resultado['repeticiones'], 3)
+        self.assertEqual(resultado['consultas'], 1)
+        self.assertLessEqual(resultado['min_ms'], resultado['mediana_ms'])
+
+    def test_comparar_marca_regresiones(self):
+        def datos(mediana, consultas):
+            return {'resultados': {'pequeno': {'caso': {'mediana_ms': mediana, 'consultas': consultas}}}}
+
+        def regresion(actual, base):
+            (*_, es_regresion), = comparar(actual, base, tolerancia=0.25)
+            return es_regresion
+
+        self.assertFalse(regresion(datos(1.2, 2), datos(1.0, 2)))
+        self.assertTrue(regresion(datos(1.5, 2), datos(1.0, 2)))
+        self.assertTrue(regresion(datos(1.0, 3), datos(1.0, 2)))
+        # Por debajo del mínimo absoluto es ruido
+        self.assertFalse(regresion(datos(0.004, 2), datos(0.001, 2)))
+        self.assertEqual(comparar(datos(1.0, 2), {'resultados': {}}), [])
+
+
+class RegistroCargaTests(TestCase):
+    def test_resumen_por_endpoint(self):
+        registro = Registro()
+        for ms in range(1, 101):
+            registro.agregar('chat', ms / 1000, 200)
+        registro.agregar('dashboard', 0.002, 304)
+        registro.agregar('dashboard', 0.5, 500)
+        registro.agregar('dashboard', 1.0, 'ReadTimeout')
+
+        resumen = registro.resumen(duracion=10)
+        self.assertEqual(resumen['chat']['peticiones'], 100)
+        self.assertEqual(resumen['chat']['rps'], 10)
+        self.assertEqual(resumen['chat']['p50_ms'], 51)
+        self.assertEqual(resumen['chat']['p99_ms'], 99)
+        # 304 no es error; un 500 y una excepción sí
+        self.assertEqual(resumen['dashboard']['errores'], 2)
+        self.assertEqual(resumen['dashboard']['estados'], {'304': 1, '500': 1, 'ReadTimeout': 1})
+        self.assertEqual(resumen['total']['peticiones'], 103)
+
+
+@override_settings(METRICAS_MUESTREO=1)
+class InstrumentacionTests(TestCase):
+    def setUp(self):
+        metricas_peticiones.limpiar()
+        self.addCleanup(metricas_peticiones.limpiar)
+        self.staff = get_user_model().objects.create_user('admin@predicta.test', is_staff=True)
+
+    def test_medir_sin_peticion_no_registra(self):
+        with instrumentacion.medir('llm'):
+            pass
+        medicion, token = instrumentacion.iniciar_medicion()
+        try:
+            with instrumentacion.medir('llm'):
+                time.sleep(0.001)
+            list(get_user_model().objects.all())
+        finally:
+            instrumentacion.terminar_medicion(token)
+        self.assertEqual(medicion.segmentos['llm'][0], 1)
+        self.assertGreater(medicion.segmentos['llm'][1], 0)
+        self.assertEqual(medicion.segmentos['sql'][0], 1)
+
+    def test_exportar_histogramas_acumulados(self):
+        medicion = Medicion()
+        medicion.agregar('sql', 0.002)
+        medicion.agregar('sql', 0.003)
+        metricas_peticiones.registrar('companies:dashboard_data', 200, 0.02, medicion)
+        metricas_peticiones.registrar('companies:dashboard_data', 304, 3.0)
+
+        texto = metricas_peticiones.exportar()
+        total = 'vista="companies:dashboard_data",segmento="total"'
+        self.assertIn(f'predicta_peticion_duracion_segundos_bucket{{{total},le="0.025"}} 1', texto)
+        self.assertIn(f'predicta_peticion_duracion_segundos_bucket{{{total},le="+Inf"}} 2', texto)
+        self.assertIn(f'predicta_peticion_duracion_segundos_count{{{total}}} 2', texto)
+        self.assertIn('predicta_peticion_consultas_sql_bucket{vista="companies:dashboard_data",le="2"} 1', texto)
+        self.assertIn('predicta_peticiones_total{vista="companies:dashboard_data",estado="304"} 1', texto)
+
+    def test_exportar_cache_de_intenciones(self):
+        from apps.chatbot.services.cache_intenciones import cache_intenciones
+
+        cache_intenciones.limpiar()
+        self.addCleanup(cache_intenciones.limpiar)
+        cache_intenciones.guardar('productos más vendidos', {'accion': 'productos_mas_vendidos'})
+        cache_intenciones.obtener('productos mas vendidos')
+        cache_intenciones.obtener('stock de tijeras')
+
+        texto = instrumentacion.exportar_metricas_cache_intenciones()
+        self.assertIn('predicta_intenciones_cache_consultas_total{resultado="memoria"} 1', texto)
+        self.assertIn('predicta_intenciones_cache_consultas_total{resultado="fallo"} 1', texto)
+        self.assertIn('predicta_intenciones_cache_entradas 1', texto)
+
+    def test_server_timing_y_metricas_por_vista(self):
+        self.client.force_login(self.staff)
+        respuesta = self.client.get(reverse('core:metricas'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertRegex(respuesta['Server-Timing'], r'^sql;dur=[\d.]+;desc="\d+ consultas", total;dur=[\d.]+$')
+
+        texto = self.client.get(reverse('core:metricas')).content.decode()
+        self.assertIn('predicta_peticiones_total{vista="core:metricas",estado="200"} 1', texto)
+        self.assertIn('predicta_intenciones_cache_consultas_total', texto)
+        self.assertIn('vista="core:metricas",segmento="sql"', texto)
+
+    async def test_server_timing_en_asgi(self):
+        await self.async_client.aforce_login(self.staff)
+        respuesta = await self.async_client.get(reverse('core:metricas'))
+        self.assertIn('sql;dur=', respuesta['Server-Timing'])
+
+    def test_server_timing_solo_para_staff_o_debug(self):
+        respuesta = self.client.get('/no-existe/')
+        self.assertNotIn('Server-Timing', respuesta)
+        with override_settings(DEBUG=True):
+            self.assertIn('Server-Timing', self.client.get('/no-existe/'))
+        # El desglose se registra igual en /metrics
+        self.client.force_login(self.staff)
+        texto = self.client.get(reverse('core:metricas')).content.decode()
+        self.assertIn('predicta_peticion_consultas_sql_count{vista="sin_ruta"} 2', texto)
+
+    async def test_server_timing_solo_para_staff_en_asgi(self):
+        respuesta = await self.async_client.get('/no-existe/')
+        self.assertNotIn('Server-Timing', respuesta)
+
+    @override_settings(METRICAS_MUESTREO=0)
+    def test_sin_muestreo_solo_duracion_total(self):
+        self.client.get('/no-existe/')
+        self.client.force_login(self.staff)
+        respuesta = self.client.get(reverse('core:metricas'))
+        self.assertNotIn('Server-Timing', respuesta)
+        texto = respuesta.content.decode()
+        self.assertIn('vista="sin_ruta",segmento="total"', texto)
+        self.assertNotIn('segmento="sql"', texto)
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_metricas_requiere_staff_o_token(self):
+        url = reverse('core:metricas')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer otro').status_code, 403)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer secreto').status_code, 200)
+        with override_settings(METRICAS_TOKEN=''):
+            self.assertEqual(self.client.get(url).status_code, 403)
+            self.client.force_login(self.staff)
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+
+def _ocupado(segundos):
+    fin = time.perf_counter() + segundos
+    while time.perf_counter() < fin:
+        pass
+
+
+class PerfiladorTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        ajustes = override_settings(PERFILADOR_ACTIVO=True, PERFILADOR_DIR=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.staff = get_user_model().objects.create_user('admin@predicta.test', is_staff=True)
+
+    def test_captura_y_formatos(self):
+        captura = Captura(pila_sync(threading.get_ident(), sys._getframe()), intervalo=0.002).iniciar()
+        _ocupado(0.05)
+        captura.detener()
+
+        self.assertIn('_ocupado', {pila[0][0] for pila, _ in captura.muestras})
+        linea = captura.colapsado().splitlines()[0]
+        self.assertRegex(linea, r'^_ocupado \(apps/core/tests\.py:\d+\) \d+$')
+
+        perfil = captura.speedscope('prueba')['profiles'][0]
+        self.assertEqual(len(perfil['samples']), len(captura.muestras))
+        self.assertAlmostEqual(perfil['endValue'], sum(perfil['weights']), places=2)
+
+        nombre = captura.guardar('chatbot:chatbot_api', formato='colapsado')
+        perfiles = listar_perfiles()
+        self.assertEqual([p['nombre'] for p in perfiles], [nombre])
+        self.assertEqual(perfiles[0]['vista'], 'chatbot.chatbot_api')
+        self.assertEqual(perfiles[0]['formato'], 'colapsado')
+        self.assertIsNone(ruta_perfil('../' + nombre))
+
+    def test_solo_staff_puede_pedir_perfil(self):
+        url = reverse('core:home')
+        self.assertNotIn('X-Perfil', self.client.get(url, {'perfilar': 1}))
+        self.client.force_login(self.staff)
+        self.assertNotIn('X-Perfil', self.client.get(url, {'perfilar': 0}))
+        nombre = self.client.get(url, headers={'X-Perfilar': '1'})['X-Perfil']
+        self.assertIsNotNone(ruta_perfil(nombre))
+        self.assertTrue(nombre.endswith('.speedscope.json'))
+
+    @override_settings(PERFILADOR_CADA_N=1)
+    def test_muestreo_al_azar(self):
+        self.assertIn('X-Perfil', self.client.get(reverse('core:home')))
+
+    async def test_perfil_en_asgi(self):
+        await self.async_client.aforce_login(self.staff)
+        respuesta = await self.async_client.get(reverse('core:home'), {'perfilar': 1})
+        self.assertIsNotNone(ruta_perfil(respuesta['X-Perfil']))
+
+    def test_indice_y_descarga(self):
+        captura = Captura(pila_sync(threading.get_ident(), sys._getframe())).iniciar()
+        captura.detener()
+        nombre = captura.guardar('core:home')
+
+        self.assertEqual(self.client.get(reverse('core:perfiles')).status_code, 302)
+        self.client.force_login(self.staff)
+        respuesta = self.client.get(reverse('core:perfiles'))
+        self.assertContains(respuesta, reverse('core:perfil', args=[nombre]))
+        self.assertEqual(self.client.get(reverse('core:perfil', args=[nombre])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('core:perfil', args=['otro.txt'])).status_code, 404)
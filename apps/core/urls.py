@@ -1,8 +1,11 @@
 from django.urls import path
-from .views import home
+from .views import home, metricas, perfil, perfiles
 
 app_name = "core"
 
 urlpatterns = [
     path("", home, name="home"), 
+    path("metrics", metricas, name="metricas"),
+    path("perfiles/", perfiles, name="perfiles"),
+    path("perfiles/<str:nombre>", perfil, name="perfil"),
 ]
@@ -1,6 +1,47 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
+from django.utils.crypto import constant_time_compare
+
+from .instrumentacion import exportar_metricas_cache_intenciones, exportar_metricas_llm, metricas_peticiones
+from .perfilador import listar_perfiles, ruta_perfil
 
 def home(request): 
     return render(request, "core/home.html")
 
+
+def metricas(request):
+    """Histogramas por vista y contadores del LLM y de la caché de intenciones en formato de Prometheus"""
+    if settings.METRICAS_TOKEN:
+        autorizado = constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {settings.METRICAS_TOKEN}"
+        )
+    else:
+        autorizado = request.user.is_authenticated and request.user.is_staff
+    if not autorizado:
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        metricas_peticiones.exportar() + exportar_metricas_llm() + exportar_metricas_cache_intenciones(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
+@staff_member_required
+def perfiles(request):
+    """Perfiles de peticiones capturados por PerfiladorMiddleware"""
+    return render(request, "core/perfiles.html", {
+        "perfiles": listar_perfiles(),
+        "activo": settings.PERFILADOR_ACTIVO,
+        "cada_n": settings.PERFILADOR_CADA_N,
+    })
+
+
+@staff_member_required
+def perfil(request, nombre):
+    ruta = ruta_perfil(nombre)
+    if ruta is None:
+        raise Http404("Perfil no encontrado")
+    return FileResponse(open(ruta, "rb"), as_attachment=True, filename=nombre)